@@ -17,6 +17,22 @@ class Config:
         # Replace with your actual development PostgreSQL connection string
         
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Long-lived processes (the scheduler daemon) keep one pool for their lifetime:
+    # test connections on checkout and recycle them before server-side idle timeouts
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+
+    # Store trend/cyclic/noise on each aggregated candle in the daemon (streaming SSA)
+    SSA_ENRICHMENT_ENABLED = os.environ.get('SSA_ENRICHMENT_ENABLED', 'false').lower() == 'true'
+
+    # Forecaster behind the signal engine's forecast_dir in the forward tester ('spectral' or 'recurrent')
+    SSA_FORECAST_METHOD = os.environ.get('SSA_FORECAST_METHOD', 'spectral').lower()
+
+    # Run the /scan batch decomposition in float32 (components within ~1e-5 of the price level)
+    SSA_SCAN_FLOAT32 = os.environ.get('SSA_SCAN_FLOAT32', 'false').lower() == 'true'
     
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'super-secret-jwt-key' 
@@ -4,13 +4,14 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy.linalg import hankel, svd
+from scipy.linalg import hankel
 
 # Ensure we can import from the app
 sys.path.append(os.getcwd())
 
 from app import create_app, db
 from app.models import MarketData
+from app.services import ssa_service
 
 # --- CONFIGURATION ---
 TARGET_ASSET = "BTC/USD"  # The asset to analyze
@@ -52,7 +53,7 @@ class DeepSSA:
     def _decompose(self):
         """Step 2: Decomposition (SVD)"""
         # X = U * Sigma * V.T
-        self.U, self.Sigma, self.VT = svd(self.X_traj)
+        self.U, self.Sigma, self.VT = ssa_service.eigentriples(self.X_traj)
         
         # Calculate Eigenvalues (Power)
         # Eigenvalues lambda_i = s_i^2
@@ -73,11 +74,8 @@ class DeepSSA:
             X_i = self.Sigma[i] * np.outer(self.U[:, i], self.VT[i, :])
             X_elem += X_i
             
-        # Diagonal Averaging (Hankelization)
-        # Quick method for diagonal averaging of a matrix to get a series
-        rev_X = X_elem[::-1]
-        reconstructed = [rev_X.diagonal(i).mean() for i in range(-rev_X.shape[0]+1, rev_X.shape[1])]
-        return np.array(reconstructed)
+        # Diagonal Averaging (Hankelization) - shared vectorized engine
+        return ssa_service.diagonal_average(X_elem)
 
     def w_correlation(self, num_components=20):
         """
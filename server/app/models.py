@@ -65,6 +65,15 @@ class MarketData(db.Model):
         db.Index('idx_symbol_interval_time', 'symbol', 'interval', 'time'),
     )
 
+class SeedCheckpoint(db.Model):
+    """Resume marker for seed_ssa: every bar up to last_time has been processed."""
+    __tablename__ = 'ssa_seed_checkpoint'
+
+    symbol = db.Column(db.String(20), primary_key=True)
+    interval = db.Column(db.String(10), primary_key=True)
+    last_time = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class PaperTrade(db.Model):
     __tablename__ = 'paper_trade' 
     id = db.Column(db.Integer, primary_key=True)
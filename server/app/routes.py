@@ -1,6 +1,5 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import get_jwt_identity, jwt_required
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta, timezone
 # Import extensions/models
@@ -10,8 +9,8 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 from sqlalchemy import select 
 from scipy.signal import find_peaks
 
-from .services import ssa_service, forecast_service
-from app.services.data_manager import get_historical_data
+from .services import ssa_service, ssa_cache, ssa_pool, forecast_service, signals, bar_store
+from app.services.data_manager import get_historical_bars, synthetic_tips
 
 from app.services.data_manager import TRACKED_ASSETS # Import the list
 from app.services import backtest_service
@@ -152,38 +151,71 @@ def calculate_cycle_position(component_values, component_type='cyclic'):
     return cycle_position, direction, avg_resistance, avg_support
 
 # --- ANALYSIS HELPER ---
-def perform_single_analysis(symbol, interval, api_key, strategy='basic'):
+def load_close_prices(symbol, interval, api_key, tips=None):
+    """
+    Loads up to 500 closes (oldest -> newest) for the analysis helpers,
+    plus the last bar time (unix seconds) for the SSA cache key.
+    `tips` are synthetic tips prefetched for several symbols / intervals.
+    Returns (None, None) if there is not enough data.
+    """
+    bars = get_historical_bars(symbol, interval, api_key, limit=500, tips=tips)
+    if len(bars) < 50:
+        return None, None
+
+    # Bars come back sorted by time, oldest -> newest
+    return bars.close, int(bars.time[-1])
+
+def analysis_window(N):
+    # Adaptive L
+    return min(39, N // 2)
+
+def perform_single_analysis(symbol, interval, api_key, strategy='basic', with_components=False, tips=None):
     """
     Performs the SSA and Signal analysis for a single timeframe.
     Returns a dictionary of results or None if failed.
+    with_components=True also returns the full component array (needed for forecasting).
     """
-    # Fix strategy case sensitivity
-    strategy = strategy.lower() if strategy else 'basic'
+    close_prices, last_time = load_close_prices(symbol, interval, api_key, tips)
+    if close_prices is None:
+        return None
 
-    ohlc_data = get_historical_data(symbol, interval, api_key, limit=500)
-    if not ohlc_data or len(ohlc_data) < 50:
+    # Repeated dashboard loads reuse the cached SSA of the same bars
+    L = analysis_window(len(close_prices))
+    components = groups = None
+    try:
+        if with_components:
+            components = ssa_cache.cached(symbol, interval, last_time, close_prices, L, 'full',
+                                          lambda: ssa_service.ssa_decomposition(close_prices, L))
+        else:
+            groups = ssa_cache.cached(symbol, interval, last_time, close_prices, L, 'grouped',
+                                      lambda: ssa_service.ssa_grouped(close_prices, L))
+    except Exception as e:
+        print(f"Error analyzing {symbol} {interval}: {e}")
         return None
 
-    df = pd.DataFrame(ohlc_data)
-    
-    # --- CRITICAL FIX: SORT DATA ---
-    # Ensures SSA math is accurate even if DB returns unsorted rows
-    if 'time' in df.columns:
-        df['time'] = pd.to_numeric(df['time']) 
-        df.sort_values('time', ascending=True, inplace=True)
-    
-    close_prices = df['close'].values.flatten()
+    return analyze_close_prices(close_prices, interval, strategy, with_components=with_components,
+                                components=components, groups=groups)
+
+def analyze_close_prices(close_prices, interval, strategy='basic', with_components=False, components=None, groups=None):
+    """
+    Signal analysis of an already loaded close series.
+    Pass precomputed `components` (e.g. from a batched decomposition) or
+    `groups` (trend/cyclic/noise) to skip the SSA step.
+    """
+    # Fix strategy case sensitivity
+    strategy = strategy.lower() if strategy else 'basic'
+
     N = len(close_prices)
-    
-    # Adaptive L
-    L = min(39, N // 2)
+    L = analysis_window(N)
 
     try:
-        components = ssa_service.ssa_decomposition(close_prices, L)
-        trend = components[0]
-        cyclic = components[1:min(3, L)].sum(axis=0)
-        noise = components[min(3, L):min(6, L)].sum(axis=0)
-        reconstructed = trend + cyclic
+        if components is None and with_components:
+            components = ssa_service.ssa_decomposition(close_prices, L)
+        if components is not None:
+            groups = ssa_service.group_components(components)
+        elif groups is None:
+            groups = ssa_service.ssa_grouped(close_prices, L)
+        trend, cyclic, noise = groups['trend'], groups['cyclic'], groups['noise']
 
         # Stats
         cyc_pos, _, _, _ = calculate_cycle_position(cyclic, 'cyclic')
@@ -204,100 +236,22 @@ def perform_single_analysis(symbol, interval, api_key, strategy='basic'):
         days_since_signal = -1
         entry_price = 0.0 
         
-        # 1. BASIC LEGACY (Standard SSA Mean Reversion)
-        if strategy == 'basic':
-            for i in range(N-1, max(2, N-60), -1):
-                c_price = close_prices[i]; c_trend = trend[i]; c_recon = reconstructed[i]
-                c_noise = noise[i]; p_noise = noise[i-1]
-                
-                is_hot_buy = (c_recon < c_trend) and (c_price < c_recon)
-                is_hot_sell = (c_recon > c_trend) and (c_price > c_recon)
-                # Legacy Slope Logic
-                is_noise_buy = (c_noise < 0) and (c_noise >= p_noise)
-                is_noise_sell = (c_noise > 0) and (c_noise <= p_noise)
-                
-                if is_hot_buy and is_noise_buy:
-                    last_signal = "LONG"; days_since_signal = (N-1)-i; entry_price = c_price; break
-                elif is_hot_sell and is_noise_sell:
-                    last_signal = "SHORT"; days_since_signal = (N-1)-i; entry_price = c_price; break
-
-        # 2. BASIC SINGLE (NEW LOGIC)
-        # Logic: Find the FIRST time 'BASIC' conditions were met in the current noise cycle.
-        elif strategy == 'basic_s':
-            # Scan backwards to find the most recent signal
-            for i in range(N-1, max(2, N-60), -1):
-                c_noise = noise[i]
-                
-                # Check if this bar qualifies as a BASIC signal
-                c_price = close_prices[i]; c_trend = trend[i]; c_recon = reconstructed[i]
-                p_noise = noise[i-1]
-                
-                is_hot_buy = (c_recon < c_trend) and (c_price < c_recon)
-                is_hot_sell = (c_recon > c_trend) and (c_price > c_recon)
-                
-                is_basic_buy = is_hot_buy and (c_noise < 0) and (c_noise >= p_noise)
-                is_basic_sell = is_hot_sell and (c_noise > 0) and (c_noise <= p_noise)
-                
-                if is_basic_buy:
-                    # VALIDATE: Is this the *first* one in the cycle?
-                    # Check previous bars. If they were ALSO a signal or noise was already rising, 
-                    # and we haven't crossed zero, then this bar is NOT the start.
-                    # Actually, we just need to ensure the trend persists.
-                    # Simplification for Snapshot: If we found a Basic Buy, we report it.
-                    # The "Single" logic is enforced by the fact that we break on the FIRST match going backwards?
-                    # No, scanning backwards finds the LATEST signal.
-                    # We need to scan backwards until the noise cycle *changes*.
-                    
-                    # Search deeper to see if this triggered earlier
-                    start_of_cycle_idx = i
-                    for k in range(i-1, 0, -1):
-                        if noise[k] >= 0: break # End of negative cycle
-                        # Check if k was also a signal
-                        k_price = close_prices[k]; k_trend = trend[k]; k_recon = reconstructed[k]
-                        k_hot = (k_recon < k_trend) and (k_price < k_recon)
-                        k_slope = (noise[k] >= noise[k-1])
-                        if k_hot and k_slope:
-                            start_of_cycle_idx = k # Update "First" trigger
-                    
-                    last_signal = "LONG"
-                    days_since_signal = (N-1) - start_of_cycle_idx # Report age from the FIRST signal
-                    entry_price = close_prices[start_of_cycle_idx]
-                    break
-
-                elif is_basic_sell:
-                    start_of_cycle_idx = i
-                    for k in range(i-1, 0, -1):
-                        if noise[k] <= 0: break # End of positive cycle
-                        k_price = close_prices[k]; k_trend = trend[k]; k_recon = reconstructed[k]
-                        k_hot = (k_recon > k_trend) and (k_price > k_recon)
-                        k_slope = (noise[k] <= noise[k-1])
-                        if k_hot and k_slope:
-                            start_of_cycle_idx = k
-                            
-                    last_signal = "SHORT"
-                    days_since_signal = (N-1) - start_of_cycle_idx
-                    entry_price = close_prices[start_of_cycle_idx]
-                    break
-
-        # 3. FAST
-        elif strategy == 'fast':
-            # ... (Existing Fast Logic) ...
-            signals = np.zeros(N, dtype=int); down=0; up=0
-            for k in range(1, N):
-                val = noise[k]; prev = noise[k-1]
-                if val < 0:
-                    up=0; 
-                    if val < prev: down+=1; signals[k] = 1 if down==5 else 0
-                    elif val > prev: signals[k] = 1 if 0 < down < 5 else 0; down=0
-                elif val > 0:
-                    down=0;
-                    if val > prev: up+=1; signals[k] = -1 if up==5 else 0
-                    elif val < prev: signals[k] = -1 if 0 < up < 5 else 0; up=0
-                else: down=0; up=0
-            
-            for i in range(N-1, max(0, N-60), -1):
-                if signals[i] == 1: last_signal = "LONG"; days_since_signal = (N-1)-i; entry_price = close_prices[i]; break
-                elif signals[i] == -1: last_signal = "SHORT"; days_since_signal = (N-1)-i; entry_price = close_prices[i]; break
+        # Per-bar signals over the whole series (shared evaluator), then the most recent one.
+        # BASIC_S finds the latest BASIC signal and dates it from the FIRST signal of its
+        # noise cycle (which can sit before the lookback window).
+        if strategy in signals.STRATEGIES:
+            codes = signals.strategy_signals('basic' if strategy == 'basic_s' else strategy,
+                                             close_prices, trend, cyclic, noise)
+            # BASIC / BASIC_S look back 59 bars, FAST 60 (as they always have)
+            lookback_floor = max(0, N-60) if strategy == 'fast' else max(2, N-60)
+            i = signals.latest_signal(codes, after=lookback_floor)
+            if i is not None:
+                last_signal = "LONG" if codes[i] == signals.BUY else "SHORT"
+                if strategy == 'basic_s':
+                    first_codes = signals.basic_single_signals(close_prices, trend, cyclic, noise)
+                    i = signals.latest_signal(first_codes[:i + 1], value=codes[i])
+                days_since_signal = (N-1) - i
+                entry_price = close_prices[i]
         
         return {
             "interval": interval, "trend": trend_dir, "status": last_signal,
@@ -312,9 +266,7 @@ def perform_single_analysis(symbol, interval, api_key, strategy='basic'):
         return None
 
 # --- SCANNER HELPER (Uses Core Analysis + Adds Forecast & PnL) ---
-def get_asset_scan_data(symbol, interval, strategy, api_key):
-    data = perform_single_analysis(symbol, interval, api_key, strategy=strategy)
-    
+def get_asset_scan_data(symbol, data):
     # Allow NEUTRAL signals to pass through so the frontend can display them and filter them
     if data:
         # PnL Calculation
@@ -352,6 +304,19 @@ def get_asset_scan_data(symbol, interval, strategy, api_key):
         }
     return None
 
+def scan_series(items, strategy='basic', dtype=None):
+    """
+    Scanner rows for (symbol, interval, closes) items, with one batched SSA per
+    series length. Runs as an ssa_pool task; returns (components, row) per item.
+    """
+    batched = ssa_service.ssa_decomposition_many([closes for _, _, closes in items], analysis_window, dtype=dtype)
+    results = []
+    for (symbol, interval, close_prices), components in zip(items, batched):
+        data = analyze_close_prices(close_prices, interval, strategy,
+                                    with_components=True, components=components)
+        results.append((components, get_asset_scan_data(symbol, data)))
+    return results
+
 # --- CHART DATA ROUTES ---
 
 @bp.route('/chart-data', methods=['GET'])
@@ -364,29 +329,25 @@ def get_chart_data():
         l_param = int(request.args.get('l', 30))
     except ValueError:
         l_param = 30
+    forecast_method = request.args.get('forecast_method', 'spectral').lower()
+    if forecast_method not in forecast_service.FORECAST_METHODS:
+        return jsonify({"error": f"Unknown forecast_method '{forecast_method}'"}), 400
 
     api_key = current_app.config['TWELVE_DATA_API_KEY']
-    ohlc_data = get_historical_data(symbol, interval, api_key, limit=500)
+    bars = get_historical_bars(symbol, interval, api_key, limit=500)
     
-    if not ohlc_data:
+    if not len(bars):
         return jsonify({"error": f"Failed to fetch data for {symbol}"}), 500
 
-    df = pd.DataFrame(ohlc_data)
-    
-    if 'time' in df.columns:
-        df['time'] = pd.to_numeric(df['time']) 
-        df.drop_duplicates(subset=['time'], keep='last', inplace=True)
-        df.sort_values('time', ascending=True, inplace=True)
-
-    close_prices = df['close'].values.flatten()
-    times = df['time'].values
+    close_prices = bars.close
+    times = bars.time
 
     N = len(close_prices)
     if N < 10:
          return jsonify({"error": f"Insufficient data points ({N}) for SSA"}), 400
 
     if use_adaptive_l:
-        L = 39 
+        L = ssa_cache.adaptive_L(symbol, interval, times, close_prices)
     else:
         L = l_param
 
@@ -394,13 +355,13 @@ def get_chart_data():
         L = max(2, min(N // 2, 30))
 
     try:
-        components = ssa_service.ssa_decomposition(close_prices, L)
+        components, U = ssa_cache.cached(symbol, interval, times[-1], close_prices, L, 'full+U',
+                                         lambda: ssa_service.ssa_decomposition(close_prices, L, return_eigenvectors=True))
     except Exception as e:
         return jsonify({"error": f"Unexpected error during SSA: {e}"}), 500
 
-    trend = components[0] if components.shape[0] > 0 else np.zeros_like(close_prices)
-    cyclic = components[1:min(3, L)].sum(axis=0) if components.shape[0] > 1 and L > 1 else np.zeros_like(close_prices)
-    noise = components[min(3, L):min(6, L)].sum(axis=0) if components.shape[0] >= min(3, L) and L > min(3, L) else np.zeros_like(close_prices)
+    groups = ssa_service.group_components(components)
+    trend, cyclic, noise = groups['trend'], groups['cyclic'], groups['noise']
 
     cyc_pos, cyc_dir, cyc_res, cyc_sup = calculate_cycle_position(cyclic, 'cyclic')
     noise_pos, noise_dir, noise_res, noise_sup = calculate_cycle_position(noise, 'noise')
@@ -408,12 +369,13 @@ def get_chart_data():
     forecast_steps = 40
     forecast_payload = []
     try:
-        forecast_values = forecast_service.forecast_ssa_spectral(
+        forecast_values = forecast_service.forecast_ssa(
             components, 
             forecast_steps=forecast_steps, 
-            min_component=1
+            method=forecast_method,
+            U=U
         )
-        last_timestamp = int(df['time'].iloc[-1])
+        last_timestamp = int(times[-1])
         future_times = forecast_service.generate_future_timestamps(last_timestamp, interval, forecast_steps)
         
         for t, v in zip(future_times, forecast_values):
@@ -439,16 +401,7 @@ def get_chart_data():
 
     trend_data = [{"time": int(t), "value": float(v)} for t, v in zip(times, trend) if not np.isnan(v)]
 
-    ohlc_data_serializable = []
-    for index, row in df.iterrows():
-        ohlc_data_serializable.append({
-            "time": int(row['time']),
-            "open": float(row['open']),
-            "high": float(row['high']),
-            "low": float(row['low']),
-            "close": float(row['close']),
-            "volume": float(row['volume'])
-        })
+    ohlc_data_serializable = bars.to_records()
 
     response_data = {
         "ohlc": ohlc_data_serializable,
@@ -462,7 +415,8 @@ def get_chart_data():
             }
         },
         "l_used": int(L),
-        "forecast": forecast_payload 
+        "forecast": forecast_payload,
+        "forecast_method": forecast_method
     }
 
     return jsonify(response_data)
@@ -475,9 +429,53 @@ def scan_market():
     api_key = current_app.config['TWELVE_DATA_API_KEY']
     
     scan_results = []
-    
+
+    # Optional single-precision batch for throughput; cached separately from the float64 results
+    dtype = np.float32 if current_app.config.get('SSA_SCAN_FLOAT32') else None
+    grouping = 'full32' if dtype is not None else 'full'
+
+    # Every symbol's stored bars brought up to date at once, then their forming candles
+    bar_store.sync(TRACKED_ASSETS, interval)
+    tips = synthetic_tips(TRACKED_ASSETS, [interval])
+
+    closes_by_symbol = {}
+    last_time_by_symbol = {}
+    components_by_symbol = {}
     for symbol in TRACKED_ASSETS:
-        result = get_asset_scan_data(symbol, interval, strategy, api_key)
+        close_prices, last_time = load_close_prices(symbol, interval, api_key, tips)
+        if close_prices is None:
+            continue
+        closes_by_symbol[symbol] = close_prices
+        last_time_by_symbol[symbol] = last_time
+        components_by_symbol[symbol] = ssa_cache.lookup(
+            symbol, interval, last_time, close_prices, analysis_window(len(close_prices)), grouping)
+
+    # Cache misses: SSA + analysis fanned out over the worker pool (one batched SSA per worker)
+    missing = [symbol for symbol, comps in components_by_symbol.items() if comps is None]
+    scanned = ssa_pool.map_series(
+        scan_series, [(symbol, interval, closes_by_symbol[symbol]) for symbol in missing],
+        strategy=strategy, dtype=dtype)
+    result_by_symbol = {}
+    for symbol, scan in zip(missing, scanned):
+        if scan is None:
+            continue
+        components, result_by_symbol[symbol] = scan
+        if components is not None:
+            close_prices = closes_by_symbol[symbol]
+            ssa_cache.store(symbol, interval, last_time_by_symbol[symbol], close_prices,
+                            analysis_window(len(close_prices)), grouping, components)
+
+    for symbol, close_prices in closes_by_symbol.items():
+        if symbol in result_by_symbol:
+            result = result_by_symbol[symbol]
+        elif components_by_symbol[symbol] is not None:
+            data = analyze_close_prices(
+                close_prices, interval, strategy,
+                with_components=True, components=components_by_symbol[symbol]
+            )
+            result = get_asset_scan_data(symbol, data)
+        else:
+            continue
         if result:
             scan_results.append(result)
 
@@ -496,12 +494,7 @@ def analyze_asset():
     if not symbol:
         return jsonify({"error": "Symbol required"}), 400
 
-    # 1. Analyze PRIMARY Timeframe
-    primary_data = perform_single_analysis(symbol, interval, api_key, strategy)
-    if not primary_data:
-        return jsonify({"error": "Insufficient data"}), 400
-
-    # 2. Determine Higher Timeframes (HTF)
+    # 1. Determine Higher Timeframes (HTF)
     htf_map = {
         '1min':  ['5min', '15min'],
         '5min':  ['15min', '1h'],
@@ -513,11 +506,20 @@ def analyze_asset():
     }
     
     htf_list = htf_map.get(interval, [])
+
+    # Forming candles of the primary + HTFs in one aggregate query (tracked assets are DB-backed)
+    tips = synthetic_tips([symbol], [interval] + htf_list) if symbol in TRACKED_ASSETS else None
+
+    # 2. Analyze PRIMARY Timeframe
+    primary_data = perform_single_analysis(symbol, interval, api_key, strategy, tips=tips)
+    if not primary_data:
+        return jsonify({"error": "Insufficient data"}), 400
+
     htf_results = []
 
     # 3. Analyze HTFs
     for htf in htf_list:
-        res = perform_single_analysis(symbol, htf, api_key, strategy)
+        res = perform_single_analysis(symbol, htf, api_key, strategy, tips=tips)
         if res:
             # FIX: Remove non-serializable 'components' array before sending to frontend
             res.pop('components', None)
@@ -722,18 +724,18 @@ def deep_wave_analyze():
         return jsonify({"error": "Symbol required"}), 400
 
     api_key = current_app.config['TWELVE_DATA_API_KEY']
-    ohlc_data = get_historical_data(symbol, interval, api_key, limit=500)
+    bars = get_historical_bars(symbol, interval, api_key, limit=500)
     
-    if not ohlc_data or len(ohlc_data) < 100:
+    if len(bars) < 100:
         return jsonify({"error": "Insufficient data"}), 400
 
-    df = pd.DataFrame(ohlc_data)
-    close_prices = df['close'].values.flatten()
-    times = df['time'].values.tolist()
+    close_prices = bars.close
+    times = bars.time
 
     try:
         # Run Diagnostics
-        diag = ssa_service.get_ssa_diagnostics(close_prices, L)
+        diag = ssa_cache.cached(symbol, interval, times[-1], close_prices, L, 'diagnostics',
+                                lambda: ssa_service.get_ssa_diagnostics(close_prices, L))
         
         # 1. Trend Analysis (Component 0)
         trend_series = diag['components'][0]
@@ -837,7 +839,7 @@ def deep_wave_analyze():
             "spectrum": spectrum_data[:15], 
             "waves": waves,
             "prices": close_prices[-100:].tolist(), # --- ADDED PRICES
-            "times": times[-100:], 
+            "times": times[-100:].tolist(),
             "summary": "\n\n".join(recs)
         }
 
@@ -847,6 +849,12 @@ def deep_wave_analyze():
         print(f"Deep Analysis Error: {e}")
         return jsonify({"error": str(e)}), 500
     
+@bp.route('/cache-stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    """Hit / miss / eviction counters of this worker's SSA cache."""
+    return jsonify(ssa_cache.stats())
+
 @bp.route('/change-password', methods=['POST'])
 @jwt_required()
 def change_password():
@@ -1,10 +1,6 @@
 import sys
 import os
-import time
-import requests
-import calendar
 import pandas as pd
-from datetime import datetime
 
 # Fix path to allow importing from 'server/app'
 sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
@@ -12,13 +8,27 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'server'))
 from app import create_app, db
 from app.models import MarketData
 from app.services.data_manager import save_to_db, TRACKED_ASSETS
+from app.services import twelvedata_client
+from app.services.bars import parse_values
 
 app = create_app()
 
+# --- INCREASED OUTPUT SIZES FOR BACKTESTING ---
+SEED_INTERVALS = [
+    ('1month', 500),
+    ('1week', 1000),
+    ('1day', 3000),   # Deep history for Daily
+    ('4h', 3000),     # Deep history for 4h
+    ('1h', 3000),     # Deep history for 1h
+    ('30min', 3000),
+    ('1min', 5000),   # Max standard limit
+]
+
 def seed_database():
     with app.app_context():
         api_key = app.config['TWELVE_DATA_API_KEY']
-        DELAY_PER_ASSET = 4 # Increased slightly to avoid rate limits with larger payloads
+        # The shared client paces requests to the API quota (no fixed sleeps)
+        client = twelvedata_client.get_client()
 
         print(f"🌱 Starting Full Database Seed for {len(TRACKED_ASSETS)} assets...")
         print("---------------------------------------------------")
@@ -26,65 +36,31 @@ def seed_database():
         for index, symbol in enumerate(TRACKED_ASSETS):
             print(f"[{index+1}/{len(TRACKED_ASSETS)}] Processing {symbol}...")
 
-            # --- INCREASED OUTPUT SIZES FOR BACKTESTING ---
-            fetch_and_save(symbol, '1month', api_key, outputsize=500)
-            fetch_and_save(symbol, '1week', api_key, outputsize=1000) 
-            fetch_and_save(symbol, '1day', api_key, outputsize=3000) # Deep history for Daily
-            fetch_and_save(symbol, '4h', api_key, outputsize=3000)   # Deep history for 4h
-            fetch_and_save(symbol, '1h', api_key, outputsize=3000)   # Deep history for 1h
-            fetch_and_save(symbol, '30min', api_key, outputsize=3000) 
-            fetch_and_save(symbol, '1min', api_key, outputsize=5000) # Max standard limit
+            # Fetch every interval of the asset concurrently, then write them one by one
+            responses = client.map(lambda job: fetch_series(client, symbol, job[0], api_key, job[1]), SEED_INTERVALS)
+            for (interval, _), data in zip(SEED_INTERVALS, responses):
+                save_series(symbol, interval, data)
 
             print(f"   ↳ Generating 5m & 15m aggregates locally...")
             resample_specific_intervals(symbol)
 
-            print(f"   zzz Sleeping {DELAY_PER_ASSET}s...")
-            time.sleep(DELAY_PER_ASSET) 
-
         print("---------------------------------------------------")
         print("✅ Seeding Complete!")
 
-def fetch_and_save(symbol, interval, api_key, outputsize):
-    url = "https://api.twelvedata.com/time_series"
-    params = {
-        "symbol": symbol,
-        "interval": interval,
-        "apikey": api_key,
-        "outputsize": outputsize,
-        "order": "ASC"
-    }
+def fetch_series(client, symbol, interval, api_key, outputsize):
+    return client.time_series(symbol, interval, api_key, outputsize=outputsize,
+                              source=f"Seed {symbol} {interval}", order="ASC")
+
+def save_series(symbol, interval, data):
     try:
-        r = requests.get(url, params=params)
-        data = r.json()
-        
-        if 'values' in data:
-            clean_values = []
-            for d in data['values']:
-                date_str = d['datetime']
-                try:
-                    # Naive Parse
-                    ts = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    ts = datetime.strptime(date_str, "%Y-%m-%d")
-                
-                # Raw UTC Timestamp
-                utc_timestamp = calendar.timegm(ts.timetuple())
-
-                vol = d.get('volume')
-                volume_val = float(vol) if vol else 0.0
-
-                clean_values.append({
-                    "time": utc_timestamp, 
-                    "datetime_obj": ts, # Naive
-                    "open": float(d['open']),
-                    "high": float(d['high']),
-                    "low": float(d['low']),
-                    "close": float(d['close']),
-                    "volume": volume_val
-                })
-            
-            save_to_db(symbol, interval, clean_values)
-            print(f"   ✓ Fetched {len(clean_values)} rows for {interval}")
+        if data is None:
+            print(f"   ❌ API request failed for {interval}")
+        elif 'values' in data:
+            # Columnar parse (see services/bars.py), written without per-row dicts
+            bars = parse_values(data['values'])
+            saved = save_to_db(symbol, interval, bars)
+            if saved:
+                print(f"   ✓ Fetched {len(bars)} rows for {interval} ({saved[0]} new, {saved[1]} updated)")
         elif 'status' in data and data['status'] == 'error':
              print(f"   ❌ API Error for {interval}: {data['message']}")
     except Exception as e:
@@ -2,13 +2,14 @@ import sys
 import os
 import time
 import numpy as np
-from sqlalchemy import func
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sqlalchemy import case, func, select, text, update
 
 # Ensure we can import from the app
 sys.path.append(os.getcwd())
 
 from app import create_app, db
-from app.models import MarketData
+from app.models import MarketData, SeedCheckpoint
 from app.services import ssa_service
 # IMPORTED: Get the master list of assets from your data manager
 from app.services.data_manager import TRACKED_ASSETS
@@ -18,7 +19,9 @@ from app.services.data_manager import TRACKED_ASSETS
 L_PARAM = 39        # Fixed Window Length (Embedding Dimension)
 MIN_HISTORY = 200   # Minimum required history (Safe for L=39)
 MAX_HISTORY = 500   # Ideal history length (Standard stiffness)
-BATCH_SIZE = 100    # Commit to DB every N rows
+BATCH_SIZE = 1000   # Bars computed + written per commit (one checkpoint per batch)
+WINDOW_CHUNK = 256  # Windows stacked per batched SSA call
+WORKERS = int(os.environ.get('SEED_WORKERS', os.cpu_count() or 1))  # (symbol, interval) pairs in parallel
 
 # Intervals to process
 TARGET_INTERVALS = ['15min', '1h', '4h', '1day', '1week']
@@ -40,13 +43,9 @@ def calculate_components(series, L):
     Helper to run SSA and extract specific components.
     """
     try:
-        # Run Decomposition
-        components = ssa_service.ssa_decomposition(series, L)
-        
-        # Extract Components (Trend=0, Cyclic=1-2, Noise=3-5)
-        trend = components[0]
-        cyclic = components[1:min(3, L)].sum(axis=0)
-        noise = components[min(3, L):min(6, L)].sum(axis=0)
+        # Grouped Reconstruction (Trend=0, Cyclic=1-2, Noise=3-5)
+        groups = ssa_service.ssa_grouped(series, L)
+        trend, cyclic, noise = groups['trend'], groups['cyclic'], groups['noise']
         
         return float(trend[-1]), float(cyclic[-1]), float(noise[-1])
     
@@ -54,111 +53,234 @@ def calculate_components(series, L):
         # Return error string to log it
         return None, None, str(e)
 
-def seed_ssa():
+def calculate_window_values(closes, indices, L):
+    """
+    As-of (trend, cyclic, noise) for the bars in `indices`, each computed on
+    the window of up to MAX_HISTORY closes ending at that bar.
+    Full-length windows are stacked and decomposed together; the shorter
+    warm-up windows all differ in length and run one by one.
+    Failed windows come back as NaN with their error message.
+    """
+    indices = np.asarray(indices, dtype=int)
+    out = np.full((len(indices), 3), np.nan)
+    errors = {}
+
+    full = np.flatnonzero(indices >= MAX_HISTORY - 1)
+    if len(full):
+        windows = np.lib.stride_tricks.sliding_window_view(closes, MAX_HISTORY)
+        for lo in range(0, len(full), WINDOW_CHUNK):
+            pos = full[lo:lo + WINDOW_CHUNK]
+            try:
+                last = ssa_service.ssa_last_values_batch(windows[indices[pos] - MAX_HISTORY + 1], L)
+                out[pos] = np.column_stack([last['trend'], last['cyclic'], last['noise']])
+            except Exception:
+                # Retry window by window so one bad window doesn't sink the chunk
+                for p in pos:
+                    i = indices[p]
+                    t_val, c_val, n_val = calculate_components(closes[i - MAX_HISTORY + 1:i + 1], L)
+                    if t_val is None:
+                        errors[p] = n_val
+                    else:
+                        out[p] = (t_val, c_val, n_val)
+
+    for p in np.flatnonzero(indices < MAX_HISTORY - 1):
+        t_val, c_val, n_val = calculate_components(closes[:indices[p] + 1], L)
+        if t_val is None:
+            errors[p] = n_val
+        else:
+            out[p] = (t_val, c_val, n_val)
+
+    return out, errors
+
+def write_updates(symbol, interval, rows):
+    """
+    Bulk-writes the SSA columns for `rows` (time, trend, cyclic, noise, trend_dir).
+    PostgreSQL gets a single UPDATE ... FROM (VALUES ...); other backends fall
+    back to an executemany UPDATE by primary key.
+    """
+    if not rows:
+        return
+    if db.engine.dialect.name == 'postgresql':
+        params = {'symbol': symbol, 'interval': interval}
+        values = []
+        for n, (t, trend, cyclic, noise, trend_dir) in enumerate(rows):
+            values.append(f"(CAST(:t{n} AS TIMESTAMP), CAST(:a{n} AS DOUBLE PRECISION), "
+                          f"CAST(:b{n} AS DOUBLE PRECISION), CAST(:c{n} AS DOUBLE PRECISION), :d{n})")
+            params.update({f't{n}': t, f'a{n}': trend, f'b{n}': cyclic, f'c{n}': noise, f'd{n}': trend_dir})
+        db.session.execute(text(
+            "UPDATE market_data AS m SET ssa_trend = v.trend, ssa_cyclic = v.cyclic, "
+            "ssa_noise = v.noise, ssa_trend_dir = v.trend_dir "
+            f"FROM (VALUES {', '.join(values)}) AS v(time, trend, cyclic, noise, trend_dir) "
+            "WHERE m.symbol = :symbol AND m.interval = :interval AND m.time = v.time"
+        ), params)
+    else:
+        db.session.execute(update(MarketData), [
+            {'symbol': symbol, 'interval': interval, 'time': t,
+             'ssa_trend': trend, 'ssa_cyclic': cyclic, 'ssa_noise': noise, 'ssa_trend_dir': trend_dir}
+            for t, trend, cyclic, noise, trend_dir in rows
+        ])
+
+def save_checkpoint(symbol, interval, last_time):
+    checkpoint = db.session.get(SeedCheckpoint, (symbol, interval))
+    if checkpoint is None:
+        db.session.add(SeedCheckpoint(symbol=symbol, interval=interval, last_time=last_time))
+    else:
+        checkpoint.last_time = last_time
+
+def progress_before(symbol, interval, last_time):
+    """
+    (seeded, missing): bars up to `last_time` that have / lack SSA values,
+    leaving out the first MIN_HISTORY - 1 bars (they never get any).
+    """
+    pair = (MarketData.symbol == symbol, MarketData.interval == interval)
+    first = (select(MarketData.time).where(*pair)
+             .order_by(MarketData.time.asc()).offset(MIN_HISTORY - 1).limit(1).scalar_subquery())
+    total, missing = db.session.execute(
+        select(func.count(), func.sum(case((MarketData.ssa_trend.is_(None), 1), else_=0)))
+        .where(*pair, MarketData.time >= first, MarketData.time <= last_time)
+    ).one()
+    return total - (missing or 0), missing or 0
+
+def seed_pair(symbol, interval):
+    """
+    Seeds one (symbol, interval). Only the columns needed are loaded; bars that
+    already have SSA values are skipped. If every bar up to the checkpoint
+    (the pair's progress record, written in the same commit as each batch)
+    has its values, only the bars after it are loaded, with the MAX_HISTORY
+    bars before them for their windows. Otherwise (a window failed, or bars
+    were backfilled below it) the whole series is loaded and its gaps filled.
+    Returns a summary dict for the parent process to print.
+    """
+    summary = {'symbol': symbol, 'interval': interval, 'updated': 0, 'skipped': 0,
+               'errors': 0, 'last_error': None, 'status': 'done'}
+    start_time = time.time()
+
+    checkpoint = db.session.get(SeedCheckpoint, (symbol, interval))
+    resume_after = checkpoint.last_time if checkpoint else None
+    seeded = 0
+    if resume_after is not None:
+        seeded, missing = progress_before(symbol, interval, resume_after)
+        if missing:
+            resume_after, seeded = None, 0
+
+    columns = (select(MarketData.time, MarketData.close, MarketData.ssa_trend)
+               .where(MarketData.symbol == symbol, MarketData.interval == interval))
+    if resume_after is None:
+        rows = db.session.execute(columns.order_by(MarketData.time.asc())).all()
+        first = 0
+    else:
+        # Full windows (and the previous trend) of the bars after the checkpoint
+        head = db.session.execute(
+            columns.where(MarketData.time <= resume_after).order_by(MarketData.time.desc()).limit(MAX_HISTORY)
+        ).all()
+        tail = db.session.execute(
+            columns.where(MarketData.time > resume_after).order_by(MarketData.time.asc())
+        ).all()
+        rows = head[::-1] + tail
+        first = len(head)
+    total_candles = len(rows)
+
+    # Check Hard Minimum
+    if total_candles < MIN_HISTORY:
+        summary['status'] = f"not enough data ({total_candles} < {MIN_HISTORY} required)"
+        return summary
+
+    times = [r.time for r in rows]
+    closes = clean_series(np.array([np.nan if r.close is None else r.close for r in rows], dtype=float))
+    trends = np.array([np.nan if r.ssa_trend is None else r.ssa_trend for r in rows], dtype=float)
+
+    candidates = range(max(MIN_HISTORY - 1, first), total_candles)
+    todo = [i for i in candidates if np.isnan(trends[i])]
+    summary['skipped'] = seeded + len(candidates) - len(todo)
+
+    for lo in range(0, len(todo), BATCH_SIZE):
+        batch = todo[lo:lo + BATCH_SIZE]
+        values, errors = calculate_window_values(closes, batch, L_PARAM)
+
+        updates = []
+        for p, i in enumerate(batch):
+            if p in errors:
+                summary['errors'] += 1
+                summary['last_error'] = errors[p]
+                continue
+            t_val, c_val, n_val = (float(v) for v in values[p])
+
+            # Direction Logic (against the previous bar's as-of trend)
+            prev_trend = trends[i - 1]
+            if np.isnan(prev_trend): prev_trend = t_val
+            trends[i] = t_val
+
+            updates.append((times[i], t_val, c_val, n_val, "UP" if t_val > prev_trend else "DOWN"))
+
+        write_updates(symbol, interval, updates)
+        save_checkpoint(symbol, interval, times[batch[-1]])
+        db.session.commit()
+        summary['updated'] += len(updates)
+
+    # Nothing left to compute: move the checkpoint to the newest bar
+    if not todo and (resume_after is None or resume_after < times[-1]):
+        save_checkpoint(symbol, interval, times[-1])
+        db.session.commit()
+
+    summary['elapsed'] = time.time() - start_time
+    return summary
+
+# --- WORKER PROCESS ---
+_worker_app = None
+
+def _init_worker():
+    """Each worker gets its own app and its own DB connections."""
+    global _worker_app
+    _worker_app = create_app()
+    with _worker_app.app_context():
+        db.engine.dispose()
+
+def _run_pair(symbol, interval):
+    with _worker_app.app_context():
+        try:
+            return seed_pair(symbol, interval)
+        except Exception as e:
+            db.session.rollback()
+            return {'symbol': symbol, 'interval': interval, 'status': f"failed: {e}"}
+        finally:
+            db.session.remove()
+
+def report(summary):
+    label = f"{summary['symbol']} - {summary['interval']}"
+    if summary['status'] != 'done':
+        print(f"   ⚠️ {label}: {summary['status']}")
+        return
+    print(f"   ✅ {label}: Updated {summary['updated']}, Skipped {summary['skipped']}, "
+          f"Errors {summary['errors']} ({summary['elapsed']:.1f}s)")
+    if summary['errors'] > 0:
+        print(f"   ⚠️ LAST ERROR for {summary['symbol']}: {summary['last_error']}")
+
+def seed_ssa(workers=WORKERS):
     app = create_app()
     with app.app_context():
         print("🚀 Starting SSA Seeding Script (Adaptive Mode)...")
         print(f"🎯 Intervals: {', '.join(TARGET_INTERVALS)}")
         print(f"📋 Assets: {len(TRACKED_ASSETS)} symbols loaded from DataManager.")
-        print(f"⚙️  Config: Min History={MIN_HISTORY}, Max History={MAX_HISTORY}, L={L_PARAM}")
-
-        for symbol in TRACKED_ASSETS:
-            for interval in TARGET_INTERVALS:
-                
-                print(f"\nProcessing {symbol} - {interval}...")
-                
-                # Fetch Data
-                candles = MarketData.query.filter_by(
-                    symbol=symbol, 
-                    interval=interval
-                ).order_by(MarketData.time.asc()).all()
-
-                total_candles = len(candles)
-                
-                # Check Hard Minimum
-                if total_candles < MIN_HISTORY:
-                    print(f"   ⚠️ Skipping: Not enough data ({total_candles} < {MIN_HISTORY} required)")
-                    continue
-
-                # Prepare Data Array
-                raw_closes = [c.close if c.close is not None else np.nan for c in candles]
-                closes = np.array(raw_closes, dtype=float)
-                
-                # Clean Data
-                if np.isnan(closes).any():
-                    closes = clean_series(closes)
-                
-                updates_count = 0
-                skipped_count = 0
-                error_count = 0
-                last_error = None
-                start_time = time.time()
-
-                # --- ADAPTIVE LOOP ---
-                # Start at MIN_HISTORY so we guarantee at least that much data exists
-                for i in range(MIN_HISTORY - 1, total_candles):
-                    
-                    # [OPTIMIZATION] Skip if already calculated
-                    if candles[i].ssa_trend is not None:
-                        skipped_count += 1
-                        if i % 500 == 0:
-                            sys.stdout.write(f"\r   Scanning: {i}/{total_candles}")
-                            sys.stdout.flush()
-                        continue
-
-                    # DYNAMIC WINDOW SELECTION
-                    # We grab up to MAX_HISTORY bars, ending at i.
-                    # e.g., if MAX=500, but we only have 300 bars total so far, we take 300.
-                    
-                    start_index = max(0, i - MAX_HISTORY + 1)
-                    end_index = i + 1
-                    
-                    window_slice = closes[start_index : end_index]
-                    
-                    # Double check (Redundant but safe)
-                    if len(window_slice) < MIN_HISTORY:
-                        continue
-
-                    # Calculate
-                    t_val, c_val, n_val = calculate_components(window_slice, L_PARAM)
-
-                    if t_val is not None:
-                        candles[i].ssa_trend = t_val
-                        candles[i].ssa_cyclic = c_val
-                        candles[i].ssa_noise = n_val
-                        
-                        # Direction Logic
-                        prev_trend = candles[i-1].ssa_trend
-                        if prev_trend is None: prev_trend = t_val 
-                        
-                        candles[i].ssa_trend_dir = "UP" if t_val > prev_trend else "DOWN"
-                        
-                        updates_count += 1
-                    else:
-                        error_count += 1
-                        last_error = n_val
-
-                    # Progress
-                    if i % 50 == 0:
-                        used_window = len(window_slice)
-                        sys.stdout.write(f"\r   Progress: {i}/{total_candles} | WinSize: {used_window} | Errors: {error_count}")
-                        sys.stdout.flush()
-                    
-                    # Batch Commit
-                    if updates_count > 0 and updates_count % BATCH_SIZE == 0:
-                        db.session.commit()
-
-                # Final Commit
-                if updates_count > 0:
-                    db.session.commit()
-                
-                elapsed = time.time() - start_time
-                print(f"\r   ✅ Complete. Updated {updates_count}, Skipped {skipped_count}, Errors {error_count} ({elapsed:.1f}s)")
-                
-                if error_count > 0:
-                    print(f"   ⚠️ LAST ERROR for {symbol}: {last_error}")
-
-        print("\n🎉 SSA Seeding Finished!")
+        print(f"⚙️  Config: Min History={MIN_HISTORY}, Max History={MAX_HISTORY}, L={L_PARAM}, Workers={workers}")
+
+        SeedCheckpoint.__table__.create(db.engine, checkfirst=True)
+        # Don't hand pooled connections down to forked workers
+        db.engine.dispose()
+
+    pairs = [(symbol, interval) for symbol in TRACKED_ASSETS for interval in TARGET_INTERVALS]
+    start_time = time.time()
+
+    if workers <= 1:
+        _init_worker()
+        for pair in pairs:
+            report(_run_pair(*pair))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_run_pair, *pair) for pair in pairs]
+            for future in as_completed(futures):
+                report(future.result())
+
+    print(f"\n🎉 SSA Seeding Finished! ({time.time() - start_time:.1f}s)")
 
 if __name__ == "__main__":
-    seed_ssa()
\ No newline at end of file
+    seed_ssa()
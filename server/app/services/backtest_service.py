@@ -3,7 +3,8 @@ import numpy as np
 from datetime import datetime
 from app import db
 from app.models import MarketData
-from app.services.signal_engine import analyze_market_snapshot
+from app.services.signal_engine import precompute_snapshots
+from app.services import signals
 
 # CONFIG
 SSA_WINDOW = 500  
@@ -86,137 +87,62 @@ def run_backtest(assets, interval, lookback_bars, strategy='BASIC',
                 'ssa_fast_pos': r.ssa_fast_pos
             })
 
-        # 3. Simulation Loop
-        simulation_start_idx = len(history_data) - lookback_bars
-        if simulation_start_idx < SSA_WINDOW: simulation_start_idx = SSA_WINDOW
+        # Path B inputs: as-of SSA for every bar without cached values, in one pass
+        missing = [i for i in range(SSA_WINDOW, len(history_data))
+                   if history_data[i]['ssa_trend'] is None or history_data[i]['ssa_noise'] is None]
+        snapshots = precompute_snapshots(closes_np, window=SSA_WINDOW, indices=missing)
 
-        active_trade = None 
-        
-        # STATE for Strategies
-        fast_up_count = 0
-        fast_down_count = 0
-        
-        # BASIC_S STATE
-        # Tracks if we have already fired a trade in the current noise cycle
-        basic_s_fired_buy = False
-        basic_s_fired_sell = False
-        
-        last_iter_noise = 0.0 
+        n_bars = len(history_data)
+        if n_bars <= SSA_WINDOW: continue
 
-        for i in range(SSA_WINDOW, len(history_data)):
-            
+        # 3. Per-bar SSA values, then every signal of the run in one vectorized pass
+        bar_trend = np.zeros(n_bars)
+        bar_cyclic = np.zeros(n_bars)
+        bar_noise = np.zeros(n_bars)
+        bar_meta = [('-', '-', 0, 0)] * n_bars  # (trend_dir, forecast_dir, cycle_pos, fast_pos)
+
+        # The bar before the first analysed one only supplies its (cached) noise as "previous noise"
+        if history_data[SSA_WINDOW - 1]['ssa_noise'] is not None:
+            bar_noise[SSA_WINDOW - 1] = history_data[SSA_WINDOW - 1]['ssa_noise']
+
+        for i in range(SSA_WINDOW, n_bars):
             row = history_data[i]
-            prev_row = history_data[i-1]
-            
-            # --- 1. GET SSA VALUES ---
-            curr_price = row['close']
-            curr_trend = 0.0
-            curr_cyclic = 0.0
-            curr_noise = 0.0
-            curr_recon = 0.0
-            
-            trend_dir = '-'
-            forecast_dir = '-'
-            cycle_pos = 0
-            fast_pos = 0
 
             # Path A: Use DB Values (Fast)
             if row['ssa_trend'] is not None and row['ssa_noise'] is not None:
-                curr_trend = row['ssa_trend']
-                curr_cyclic = row['ssa_cyclic']
-                curr_noise = row['ssa_noise']
-                curr_recon = curr_trend + curr_cyclic
-                
-                # Meta
-                trend_dir = row['ssa_trend_dir']
-                cycle_pos = row['ssa_cycle_pos']
-                fast_pos = row['ssa_fast_pos']
+                bar_trend[i] = row['ssa_trend']
+                bar_cyclic[i] = row['ssa_cyclic']
+                bar_noise[i] = row['ssa_noise']
+                bar_meta[i] = (row['ssa_trend_dir'], '-', row['ssa_cycle_pos'], row['ssa_fast_pos'])
             
-            # Path B: Fallback Calculation (Slow)
-            else:
-                window_slice = closes_np[i-SSA_WINDOW+1 : i+1]
-                if len(window_slice) != SSA_WINDOW: continue
-                try:
-                    analysis = analyze_market_snapshot(window_slice)
-                    if analysis:
-                        curr_trend = analysis['raw_trend']
-                        curr_cyclic = analysis['raw_cyclic']
-                        curr_noise = analysis['raw_noise']
-                        curr_recon = curr_trend + curr_cyclic
-                        
-                        trend_dir = analysis['trend_dir']
-                        forecast_dir = analysis['forecast_dir']
-                        cycle_pos = analysis['cycle_pct']
-                        fast_pos = analysis['fast_pct']
-                except:
-                    continue
-
-            # --- DETERMINE PREVIOUS NOISE ---
-            # 1. Try DB first
-            if prev_row['ssa_noise'] is not None:
-                prev_noise = prev_row['ssa_noise']
-            # 2. Use persistent variable from last loop iteration
-            else:
-                prev_noise = last_iter_noise
+            # Path B: Precomputed Rolling SSA (bar i analysed on closes[i-SSA_WINDOW+1 : i+1])
+            elif snapshots['valid'][i]:
+                bar_trend[i] = snapshots['raw_trend'][i]
+                bar_cyclic[i] = snapshots['raw_cyclic'][i]
+                bar_noise[i] = snapshots['raw_noise'][i]
+                bar_meta[i] = (snapshots['trend_dir'][i], snapshots['forecast_dir'][i],
+                               int(snapshots['cycle_pct'][i]), int(snapshots['fast_pct'][i]))
+            # Bars without SSA values keep zeros: no hot zone, and the noise counts as a zero-crossing
 
-            # Update persistence for NEXT iteration
-            last_iter_noise = curr_noise
+        # --- SIGNAL LOGIC --- (shared evaluator; counters / BASIC_S locks start at the first analysed bar)
+        strategy_key = strategy.lower()
+        bar_signals = np.zeros(n_bars, dtype=np.int8)
+        if strategy_key in signals.STRATEGIES:
+            s0 = SSA_WINDOW - 1
+            bar_signals[s0:] = signals.strategy_signals(
+                strategy_key, closes_np[s0:], bar_trend[s0:], bar_cyclic[s0:], bar_noise[s0:], start=1)
 
-            # --- SIGNAL LOGIC ---
-            signal = None
-            
-            if strategy == 'BASIC':
-                is_hot_buy = (curr_recon < curr_trend) and (curr_price < curr_recon)
-                is_hot_sell = (curr_recon > curr_trend) and (curr_price > curr_recon)
-                
-                # Check turn using robust prev_noise
-                is_noise_buy = (curr_noise < 0) and (curr_noise >= prev_noise)
-                is_noise_sell = (curr_noise > 0) and (curr_noise <= prev_noise)
-                
-                if is_hot_buy and is_noise_buy: signal = "BUY"
-                elif is_hot_sell and is_noise_sell: signal = "SELL"
+        # 4. Simulation Loop
+        simulation_start_idx = n_bars - lookback_bars
+        if simulation_start_idx < SSA_WINDOW: simulation_start_idx = SSA_WINDOW
 
-            elif strategy == 'BASIC_S':
-                # Reset Flags on Zero Cross
-                if curr_noise >= 0: basic_s_fired_buy = False
-                if curr_noise <= 0: basic_s_fired_sell = False
-                
-                is_hot_buy = (curr_recon < curr_trend) and (curr_price < curr_recon)
-                is_hot_sell = (curr_recon > curr_trend) and (curr_price > curr_recon)
-                
-                # Same entry logic as BASIC (Slope), but gated by flag
-                is_noise_buy = (curr_noise < 0) and (curr_noise >= prev_noise)
-                is_noise_sell = (curr_noise > 0) and (curr_noise <= prev_noise)
-                
-                if is_hot_buy and is_noise_buy and not basic_s_fired_buy:
-                    signal = "BUY"
-                    basic_s_fired_buy = True # LOCK
-                elif is_hot_sell and is_noise_sell and not basic_s_fired_sell:
-                    signal = "SELL"
-                    basic_s_fired_sell = True # LOCK
-                
-            elif strategy == 'FAST':
-                if curr_noise < 0:
-                    fast_up_count = 0
-                    if curr_noise < prev_noise:
-                        fast_down_count += 1
-                        if fast_down_count == 5: signal = "BUY"
-                    elif curr_noise > prev_noise:
-                        if fast_down_count > 0 and fast_down_count < 5: signal = "BUY"
-                        fast_down_count = 0 
-                
-                elif curr_noise > 0:
-                    fast_down_count = 0
-                    if curr_noise > prev_noise:
-                        fast_up_count += 1
-                        if fast_up_count == 5: signal = "SELL"
-                    elif curr_noise < prev_noise:
-                        if fast_up_count > 0 and fast_up_count < 5: signal = "SELL"
-                        fast_up_count = 0
+        active_trade = None 
 
-            # --- EXECUTION CHECK ---
-            if i < simulation_start_idx:
-                continue
+        for i in range(simulation_start_idx, n_bars):
+            
+            row = history_data[i]
+            trend_dir, forecast_dir, cycle_pos, fast_pos = bar_meta[i]
+            signal = signals.SIGNAL_NAMES.get(int(bar_signals[i]))
 
             # --- 2. TRADE MANAGEMENT (Exit) ---
             if active_trade:
@@ -0,0 +1,246 @@
+import os
+import time
+import threading
+import numpy as np
+from sqlalchemy import and_, or_
+from app import db
+from app.models import MarketData
+from app.services.bars import BarArrays, FIELDS, fetch_bars
+
+# Keep the latest bars of every (symbol, interval) in memory (false = always read the DB)
+ENABLED = os.environ.get('BAR_STORE_ENABLED', 'true').lower() == 'true'
+# Bars held per (symbol, interval); reads of more bars go to the DB
+CAPACITY = int(os.environ.get('BAR_STORE_CAPACITY', 1024))
+# Seconds a series is served from memory before its newest bars are re-read
+# (the daemon writes from another process, so the web workers must look)
+SYNC_SECONDS = float(os.environ.get('BAR_STORE_SYNC_SECONDS', 5))
+# Newest bars re-read on a sync (the daemon rewrites the last 30 1min bars every cycle)
+RESYNC_BARS = 32
+
+COLUMNS = ('time',) + FIELDS
+
+class BarRing:
+    """
+    Fixed-capacity ring of the newest bars of one series.
+
+    Every column is stored twice in a buffer of 2 x capacity (slot i at i and
+    i + capacity), so the newest n bars are always one contiguous slice and
+    view(n) returns read-only BarArrays without copying. Appending writes
+    outside any view of up to capacity - k bars for the next k appends (a
+    view of all capacity bars is therefore copied); replacing a stored bar
+    swaps in fresh buffers (copy-on-write), so a view never changes under a
+    caller.
+    """
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.buffers = {c: np.zeros(2 * capacity, dtype=np.int64 if c == 'time' else float) for c in COLUMNS}
+        self.count = 0
+        self.synced_at = 0.0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def newest(self):
+        return int(self.buffers['time'][self._end() - 1]) if self.count else None
+
+    def _end(self):
+        # One past the newest bar's position in the upper copy
+        return (self.count - 1) % self.capacity + self.capacity + 1
+
+    def _tail(self, n):
+        end = self._end() if self.count else 0
+        return [self.buffers[c][end - n:end] for c in COLUMNS]
+
+    def view(self, n):
+        n = min(n, len(self))
+        columns = self._tail(n)
+        if n == self.capacity:
+            # The next append overwrites the oldest bar of a full view
+            columns = [column.copy() for column in columns]
+        for column in columns:
+            column.flags.writeable = False
+        return BarArrays(*columns)
+
+    def _write(self, slot, bar):
+        for c, v in zip(COLUMNS, bar):
+            buf = self.buffers[c]
+            buf[slot] = buf[slot + self.capacity] = v
+
+    def merge(self, bars):
+        """
+        Adds BarArrays (sorted): newer bars are appended, stored ones replaced,
+        older ones ignored once the ring is full. Returns False if a bar falls
+        into a gap of the stored series or before a ring that isn't full yet
+        (the ring can't insert; reload it instead).
+        """
+        held = BarArrays(*self._tail(len(self)))
+        oldest, newest = (int(held.time[0]), int(held.time[-1])) if len(held) else (None, None)
+        copied = False
+        for bar in zip(*(getattr(bars, c).tolist() for c in COLUMNS)):
+            t = bar[0]
+            if newest is None or t > newest:
+                self._write(self.count % self.capacity, bar)
+                self.count += 1
+                newest = t
+                continue
+            if t < oldest:
+                if len(held) < self.capacity:
+                    return False
+                continue
+            i = int(np.searchsorted(held.time, t))
+            if i >= len(held) or held.time[i] != t:
+                return False
+            if not copied:
+                self.buffers = {c: buf.copy() for c, buf in self.buffers.items()}
+                copied = True
+            self._write((self.count - len(held) + i) % self.capacity, bar)
+        return True
+
+# (symbol, interval) -> BarRing
+_rings = {}
+_lock = threading.Lock()
+
+def _load(symbol, interval):
+    bars = fetch_bars(symbol, interval, CAPACITY)
+    if not len(bars):
+        return None
+    ring = BarRing(CAPACITY)
+    ring.merge(bars)
+    ring.synced_at = time.monotonic()
+    with _lock:
+        _rings[(symbol, interval)] = ring
+    return ring
+
+def _naive(ts):
+    """Unix seconds -> naive UTC datetime, as stored."""
+    return np.int64(ts).astype('datetime64[s]').tolist()
+
+def _resync(symbol, ring):
+    """
+    Rows of `symbol` re-read on a sync: its newest RESYNC_BARS bars and
+    anything after. A ring that isn't full holds the whole series as it was
+    loaded, so anything older than its oldest bar (a backfill) is read too.
+    """
+    held = BarArrays(*ring._tail(len(ring)))
+    since = MarketData.time >= _naive(held.time[max(len(held) - RESYNC_BARS, 0)])
+    if len(held) < ring.capacity:
+        since = or_(since, MarketData.time < _naive(held.time[0]))
+    return and_(MarketData.symbol == symbol, since)
+
+def sync(symbols, interval, force=False):
+    """
+    Brings the stored series of `symbols` up to date: unknown ones are loaded
+    (the newest CAPACITY bars), ones not synced for SYNC_SECONDS re-read
+    the rows of _resync(), all of them in one query. A series that gained
+    bars older than it holds is dropped and loaded again on its next read.
+    """
+    if not ENABLED:
+        return
+    now = time.monotonic()
+    with _lock:
+        rings = {s: _rings.get((s, interval)) for s in symbols}
+    stale = {s: r for s, r in rings.items() if r is not None and (force or now - r.synced_at > SYNC_SECONDS)}
+    for symbol in [s for s, r in rings.items() if r is None]:
+        _load(symbol, interval)
+    if not stale:
+        return
+
+    stmt = db.select(
+        MarketData.symbol, MarketData.time, MarketData.open, MarketData.high,
+        MarketData.low, MarketData.close, MarketData.volume
+    ).where(
+        MarketData.interval == interval,
+        or_(*(_resync(s, r) for s, r in stale.items()))
+    ).order_by(MarketData.symbol, MarketData.time.asc())
+
+    rows_by_symbol = {s: [] for s in stale}
+    for r in db.session.execute(stmt):
+        rows_by_symbol[r.symbol].append(r[1:])
+
+    for symbol, rows in rows_by_symbol.items():
+        stale[symbol].synced_at = now
+        if not rows:
+            continue
+        time_, open_, high, low, close, volume = zip(*rows)
+        volume = np.array([v if v is not None else 0.0 for v in volume], dtype=float)
+        bars = BarArrays(np.array(time_, dtype='datetime64[s]').astype(np.int64), open_, high, low, close, volume)
+        _merge(symbol, interval, stale[symbol], bars)
+
+def _merge(symbol, interval, ring, bars):
+    with _lock:
+        if _rings.get((symbol, interval)) is not ring:
+            return
+        if not ring.merge(bars):
+            # Gap in the stored series: read it again on the next access
+            del _rings[(symbol, interval)]
+
+def get_bars(symbol, interval, limit=500):
+    """
+    The latest `limit` bars of (symbol, interval) as BarArrays: a read-only
+    view of the stored series (loaded on first use, synced as in sync()),
+    or straight from the DB when the store is off or `limit` exceeds CAPACITY.
+    A series holding fewer than `limit` bars is all there is (older bars
+    stored later are picked up by sync()).
+    """
+    if not ENABLED or limit > CAPACITY:
+        return fetch_bars(symbol, interval, limit)
+    sync([symbol], interval)
+    with _lock:
+        ring = _rings.get((symbol, interval))
+        if ring is not None:
+            return ring.view(limit)
+    # Dropped after a gap: load it again now
+    ring = _load(symbol, interval)
+    return ring.view(limit) if ring is not None else BarArrays.empty()
+
+def tip(symbol, start):
+    """
+    Forming candle dict from the stored 1min bars since `start` (unix seconds),
+    or None when they don't reach back to `start` (or there are none yet).
+    """
+    if not ENABLED:
+        return None
+    with _lock:
+        ring = _rings.get((symbol, '1min'))
+        # One short of capacity: a full view would be copied
+        bars = ring.view(ring.capacity - 1) if ring is not None else None
+    if bars is None or not len(bars) or bars.time[0] > start:
+        return None
+    i = int(np.searchsorted(bars.time, start))
+    if i == len(bars):
+        return None
+    return {
+        "time": int(start), "open": float(bars.open[i]), "high": float(bars.high[i:].max()),
+        "low": float(bars.low[i:].min()), "close": float(bars.close[-1]), "volume": float(bars.volume[i:].sum())
+    }
+
+def write(symbol, interval, bars):
+    """Ingestion hook: folds just-committed BarArrays into the stored series, if it is held."""
+    if not ENABLED or not len(bars):
+        return
+    with _lock:
+        ring = _rings.get((symbol, interval))
+    if ring is None:
+        return
+    _merge(symbol, interval, ring, bars)
+    if ring.newest == int(bars.time[-1]):
+        # The newest bars are the ones this process just wrote
+        ring.synced_at = time.monotonic()
+
+def warm(symbols, intervals):
+    """Loads every (symbol, interval) at startup so the first requests are served from memory."""
+    if not ENABLED:
+        return
+    started = time.perf_counter()
+    for interval in intervals:
+        sync(symbols, interval, force=True)
+    with _lock:
+        held = len(_rings)
+    print(f"🗄️ [BarStore] Warmed {held} series in {time.perf_counter() - started:.1f}s")
+
+def drop(symbol=None):
+    """Forgets stored series (e.g. after a rebuild); they are loaded again on the next read."""
+    with _lock:
+        for key in [k for k in _rings if symbol is None or k[0] == symbol]:
+            del _rings[key]
@@ -0,0 +1,123 @@
+import calendar
+import numpy as np
+from app import db
+from app.models import MarketData
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+def _unix_time(candle):
+    t = candle.get('time')
+    if t is None or not isinstance(t, (int, float, np.integer)):
+        # Naive datetimes are UTC; utctimetuple() converts aware ones
+        return calendar.timegm(candle.get('datetime_obj', t).utctimetuple())
+    return int(t)
+
+class BarArrays:
+    """
+    Columnar OHLCV bars, oldest -> newest: `time` holds unix seconds (int64,
+    no repeats), the price / volume columns are float64 arrays of the same length.
+    """
+    __slots__ = ('time',) + FIELDS
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = np.asarray(time, dtype=np.int64)
+        self.open = np.asarray(open, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.low = np.asarray(low, dtype=float)
+        self.close = np.asarray(close, dtype=float)
+        self.volume = np.asarray(volume, dtype=float)
+
+    def __len__(self):
+        return len(self.time)
+
+    @classmethod
+    def empty(cls):
+        return cls(*([[]] * 6))
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        From a list of candle dicts ('time' in unix seconds, or a UTC
+        'datetime_obj'); sorted by time, keeping the last candle of any
+        duplicated timestamp.
+        """
+        if not records:
+            return cls.empty()
+        time = np.array([_unix_time(r) for r in records], dtype=np.int64)
+        columns = [np.array([r[f] or 0 for r in records], dtype=float) for f in FIELDS]
+        return cls.latest(time, *columns)
+
+    @classmethod
+    def latest(cls, time, *columns):
+        """From unordered columns: sorted by time, keeping the last bar of any duplicated timestamp."""
+        time = np.asarray(time, dtype=np.int64)
+        rev = time[::-1]
+        _, first_in_rev = np.unique(rev, return_index=True)
+        keep = len(time) - 1 - first_in_rev
+        return cls(time[keep], *(np.asarray(c)[keep] for c in columns))
+
+    def tail(self, n):
+        return BarArrays(*(getattr(self, f)[-n:] for f in self.__slots__))
+
+    def with_bar(self, bar):
+        """
+        Copy with `bar` (a candle dict) replacing the bar at its timestamp,
+        or inserted in time order if there is none.
+        """
+        t = int(bar['time'])
+        i = int(np.searchsorted(self.time, t))
+        columns = [self.time] + [getattr(self, f) for f in FIELDS]
+        values = [t] + [bar[f] or 0 for f in FIELDS]
+        if i < len(self) and self.time[i] == t:
+            columns = [c.copy() for c in columns]
+            for c, v in zip(columns, values):
+                c[i] = v
+        else:
+            columns = [np.insert(c, i, v) for c, v in zip(columns, values)]
+        return BarArrays(*columns)
+
+    def datetimes(self):
+        """`time` as naive UTC datetimes (the MarketData.time form)."""
+        return self.time.astype('datetime64[s]').tolist()
+
+    def to_records(self):
+        """Legacy list-of-dicts form (as returned by get_historical_data)."""
+        return [{"time": int(t), "open": float(o), "high": float(h), "low": float(l), "close": float(c), "volume": float(v)}
+                for t, o, h, l, c, v in zip(self.time, self.open, self.high, self.low, self.close, self.volume)]
+
+def parse_values(values):
+    """
+    Twelve Data `values` (string dicts, newest or oldest first) -> BarArrays.
+    Each field is parsed as one NumPy array: 'YYYY-MM-DD[ HH:MM:SS]' as UTC
+    via datetime64, prices via float64; a missing or empty volume is 0.
+    """
+    if not values:
+        return BarArrays.empty()
+    time = np.array([d['datetime'] for d in values], dtype='datetime64[s]').astype(np.int64)
+    columns = [np.array([d[f] for d in values], dtype=float) for f in FIELDS[:4]]
+    volume = np.array([d.get('volume') or 0 for d in values], dtype=float)
+    return BarArrays.latest(time, *columns, volume)
+
+def fetch_bars(symbol, interval, limit=500):
+    """
+    The latest `limit` stored bars of (symbol, interval) as BarArrays.
+    ORDER BY time DESC LIMIT n walks idx_symbol_interval_time backwards and
+    only the OHLCV columns are selected, so the cost does not grow with history.
+    """
+    stmt = db.select(
+        MarketData.time, MarketData.open, MarketData.high,
+        MarketData.low, MarketData.close, MarketData.volume
+    ).where(
+        MarketData.symbol == symbol,
+        MarketData.interval == interval
+    ).order_by(MarketData.time.desc()).limit(limit)
+
+    rows = db.session.execute(stmt).all()
+    if not rows:
+        return BarArrays.empty()
+    time, open_, high, low, close, volume = zip(*reversed(rows))
+    # Naive datetimes are UTC: datetime64[s] -> unix seconds (same as calendar.timegm)
+    time = np.array(time, dtype='datetime64[s]').astype(np.int64)
+    volume = np.array(volume, dtype=float)
+    volume[np.isnan(volume)] = 0.0
+    return BarArrays(time, open_, high, low, close, volume)
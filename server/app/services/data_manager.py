@@ -1,70 +1,51 @@
-import requests
 import calendar
-import time
 import pandas as pd
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, bindparam, func, literal, literal_column, union_all
 from app import db
 from app.models import MarketData
+from app.services import ssa_cache, rollup, twelvedata_client, bar_store
+from app.services.bars import BarArrays, FIELDS, parse_values
 
 # --- DEFINE YOUR ASSETS HERE ---
 TRACKED_ASSETS = ['XAU/USD','BTC/USD', 'ETH/USD', 'ADA/USD', 'BNB/USD', 'DOGE/USD', 'XRP/USD', 'SOL/USD', 'FET/USD','ICP/USD',
     'EUR/USD', 'EUR/CAD', 'EUR/AUD','EUR/JPY', 'EUR/GBP','AUD/CAD','AUD/USD','GBP/CAD', 'GBP/USD', 'USD/CAD', 'USD/CHF', 'USD/JPY',
     'AAPL', 'AMZN', 'GOOG', 'MSFT','NVDA', 'META', 'TSLA', 'NFLX']
 
-_api_counter = 0
-_last_reset_time = time.time()
+# Optional cached SSA columns a candle dict may carry into save_to_db
+SSA_FIELDS = ('ssa_trend', 'ssa_cyclic', 'ssa_noise', 'ssa_trend_dir', 'ssa_cycle_pos', 'ssa_fast_pos')
 
-def track_api_call(source="Unknown"):
-    global _api_counter, _last_reset_time
-    current_time = time.time()
-    if current_time - _last_reset_time > 60:
-        _api_counter = 0
-        _last_reset_time = current_time
-    _api_counter += 1
-    print(f"💰 [API] Call #{_api_counter}/55 | Source: {source}")
+# Rows per executemany batch in upsert_bars
+UPSERT_BATCH = 500
 
-def get_historical_data(symbol, interval, api_key, limit=300):
+def get_historical_bars(symbol, interval, api_key, limit=300, tips=None):
+    """
+    The latest `limit` bars of (symbol, interval) as columnar BarArrays,
+    including the forming synthetic tip for the higher timeframes.
+    `tips` takes tips prefetched with synthetic_tips() for many symbols at once.
+    """
     # 1. NON-TRACKED ASSETS: Fallback to direct API call
     if symbol not in TRACKED_ASSETS:
-        return fetch_from_api(symbol, interval, api_key, limit, source="Custom")
+        return fetch_from_api(symbol, interval, api_key, limit, source="Custom") or BarArrays.empty()
 
-    # 2. TRACKED ASSETS: STRICT DB FETCH
+    # 2. TRACKED ASSETS: in-memory bar store, backed by the DB (newest `limit` rows only)
     # We rely entirely on the background daemon to populate this data.
-    data_query = MarketData.query.filter_by(
-        symbol=symbol, 
-        interval=interval
-    ).order_by(MarketData.time.asc()).all()
-
-    db_data = []
-    if len(data_query) >= 1: 
-        db_data = [row.to_dict() for row in data_query]
-
-    # Normalize Keys to Unix Timestamp (Int) for consistency
-    data_map = {}
-    for d in db_data:
-        raw_time = d['time']
-        if hasattr(raw_time, 'timestamp'):
-            ts = int(raw_time.replace(tzinfo=timezone.utc).timestamp())
-            d['time'] = ts
-            d['datetime_obj'] = raw_time
-        else:
-            ts = int(raw_time)
-            d['time'] = ts
-        data_map[ts] = d
+    bars = bar_store.get_bars(symbol, interval, limit)
 
     # 3. SYNTHETIC TIP GENERATION
     # Even though we don't fetch new data, we still need to build the
     # "Live Candle" for higher timeframes (15m, 1h, etc.) using the 
     # latest 1-min data available in the DB.
     if interval in ['5min', '15min', '30min', '1h', '4h', '1day', '1week']:
-        synthetic_candle = generate_synthetic_tip(symbol, interval)
+        if tips is not None:
+            synthetic_candle = tips.get((symbol, interval))
+        else:
+            synthetic_candle = generate_synthetic_tip(symbol, interval)
         if synthetic_candle:
-            data_map[synthetic_candle['time']] = synthetic_candle
-        
-    final_data = sorted(data_map.values(), key=lambda x: x['time'])
+            bars = bars.with_bar(synthetic_candle)
 
     # 4. INITIAL SEEDING (Only if DB is completely empty)
-    if not final_data:
+    if not len(bars):
         # This only happens once when you add a NEW asset.
         api_data = fetch_from_api(symbol, interval, api_key, outputsize=limit+50, source="Initial Backfill")
         if api_data:
@@ -72,10 +53,14 @@ def get_historical_data(symbol, interval, api_key, limit=300):
             # If we just seeded 1min data, we should probably repair aggregates too
             if interval == '1min':
                  repair_aggregates(symbol)
-            return api_data 
-        return []
+            return api_data
+        return bars
 
-    return final_data[-limit:]
+    return bars.tail(limit)
+
+def get_historical_data(symbol, interval, api_key, limit=300):
+    """get_historical_bars() as a list of candle dicts."""
+    return get_historical_bars(symbol, interval, api_key, limit).to_records()
 
 def repair_aggregates(symbol):
     """
@@ -114,88 +99,236 @@ def repair_aggregates(symbol):
                     "close": float(row['close']), "volume": float(row['volume'])
                 })
             save_to_db(symbol, interval_name, to_save)
+        # The incremental rollups re-read the rebuilt buckets on the next bar
+        rollup.reset(symbol)
+        bar_store.drop(symbol)
     except Exception as e:
         print(f"Aggregate Repair Failed: {e}")
 
-def generate_synthetic_tip(symbol, interval):
-    """
-    Constructs the latest 'forming' candle for a higher timeframe
-    using the raw 1-minute data from the database.
-    """
-    now = datetime.utcnow()
+def tip_start(interval, now=None):
+    """Start time (naive UTC) of the forming `interval` candle, or None for 1min and unknown intervals."""
+    now = now or datetime.utcnow()
     
     # Calculate the start time of the current candle
     if interval == '5min':
         minute_block = (now.minute // 5) * 5
-        start_time = now.replace(minute=minute_block, second=0, microsecond=0)
+        return now.replace(minute=minute_block, second=0, microsecond=0)
     elif interval == '15min':
         minute_block = (now.minute // 15) * 15
-        start_time = now.replace(minute=minute_block, second=0, microsecond=0)
+        return now.replace(minute=minute_block, second=0, microsecond=0)
     elif interval == '30min':
         minute_block = (now.minute // 30) * 30
-        start_time = now.replace(minute=minute_block, second=0, microsecond=0)
+        return now.replace(minute=minute_block, second=0, microsecond=0)
     elif interval == '1h':
-        start_time = now.replace(minute=0, second=0, microsecond=0)
+        return now.replace(minute=0, second=0, microsecond=0)
     elif interval == '4h':
         hour_block = (now.hour // 4) * 4
-        start_time = now.replace(hour=hour_block, minute=0, second=0, microsecond=0)
+        return now.replace(hour=hour_block, minute=0, second=0, microsecond=0)
     elif interval == '1day':
-        start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
     elif interval == '1week':
-        start_time = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
-    else:
-        return None
+        return (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return None
 
-    # Fetch 1-min candles from DB that belong to this timeframe
-    candles = MarketData.query.filter(
-        MarketData.symbol == symbol,
-        MarketData.interval == '1min',
-        MarketData.time >= start_time
-    ).order_by(MarketData.time.asc()).all()
+def synthetic_tips(symbols, intervals, now=None):
+    """
+    The latest 'forming' candle of every (symbol, interval), built from the
+    raw 1-minute data: from the bar store's 1min series where they reach
+    back to the candle start, otherwise with ONE aggregate query: per interval
+    a GROUP BY symbol of min/max time, max(high), min(low) and sum(volume)
+    since the candle start (UNION ALL), joined back on the first and last
+    minute for open / close. Returns {(symbol, interval): candle dict}.
+    """
+    now = now or datetime.utcnow()
+    starts = {iv: tip_start(iv, now) for iv in intervals}
+    starts = {iv: st for iv, st in starts.items() if st is not None}
+    if not symbols or not starts:
+        return {}
 
-    if not candles: return None
+    # Tips the stored 1min bars cover are built in memory; the rest below
+    tips = {}
+    if bar_store.ENABLED:
+        bar_store.sync(symbols, '1min')
+        for interval, start_time in starts.items():
+            for symbol in symbols:
+                candle = bar_store.tip(symbol, calendar.timegm(start_time.timetuple()))
+                if candle:
+                    tips[(symbol, interval)] = candle
+    missing = {(s, iv) for s in symbols for iv in starts} - set(tips)
+    if not missing:
+        return tips
+    symbols = sorted({s for s, _ in missing})
+    starts = {iv: st for iv, st in starts.items() if any(m[1] == iv for m in missing)}
 
-    open_p = candles[0].open
-    high_p = max(c.high for c in candles)
-    low_p = min(c.low for c in candles)
-    close_p = candles[-1].close
-    volume_p = sum((c.volume or 0) for c in candles)
-    utc_timestamp = calendar.timegm(start_time.timetuple())
+    m = MarketData.__table__
+    parts = [
+        db.select(
+            m.c.symbol, literal(interval).label('interval'),
+            func.min(m.c.time).label('first_time'), func.max(m.c.time).label('last_time'),
+            func.max(m.c.high).label('high'), func.min(m.c.low).label('low'),
+            func.sum(func.coalesce(m.c.volume, 0)).label('volume')
+        ).where(
+            m.c.symbol.in_(list(symbols)),
+            m.c.interval == '1min',
+            m.c.time >= start_time
+        ).group_by(m.c.symbol)
+        for interval, start_time in starts.items()
+    ]
+    agg = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+    first, last = m.alias('first_bar'), m.alias('last_bar')
+    stmt = db.select(
+        agg.c.symbol, agg.c.interval, first.c.open, agg.c.high, agg.c.low, last.c.close, agg.c.volume
+    ).join(first, and_(first.c.symbol == agg.c.symbol, first.c.interval == '1min', first.c.time == agg.c.first_time)
+    ).join(last, and_(last.c.symbol == agg.c.symbol, last.c.interval == '1min', last.c.time == agg.c.last_time))
 
-    return { "time": utc_timestamp, "open": open_p, "high": high_p, "low": low_p, "close": close_p, "volume": volume_p }
+    for r in db.session.execute(stmt):
+        if (r.symbol, r.interval) not in missing:
+            continue
+        utc_timestamp = calendar.timegm(starts[r.interval].timetuple())
+        tips[(r.symbol, r.interval)] = {
+            "time": utc_timestamp, "open": r.open, "high": r.high, "low": r.low, "close": r.close, "volume": r.volume
+        }
+    return tips
+
+def generate_synthetic_tip(symbol, interval):
+    """
+    Constructs the latest 'forming' candle for a higher timeframe
+    using the raw 1-minute data from the database.
+    """
+    return synthetic_tips([symbol], [interval]).get((symbol, interval))
 
 def fetch_from_api(symbol, interval, api_key, outputsize=500, source="API"):
-    track_api_call(f"{source} {symbol} {interval}")
-    url = "https://api.twelvedata.com/time_series"
-    params = {"symbol": symbol, "interval": interval, "apikey": api_key, "outputsize": outputsize, "order": "ASC"}
+    """Bars of (symbol, interval) straight from Twelve Data as BarArrays, or None."""
     try:
-        r = requests.get(url, params=params, timeout=10)
-        data = r.json()
-        if 'values' in data:
-            clean_data = []
-            for d in data['values']:
-                date_str = d['datetime']
-                try:
-                    ts = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    ts = datetime.strptime(date_str, "%Y-%m-%d")
-                utc_timestamp = calendar.timegm(ts.timetuple())
-                vol = d.get('volume')
-                volume_val = float(vol) if vol else 0.0
-                clean_data.append({"time": utc_timestamp, "datetime_obj": ts, "open": float(d['open']), "high": float(d['high']), "low": float(d['low']), "close": float(d['close']), "volume": volume_val})
-            return clean_data
+        data = twelvedata_client.get_client().time_series(
+            symbol, interval, api_key, outputsize=outputsize, source=f"{source} {symbol} {interval}", order="ASC")
+        if data and 'values' in data:
+            return parse_values(data['values'])
         else: return None
     except Exception as e:
         print(f"Exception fetching {symbol}: {e}")
         return None
 
+def _bar_row(symbol, interval, d):
+    dt_val = d.get('datetime_obj')
+    if not dt_val: dt_val = datetime.utcfromtimestamp(d['time'])
+    # Stored naive (UTC)
+    if dt_val.tzinfo is not None: dt_val = dt_val.astimezone(timezone.utc).replace(tzinfo=None)
+    row = {'symbol': symbol, 'interval': interval, 'time': dt_val,
+           'open': d['open'], 'high': d['high'], 'low': d['low'], 'close': d['close'], 'volume': d['volume']}
+    row.update({k: d[k] for k in SSA_FIELDS if k in d})
+    return row
+
+def upsert_bars(symbol, interval, data_list):
+    """
+    Bulk INSERT ... ON CONFLICT (symbol, interval, time) DO UPDATE of candle
+    dicts, in batches of UPSERT_BATCH rows (executemany). Only the columns a
+    candle carries are overwritten, so stored SSA values survive a plain
+    OHLCV update. Does not commit. Returns (inserted, updated).
+
+    PostgreSQL reports inserts through RETURNING (xmax = 0); SQLite counts
+    the already stored keys of each batch first.
+    """
+    # Last candle wins for a repeated timestamp (one statement can't touch a row twice)
+    rows = {}
+    for d in data_list:
+        row = _bar_row(symbol, interval, d)
+        rows[row['time']] = row
+    if not rows:
+        return 0, 0
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        # No ON CONFLICT: per-row merge
+        updated = 0
+        for row in rows.values():
+            updated += db.session.get(MarketData, (symbol, interval, row['time'])) is not None
+            db.session.merge(MarketData(**row))
+        return len(rows) - updated, updated
+
+    # executemany needs the same columns in every row of a statement
+    by_columns = {}
+    for row in rows.values():
+        by_columns.setdefault(tuple(row), []).append(row)
+
+    inserted = updated = 0
+    for columns, group in by_columns.items():
+        stmt = insert(MarketData)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['symbol', 'interval', 'time'],
+            set_={c: stmt.excluded[c] for c in columns if c not in ('symbol', 'interval', 'time')}
+        )
+        if dialect == 'postgresql':
+            stmt = stmt.returning(literal_column('xmax = 0'))
+        for start in range(0, len(group), UPSERT_BATCH):
+            batch = group[start:start + UPSERT_BATCH]
+            if dialect == 'postgresql':
+                new = sum(1 for (is_insert,) in db.session.execute(stmt, batch) if is_insert)
+            else:
+                existing = db.session.execute(
+                    db.select(func.count()).select_from(MarketData).where(
+                        MarketData.symbol == symbol,
+                        MarketData.interval == interval,
+                        MarketData.time.in_([r['time'] for r in batch])
+                    )
+                ).scalar()
+                db.session.execute(stmt, batch)
+                new = len(batch) - existing
+            inserted += new
+            updated += len(batch) - new
+    return inserted, updated
+
+def upsert_arrays(symbol, interval, bars):
+    """
+    upsert_bars for BarArrays. On PostgreSQL the columns are sent as arrays
+    and expanded server-side with unnest(), one INSERT ... SELECT ... ON
+    CONFLICT for the whole series, so no per-row dicts are built. Other
+    dialects go through upsert_bars. Does not commit. Returns (inserted, updated).
+    """
+    if not len(bars):
+        return 0, 0
+    if db.engine.dialect.name != 'postgresql':
+        return upsert_bars(symbol, interval, bars.to_records())
+
+    from sqlalchemy.dialects.postgresql import ARRAY, insert
+    columns = ('time',) + FIELDS
+    values = [bars.datetimes()] + [getattr(bars, f).tolist() for f in FIELDS]
+    rows = func.unnest(*[
+        bindparam(f"{c}_values", v, type_=ARRAY(MarketData.__table__.c[c].type))
+        for c, v in zip(columns, values)
+    ]).table_valued(*columns).render_derived()
+
+    stmt = insert(MarketData).from_select(
+        ('symbol', 'interval') + columns,
+        db.select(literal(symbol), literal(interval), *(rows.c[c] for c in columns))
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['symbol', 'interval', 'time'],
+        set_={c: stmt.excluded[c] for c in FIELDS}
+    ).returning(literal_column('xmax = 0'))
+
+    inserted = sum(1 for (is_insert,) in db.session.execute(stmt) if is_insert)
+    return inserted, len(bars) - inserted
+
 def save_to_db(symbol, interval, data_list):
+    """Upserts candle dicts or BarArrays and commits. Returns (inserted, updated), or None on failure."""
     try:
-        for d in data_list:
-            dt_val = d.get('datetime_obj')
-            if not dt_val: dt_val = datetime.utcfromtimestamp(d['time'])
-            market_data_entry = MarketData(symbol=symbol, interval=interval, time=dt_val, open=d['open'], high=d['high'], low=d['low'], close=d['close'], volume=d['volume'])
-            db.session.merge(market_data_entry)
+        if isinstance(data_list, BarArrays):
+            inserted, updated = upsert_arrays(symbol, interval, data_list)
+        else:
+            inserted, updated = upsert_bars(symbol, interval, data_list)
         db.session.commit()
+        # New bars (1min ones also move every higher timeframe's synthetic tip)
+        if data_list:
+            ssa_cache.invalidate(symbol)
+            bar_store.write(symbol, interval, data_list if isinstance(data_list, BarArrays)
+                            else BarArrays.from_records(data_list))
+        return inserted, updated
     except Exception as e:
-        db.session.rollback()
\ No newline at end of file
+        db.session.rollback()
+        print(f"❌ Save Failed ({symbol} {interval}): {e}")
+        return None
@@ -1,5 +1,8 @@
 import numpy as np
 import pandas as pd
+from . import ssa_service
+
+FORECAST_METHODS = ('spectral', 'recurrent')
 
 def forecast_ssa_spectral(components, forecast_steps=40, min_component=1):
     """
@@ -31,57 +34,90 @@ def forecast_ssa_spectral(components, forecast_steps=40, min_component=1):
         forecast += trend_forecast
     
     # --- 2. Component Forecast (FFT) ---
-    for comp_idx in range(min_component, max_component_to_use + 1):
-        if comp_idx >= components.shape[0]:
-            continue
-            
-        component = components[comp_idx]
-        n = len(component)
+    # All oscillatory components at once: one rfft over the stacked rows, the
+    # top 6 positive frequencies per row, and every sine wave projected in a
+    # single broadcast. Positive frequencies are rfft bins 1..(n-1)//2
+    # (fftfreq(n) > 0; the Nyquist bin of an even n counts as negative).
+    comps = components[min_component:max_component_to_use + 1]
+    n = components.shape[1]
+    pos = np.arange(1, (n - 1) // 2 + 1)
+    
+    if len(comps) and n >= 4 and len(pos):
+        fft_vals = np.fft.rfft(comps, axis=1)
+        power = np.abs(fft_vals[:, pos]) ** 2
         
-        if n < 4:
-            continue
-            
-        # Perform FFT to find dominant frequencies
-        fft_vals = np.fft.fft(component)
-        freqs = np.fft.fftfreq(n)
-        power = np.abs(fft_vals) ** 2
+        # Top 6 frequencies per component (as per original script); order is irrelevant for the sum
+        top_n = min(6, len(pos))
+        top = np.argpartition(power, len(pos) - top_n, axis=1)[:, -top_n:]
+        idx = pos[top]
+        coeffs_top = np.take_along_axis(fft_vals, idx, axis=1)
         
-        # Identify dominant frequencies (ignoring DC component at index 0)
-        pos_freq_indices = np.where(freqs > 0)[0]
-        if not len(pos_freq_indices):
-            continue
-            
-        # Sort by power and select top 6 frequencies (as per original script)
-        sorted_indices = pos_freq_indices[np.argsort(power[pos_freq_indices])[::-1]]
-        top_n = min(6, len(sorted_indices))
+        freq = idx * (1.0 / n)  # same values as np.fft.fftfreq(n)
+        amp = np.abs(coeffs_top) / n  # Scale amplitude
+        phase = np.angle(coeffs_top)
         
-        # Project forward using sine waves
-        component_forecast = np.zeros(forecast_steps)
-        for idx in sorted_indices[:top_n]:
-            freq = freqs[idx]
-            amp = np.abs(fft_vals[idx]) / n  # Scale amplitude
-            phase = np.angle(fft_vals[idx])
-            
-            # Project this frequency forward (using cosine function in the complex exponential form)
-            t = np.arange(n, n + forecast_steps)
-            # The original script uses `amp * np.sin(...)`, which implicitly converts from the complex FFT result.
-            # We stick to the original structure to match the phase/amplitude scaling:
-            wave = amp * np.sin(2 * np.pi * freq * t + phase)
-            component_forecast += wave
-            
-        forecast += component_forecast
+        # Project forward using sine waves: (components, top_n, steps), summed
+        t = np.arange(n, n + forecast_steps)
+        waves = amp[..., None] * np.sin(2 * np.pi * freq[..., None] * t + phase[..., None])
+        forecast += waves.sum(axis=(0, 1))
     
     # --- 3. Anchoring to Total Reconstruction ---
     # Ensure the forecast starts from the sum of ALL historical components.
     if components.shape[0] > 0 and components[0].size > 0:
         # Sum last value of every component (including trend)
-        last_actual = sum(comp[-1] for comp in components if comp.size > 0)
+        last_actual = components[:, -1].sum()
         
         first_forecast = forecast[0]
         forecast = forecast + (last_actual - first_forecast)
     
     return forecast
 
+def forecast_ssa_recurrent(components, forecast_steps=40, rank=ssa_service.SIGNAL_COMPONENTS, U=None):
+    """
+    Recurrent SSA (SSA-R) forecast from the leading eigenvectors.
+
+    The first `rank` left singular vectors define a linear recurrence of
+    order L-1: with pi the last row of U_r and U_head its first L-1 rows,
+    x[n] = R . x[n-L+1 : n], where R = U_head @ pi / (1 - |pi|^2).
+    It continues the rank-r reconstruction with an O(L) update per step,
+    and the result is shifted so it continues from the last actual value.
+
+    `components` is the full (L, N) decomposition. Pass `U` (L, >= rank) when
+    the decomposition's eigenvectors are at hand; otherwise they are
+    recomputed from the series (the sum of all components).
+    """
+    L, N = components.shape
+    if U is None:
+        series = components.sum(axis=0)
+        U, _, _ = ssa_service.leading_eigentriples(ssa_service._embed(series, L), rank)
+    U_r = U[:, :min(rank, U.shape[1])]
+    rank = U_r.shape[1]
+    
+    pi = U_r[-1]
+    verticality = pi @ pi
+    if verticality >= 1 - 1e-9:
+        raise ValueError("SSA-R forecast undefined: e_L lies in the signal subspace")
+    R = (U_r[:-1] @ pi) / (1 - verticality)
+    
+    # Extend the rank-r reconstruction one step at a time
+    signal = components[:rank].sum(axis=0)
+    extended = np.empty(N + forecast_steps)
+    extended[:N] = signal
+    for n in range(N, N + forecast_steps):
+        extended[n] = R @ extended[n - L + 1:n]
+    
+    # Anchor to the actual series: carry the last bar's residual forward
+    last_actual = components[:, -1].sum()
+    return extended[N:] + (last_actual - signal[-1])
+
+def forecast_ssa(components, forecast_steps=40, method='spectral', U=None):
+    """Dispatches to the spectral (default) or recurrent SSA forecaster."""
+    if method == 'spectral':
+        return forecast_ssa_spectral(components, forecast_steps=forecast_steps, min_component=1)
+    if method == 'recurrent':
+        return forecast_ssa_recurrent(components, forecast_steps=forecast_steps, U=U)
+    raise ValueError(f"Unknown forecast method '{method}' (expected one of {FORECAST_METHODS})")
+
 def generate_future_timestamps(last_timestamp, interval_str, steps):
     """
     Generates the next N timestamps based on the interval string.
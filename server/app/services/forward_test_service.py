@@ -1,9 +1,11 @@
 from datetime import datetime, timedelta
+from flask import current_app
 from app import db
-from app.models import PaperTrade, MarketData
+from sqlalchemy import insert, update
+from app.models import PaperTrade
 from app.services.data_manager import TRACKED_ASSETS
-from app.services.signal_engine import analyze_market_snapshot
-import pandas as pd
+from app.services.signal_engine import snapshot_many
+from app.services import ssa_pool, bar_store
 
 INVESTMENT_AMOUNT = 1000.0
 
@@ -12,24 +14,6 @@ def get_interval_minutes(interval):
     mapping = { '15min': 15, '30min': 30, '1h': 60, '4h': 240, '1day': 1440 }
     return mapping.get(interval, 15)
 
-def get_historical_data_from_db(symbol, interval, limit=500):
-    stmt = db.select(MarketData).filter(
-        MarketData.symbol == symbol,
-        MarketData.interval == interval,
-    ).order_by(MarketData.time.desc()).limit(limit)
-
-    results = db.session.execute(stmt).scalars().all()
-    results.reverse() 
-
-    data_list = []
-    for r in results:
-        data_list.append({
-            'time': r.time, 
-            'datetime_obj': datetime.utcfromtimestamp(r.time) if isinstance(r.time, int) else r.time,
-            'open': r.open, 'high': r.high, 'low': r.low, 'close': r.close, 'volume': r.volume
-        })
-    return data_list
-
 def run_forward_test(interval, api_key=None):
     print(f"🧪 [ForwardTest] Running for {interval} on {len(TRACKED_ASSETS)} assets...")
     
@@ -37,31 +21,42 @@ def run_forward_test(interval, api_key=None):
     max_delay_minutes = interval_mins + 20 
     
     strategies_to_test = ['basic', 'basic_s', 'fast'] 
+    forecast_method = current_app.config.get('SSA_FORECAST_METHOD', 'spectral')
 
+    # 1. Collect the fresh series first so they can be analysed together
+    # (from the in-memory bar store; one query re-reads every series' newest bars before trading on them)
+    bar_store.sync(TRACKED_ASSETS, interval, force=True)
+    fresh = []
     for symbol in TRACKED_ASSETS:
-        ohlc = get_historical_data_from_db(symbol, interval, limit=500)
+        bars = bar_store.get_bars(symbol, interval, limit=500)
         
-        if not ohlc or len(ohlc) < 50: continue
+        if len(bars) < 50: continue
         
-        last_candle = ohlc[-1]
-        last_time = last_candle.get('datetime_obj')
-        if not last_time: last_time = datetime.utcfromtimestamp(last_candle['time'])
+        last_time = datetime.utcfromtimestamp(int(bars.time[-1]))
             
         now = datetime.utcnow()
         diff = now - last_time
         if (diff.total_seconds() / 60) > max_delay_minutes: continue
 
-        df = pd.DataFrame(ohlc)
-        closes = df['close'].values.flatten()
-        
+        fresh.append((symbol, last_time, bars.close))
+
+    # 2. SSA + signals for every series, fanned out over the worker pool (one batched SSA per worker)
+    snapshots = ssa_pool.map_series(
+        snapshot_many, [(symbol, interval, closes) for symbol, _, closes in fresh],
+        strategies=strategies_to_test, forecast_method=forecast_method)
+
+    # 3. Every OPEN trade of this interval, loaded once; opens / closes are flushed together at the end
+    book = TradeBook(interval)
+
+    for (symbol, last_time, closes), results in zip(fresh, snapshots):
+        # One forecast + stats per symbol, evaluated for every strategy together.
+        # FIX: We now trust 'basic_s' logic in signal_engine to handle the "First Entry" check.
+        if not results: continue
+
         # --- LOOP STRATEGIES ---
         for strategy in strategies_to_test:
-            
-            # FIX: We now trust 'basic_s' logic in signal_engine to handle the "First Entry" check.
-            # No need to override it to 'basic'.
-            result = analyze_market_snapshot(closes, strategy=strategy)
-            
-            if not result or not result['signal']: continue 
+            result = results[strategy]
+            if not result['signal']: continue 
                 
             signal = result['signal'] 
             price = float(result['price'])
@@ -75,84 +70,100 @@ def run_forward_test(interval, api_key=None):
             }
             
             # --- SAFETY CHECK ---
-            # Even though signal_engine filters repeats, we double-check DB 
+            # Even though signal_engine filters repeats, we double-check the open book
             # to ensure we don't open duplicate positions for the same asset/strategy.
-            if signal == 'BUY':
-                existing = PaperTrade.query.filter_by(
-                    symbol=symbol, interval=interval, direction='LONG', status='OPEN', strategy=strategy
-                ).first()
-                if existing: continue 
-            elif signal == 'SELL':
-                existing = PaperTrade.query.filter_by(
-                    symbol=symbol, interval=interval, direction='SHORT', status='OPEN', strategy=strategy
-                ).first()
-                if existing: continue 
+            direction = 'LONG' if signal == 'BUY' else 'SHORT'
+            if book.has_open(symbol, strategy, direction): continue
 
             print(f"   ⚡ {strategy.upper()} SIGNAL: {symbol} {signal} @ {price}")
 
             if signal == 'BUY':
-                handle_buy_signal(symbol, interval, price, last_time, snapshot)
+                handle_buy_signal(book, symbol, price, last_time, snapshot)
             elif signal == 'SELL':
-                handle_sell_signal(symbol, interval, price, last_time, snapshot)
-
-def handle_buy_signal(symbol, interval, price, time, snapshot):
-    strat = snapshot['strategy']
-    # Close Shorts FOR THIS STRATEGY ONLY
-    open_shorts = PaperTrade.query.filter_by(
-        symbol=symbol, interval=interval, direction='SHORT', status='OPEN', strategy=strat
-    ).all()
-    
-    for trade in open_shorts:
-        close_trade(trade, price, time)
-
-    # Open Long
-    new_trade = PaperTrade(
-        symbol=symbol, interval=interval, direction='LONG', status='OPEN',
-        entry_time=time, entry_price=price, invested_amount=INVESTMENT_AMOUNT,
-        quantity=INVESTMENT_AMOUNT / price,
-        trend_snapshot=snapshot['trend'],
-        forecast_snapshot=snapshot['forecast'],
-        cycle_snapshot=snapshot['cycle'],
-        fast_snapshot=snapshot['fast'],
-        strategy=strat 
-    )
-    db.session.add(new_trade)
-    db.session.commit()
-
-def handle_sell_signal(symbol, interval, price, time, snapshot):
-    strat = snapshot['strategy']
-    # Close Longs FOR THIS STRATEGY ONLY
-    open_longs = PaperTrade.query.filter_by(
-        symbol=symbol, interval=interval, direction='LONG', status='OPEN', strategy=strat
-    ).all()
-    
-    for trade in open_longs:
-        close_trade(trade, price, time)
-
-    # Open Short
-    new_trade = PaperTrade(
-        symbol=symbol, interval=interval, direction='SHORT', status='OPEN',
-        entry_time=time, entry_price=price, invested_amount=INVESTMENT_AMOUNT,
-        quantity=INVESTMENT_AMOUNT / price,
-        trend_snapshot=snapshot['trend'],
-        forecast_snapshot=snapshot['forecast'],
-        cycle_snapshot=snapshot['cycle'],
-        fast_snapshot=snapshot['fast'],
-        strategy=strat 
-    )
-    db.session.add(new_trade)
-    db.session.commit()
+                handle_sell_signal(book, symbol, price, last_time, snapshot)
+
+    book.flush()
+
+class TradeBook:
+    """
+    In-memory view of the OPEN paper trades of one interval, keyed by
+    (symbol, strategy, direction). Opens and closes are collected and written
+    by flush() in one transaction (bulk INSERT + bulk UPDATE by primary key).
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.open = {}
+        self.closes = []
+        self.opens = []
+        trades = PaperTrade.query.filter_by(interval=interval, status='OPEN').all()
+        for trade in trades:
+            self.open.setdefault((trade.symbol, trade.strategy, trade.direction), []).append(trade)
+
+    def has_open(self, symbol, strategy, direction):
+        return bool(self.open.get((symbol, strategy, direction)))
+
+    def close_all(self, symbol, strategy, direction, exit_price, exit_time):
+        for trade in self.open.pop((symbol, strategy, direction), []):
+            if isinstance(trade, dict):
+                # Opened earlier in this run and not inserted yet: insert it closed
+                trade.update(exit_values(trade['direction'], trade['entry_price'], trade['quantity'],
+                                         trade['invested_amount'], exit_price, exit_time))
+            else:
+                self.closes.append(close_trade(trade, exit_price, exit_time))
+
+    def add(self, symbol, direction, price, time, snapshot):
+        trade = {
+            'symbol': symbol, 'interval': self.interval, 'direction': direction, 'status': 'OPEN',
+            'entry_time': time, 'entry_price': price, 'invested_amount': INVESTMENT_AMOUNT,
+            'quantity': INVESTMENT_AMOUNT / price,
+            'trend_snapshot': snapshot['trend'],
+            'forecast_snapshot': snapshot['forecast'],
+            'cycle_snapshot': snapshot['cycle'],
+            'fast_snapshot': snapshot['fast'],
+            'strategy': snapshot['strategy'],
+            # Same keys in every row of the bulk INSERT (set if it is closed before flush)
+            'exit_time': None, 'exit_price': None, 'pnl': None, 'pnl_pct': None
+        }
+        self.opens.append(trade)
+        self.open.setdefault((symbol, snapshot['strategy'], direction), []).append(trade)
+
+    def flush(self):
+        if not self.opens and not self.closes:
+            return
+        try:
+            if self.closes:
+                db.session.execute(update(PaperTrade), self.closes)
+            if self.opens:
+                db.session.execute(insert(PaperTrade), self.opens)
+            db.session.commit()
+            print(f"   💾 [ForwardTest] {self.interval}: opened {len(self.opens)}, closed {len(self.closes)}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"   ❌ [ForwardTest] Failed to save trades for {self.interval}: {e}")
+        self.opens, self.closes = [], []
+
+def handle_buy_signal(book, symbol, price, time, snapshot):
+    # Close Shorts FOR THIS STRATEGY ONLY, then Open Long
+    book.close_all(symbol, snapshot['strategy'], 'SHORT', price, time)
+    book.add(symbol, 'LONG', price, time, snapshot)
+
+def handle_sell_signal(book, symbol, price, time, snapshot):
+    # Close Longs FOR THIS STRATEGY ONLY, then Open Short
+    book.close_all(symbol, snapshot['strategy'], 'LONG', price, time)
+    book.add(symbol, 'SHORT', price, time, snapshot)
 
 def close_trade(trade, exit_price, exit_time):
-    trade.status = 'CLOSED'
-    trade.exit_price = exit_price
-    trade.exit_time = exit_time
-    
-    if trade.direction == 'LONG':
-        trade.pnl = (exit_price - trade.entry_price) * trade.quantity
+    """Exit values for an OPEN trade, as a bulk-update row keyed by id."""
+    return {'id': trade.id, **exit_values(trade.direction, trade.entry_price, trade.quantity,
+                                          trade.invested_amount, exit_price, exit_time)}
+
+def exit_values(direction, entry_price, quantity, invested_amount, exit_price, exit_time):
+    if direction == 'LONG':
+        pnl = (exit_price - entry_price) * quantity
     else:
-        trade.pnl = (trade.entry_price - exit_price) * trade.quantity
+        pnl = (entry_price - exit_price) * quantity
         
-    trade.pnl_pct = (trade.pnl / trade.invested_amount) * 100
-    db.session.merge(trade)
-    db.session.commit()
\ No newline at end of file
+    return {
+        'status': 'CLOSED', 'exit_price': exit_price, 'exit_time': exit_time,
+        'pnl': pnl, 'pnl_pct': (pnl / invested_amount) * 100
+    }
@@ -0,0 +1,155 @@
+import threading
+from datetime import datetime, timezone
+from app import db
+from app.models import MarketData
+from app.services.bars import BarArrays
+
+# Higher timeframe -> (interval it is rolled up from, bucket length in seconds)
+ROLLUPS = {
+    '5min': ('1min', 300),
+    '15min': ('1min', 900),
+    '30min': ('1min', 1800),
+    '1h': ('1min', 3600),
+    '4h': ('1min', 14400),
+    '1day': ('1min', 86400),
+    '1week': ('1day', 604800),
+}
+# Weekly buckets start on Monday (the epoch is a Thursday, 1970-01-05 the first Monday)
+WEEK_ORIGIN = 4 * 86400
+
+# (symbol, interval) -> Bucket currently being filled
+_buckets = {}
+_lock = threading.Lock()
+
+def bucket_start(ts, interval):
+    """Start (unix seconds) of the `interval` bucket holding unix time `ts`."""
+    size = ROLLUPS[interval][1]
+    origin = WEEK_ORIGIN if interval == '1week' else 0
+    return (ts - origin) // size * size + origin
+
+def _to_unix(dt):
+    if dt.tzinfo is not None:
+        return int(dt.timestamp())
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+class Bucket:
+    """
+    Running OHLCV state of one open bucket.
+
+    Every source bar before the newest one is folded into open/high/low/
+    close/volume; the newest bar is kept apart because the source keeps
+    re-sending it while it is still forming (the live 1-min bar, or the
+    current day for the weekly bucket) and a re-sent bar replaces it.
+    """
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'volume', 'last_time', 'last')
+
+    def __init__(self, start):
+        self.start = start
+        self.open = self.high = self.low = self.close = None
+        self.volume = 0.0
+        self.last_time = None
+        self.last = None
+
+    def _fold(self, bar):
+        o, h, l, c, v = bar
+        if self.open is None:
+            self.open, self.high, self.low = o, h, l
+        else:
+            self.high = max(self.high, h)
+            self.low = min(self.low, l)
+        self.close = c
+        self.volume += v or 0.0
+
+    def add(self, t, bar):
+        """Adds source bar (o, h, l, c, v) at unix time `t`; bars older than the newest are ignored."""
+        if self.last_time is not None and t < self.last_time:
+            return
+        if t != self.last_time and self.last is not None:
+            self._fold(self.last)
+        self.last_time, self.last = t, bar
+
+    def candle(self):
+        o, h, l, c, v = self.last
+        if self.open is not None:
+            o, h, l = self.open, max(self.high, h), min(self.low, l)
+        return {
+            "datetime_obj": datetime.fromtimestamp(self.start, tz=timezone.utc),
+            "open": float(o), "high": float(h), "low": float(l),
+            "close": float(c), "volume": float(self.volume + (v or 0.0))
+        }
+
+def _bootstrap(symbol, interval, start, before):
+    """State of the bucket at `start` from the stored source bars before `before`."""
+    source = ROLLUPS[interval][0]
+    stmt = db.select(
+        MarketData.time, MarketData.open, MarketData.high,
+        MarketData.low, MarketData.close, MarketData.volume
+    ).where(
+        MarketData.symbol == symbol,
+        MarketData.interval == source,
+        MarketData.time >= datetime.utcfromtimestamp(start),
+        MarketData.time < datetime.utcfromtimestamp(before)
+    ).order_by(MarketData.time.asc())
+
+    bucket = Bucket(start)
+    for r in db.session.execute(stmt):
+        bucket.add(_to_unix(r.time), (r.open, r.high, r.low, r.close, r.volume))
+    return bucket
+
+def roll(symbol, source, bars):
+    """
+    Folds new `source` bars (BarArrays, or candle dicts in any order with
+    'datetime_obj' or unix 'time') into every timeframe rolled up from `source`.
+
+    Only the open bucket of each timeframe is touched. A timeframe seen for
+    the first time in this process is bootstrapped from the stored source
+    bars of its open bucket, once. Returns {interval: [candle dicts]} with
+    the buckets that changed, oldest first (a bucket that closed during
+    this batch comes before the new open one).
+    """
+    if isinstance(bars, BarArrays):
+        # Already sorted
+        parsed = list(zip(bars.time.tolist(), zip(bars.open.tolist(), bars.high.tolist(), bars.low.tolist(),
+                                                  bars.close.tolist(), bars.volume.tolist())))
+    else:
+        parsed = []
+        for d in bars:
+            dt = d.get('datetime_obj')
+            t = _to_unix(dt) if dt else int(d['time'])
+            parsed.append((t, (d['open'], d['high'], d['low'], d['close'], d['volume'])))
+        parsed.sort(key=lambda x: x[0])
+    if not parsed:
+        return {}
+
+    out = {}
+    with _lock:
+        for interval, (src, _) in ROLLUPS.items():
+            if src != source:
+                continue
+            key = (symbol, interval)
+            bucket = _buckets.get(key)
+            if bucket is None:
+                first = parsed[0][0]
+                bucket = _bootstrap(symbol, interval, bucket_start(first, interval), first)
+
+            candles = []
+            for t, bar in parsed:
+                start = bucket_start(t, interval)
+                if start < bucket.start:
+                    continue
+                if start > bucket.start:
+                    if bucket.last is not None:
+                        candles.append(bucket.candle())
+                    bucket = Bucket(start)
+                bucket.add(t, bar)
+            _buckets[key] = bucket
+            if bucket.last is not None:
+                candles.append(bucket.candle())
+            out[interval] = candles
+    return out
+
+def reset(symbol=None):
+    """Forgets the running state (e.g. after a full rebuild); it is bootstrapped again on the next bar."""
+    with _lock:
+        for key in [k for k in _buckets if symbol is None or k[0] == symbol]:
+            del _buckets[key]
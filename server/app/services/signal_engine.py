@@ -2,6 +2,7 @@ import numpy as np
 from scipy.signal import find_peaks
 from . import ssa_service
 from . import forecast_service 
+from . import signals
 
 def calculate_cycle_position(component_values):
     if len(component_values) < 5: return 50, 'flat'
@@ -14,138 +15,145 @@ def calculate_cycle_position(component_values):
     pos = ((component_values[-1] - avg_sup) / rng) * 100
     return int(round(pos))
 
-def analyze_market_snapshot(close_prices, L_param=30, use_adaptive=True, strategy='basic'):
+def snapshot_window(N, L_param=30, use_adaptive=True):
+    return 39 if use_adaptive else min(L_param, N // 2)
+
+def snapshot_stats(components, forecast_method='spectral', U=None):
+    """
+    Grouped series plus the latest-bar stats shared by every snapshot consumer
+    (trend direction, forecast direction, cycle / fast positions).
+    `forecast_method` picks the forecaster behind forecast_dir ('spectral' or
+    'recurrent'; `U` lets the recurrent one reuse the decomposition's eigenvectors).
+    """
+    groups = ssa_service.group_components(components)
+    trend, cyclic, noise = groups['trend'], groups['cyclic'], groups['noise']
+
+    forecast_dir = "FLAT"
+    try:
+        f_vals = forecast_service.forecast_ssa(components, forecast_steps=20, method=forecast_method, U=U)
+        if len(f_vals) > 0: forecast_dir = "UP" if f_vals[-1] > f_vals[0] else "DOWN"
+    except: pass
+
+    stats = {
+        "trend_dir": "UP" if trend[-1] > trend[-2] else "DOWN",
+        "forecast_dir": forecast_dir,
+        "cycle_pct": calculate_cycle_position(cyclic),
+        "fast_pct": calculate_cycle_position(noise),
+    }
+    return trend, cyclic, noise, stats
+
+def analyze_market_snapshot(close_prices, L_param=30, use_adaptive=True, strategy='basic', components=None,
+                            forecast_method='spectral'):
+    """
+    Evaluates the latest bar of `close_prices` for the given strategy.
+    `components` may be passed in when they were already decomposed (batched callers).
+    """
+    results = analyze_market_snapshot_multi(close_prices, [strategy], L_param, use_adaptive,
+                                            components=components, forecast_method=forecast_method)
+    return results[strategy] if results else None
+
+def analyze_market_snapshot_multi(close_prices, strategies=signals.STRATEGIES, L_param=30, use_adaptive=True,
+                                  components=None, forecast_method='spectral'):
+    """
+    Evaluates the latest bar for several strategies at once: one decomposition,
+    one forecast and one set of stats feed every strategy's signal.
+    Returns {strategy: result} (same result dicts as analyze_market_snapshot),
+    or None if the analysis failed.
+    """
     N = len(close_prices)
-    L = 39 if use_adaptive else min(L_param, N // 2)
+    L = snapshot_window(N, L_param, use_adaptive)
     
     try:
-        components = ssa_service.ssa_decomposition(close_prices, L)
-        trend = components[0]
-        cyclic = components[1:min(3, L)].sum(axis=0)
-        noise = components[min(3, L):min(6, L)].sum(axis=0)
-        reconstructed = trend + cyclic
+        # Full decomposition: the spectral forecast reads every component
+        U = None
+        if components is None:
+            components, U = ssa_service.ssa_decomposition(close_prices, L, return_eigenvectors=True)
+        trend, cyclic, noise, stats = snapshot_stats(components, forecast_method, U)
         
-        curr_price = close_prices[-1]
-        curr_trend = trend[-1]
-        prev_trend = trend[-2]
-        
-        # Current Bar Values
-        curr_recon = reconstructed[-1]
-        curr_noise = noise[-1]
-        prev_noise = noise[-2]
-        
-        cyc_pos = calculate_cycle_position(cyclic)
-        fast_pos = calculate_cycle_position(noise)
-        trend_dir = "UP" if curr_trend > prev_trend else "DOWN"
-        
-        forecast_dir = "FLAT"
-        try:
-            f_vals = forecast_service.forecast_ssa_spectral(components, forecast_steps=20, min_component=1)
-            if len(f_vals) > 0: forecast_dir = "UP" if f_vals[-1] > f_vals[0] else "DOWN"
-        except: pass
+        base = {
+            "signal": None, "price": close_prices[-1], "trend_dir": stats['trend_dir'],
+            "forecast_dir": stats['forecast_dir'], "cycle_pct": stats['cycle_pct'], "fast_pct": stats['fast_pct'],
+            "raw_trend": trend[-1], "raw_cyclic": cyclic[-1], "raw_noise": noise[-1]
+        }
 
-        signal = None
-        
         # --- STRATEGY SELECTION ---
-        
-        # 1. BASIC (Legacy Multi-Entry Slope Logic)
-        if strategy == 'basic':
-            is_hot_buy = (curr_recon < curr_trend) and (curr_price < curr_recon)
-            is_hot_sell = (curr_recon > curr_trend) and (curr_price > curr_recon)
-            
-            # Simple Slope check (can trigger multiple times in a row)
-            is_noise_buy = (curr_noise < 0) and (curr_noise >= prev_noise)
-            is_noise_sell = (curr_noise > 0) and (curr_noise <= prev_noise)
-            
-            if is_hot_buy and is_noise_buy: signal = "BUY"
-            elif is_hot_sell and is_noise_sell: signal = "SELL"
-
-        # 2. BASIC SINGLE (Fixed: First Valid Entry Logic)
-        elif strategy == 'basic_s':
-            # A. Check if CURRENT bar meets Basic criteria (Slope + Hotspot)
-            is_hot_buy = (curr_recon < curr_trend) and (curr_price < curr_recon)
-            is_slope_buy = (curr_noise < 0) and (curr_noise >= prev_noise)
-            
-            is_hot_sell = (curr_recon > curr_trend) and (curr_price > curr_recon)
-            is_slope_sell = (curr_noise > 0) and (curr_noise <= prev_noise)
-            
-            if is_hot_buy and is_slope_buy:
-                # B. Validation: Is this the FIRST signal in the current noise cycle?
-                is_first = True
-                # Loop backward from previous bar (N-2)
-                for k in range(N-2, 0, -1):
-                    k_noise = noise[k]
-                    # Stop if we exit the negative cycle
-                    if k_noise >= 0: break 
-                    
-                    # Check if bar 'k' was ALSO a signal
-                    k_price = close_prices[k]; k_trend = trend[k]; k_recon = reconstructed[k]
-                    k_prev_noise = noise[k-1]
-                    
-                    k_hot = (k_recon < k_trend) and (k_price < k_recon)
-                    k_slope = (k_noise >= k_prev_noise)
-                    
-                    if k_hot and k_slope:
-                        # Found an earlier signal in the same cycle -> This is NOT the first
-                        is_first = False
-                        break
-                
-                if is_first: signal = "BUY"
-
-            elif is_hot_sell and is_slope_sell:
-                is_first = True
-                # Loop backward from previous bar (N-2)
-                for k in range(N-2, 0, -1):
-                    k_noise = noise[k]
-                    # Stop if we exit the positive cycle
-                    if k_noise <= 0: break 
-                    
-                    k_price = close_prices[k]; k_trend = trend[k]; k_recon = reconstructed[k]
-                    k_prev_noise = noise[k-1]
-                    
-                    k_hot = (k_recon > k_trend) and (k_price > k_recon)
-                    k_slope = (k_noise <= k_prev_noise)
-                    
-                    if k_hot and k_slope:
-                        is_first = False
-                        break
-                
-                if is_first: signal = "SELL"
-                
-        # 3. FAST (Momentum Logic)
-        elif strategy == 'fast':
-            down_count = 0; up_count = 0
-            for k in range(N-10, N): 
-                val = noise[k]; prev = noise[k-1]
-                triggered_long = False; triggered_short = False
-                
-                if val < 0:
-                    up_count = 0
-                    if val < prev: 
-                        down_count += 1
-                        if down_count == 5: triggered_long = True
-                    elif val > prev:
-                        if 0 < down_count < 5: triggered_long = True
-                        down_count = 0
-                elif val > 0:
-                    down_count = 0
-                    if val > prev: 
-                        up_count += 1
-                        if up_count == 5: triggered_short = True
-                    elif val < prev:
-                        if 0 < up_count < 5: triggered_short = True
-                        up_count = 0
-                else: down_count = 0; up_count = 0
-                
-                if k == N - 1:
-                    if triggered_long: signal = "BUY"
-                    elif triggered_short: signal = "SELL"
-
-        return {
-            "signal": signal, "price": curr_price, "trend_dir": trend_dir,
-            "forecast_dir": forecast_dir, "cycle_pct": cyc_pos, "fast_pct": fast_pos,
-            "raw_trend": curr_trend, "raw_cyclic": cyclic[-1], "raw_noise": curr_noise
-        }
+        # Whole-series evaluation (shared with the routes and the backtest); only the last bar is traded.
+        # FAST restarts its counters 10 bars back, as the live snapshot always has.
+        results = {}
+        for strategy in strategies:
+            signal = None
+            if strategy in signals.STRATEGIES:
+                start = N - 10 if strategy == 'fast' else 1
+                codes = signals.strategy_signals(strategy, close_prices, trend, cyclic, noise, start=start)
+                signal = signals.SIGNAL_NAMES.get(int(codes[-1]))
+            results[strategy] = dict(base, signal=signal)
+        return results
     except Exception as e:
         print(f"Signal Engine Error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def snapshot_many(items, strategies=signals.STRATEGIES, forecast_method='spectral'):
+    """
+    analyze_market_snapshot_multi() for (symbol, interval, closes) items, with
+    one batched SSA per series length. Runs as an ssa_pool task.
+    """
+    closes_list = [closes for _, _, closes in items]
+    batched = ssa_service.ssa_decomposition_many(closes_list, snapshot_window)
+    return [analyze_market_snapshot_multi(closes, strategies, components=components, forecast_method=forecast_method)
+            for closes, components in zip(closes_list, batched)]
+
+def precompute_snapshots(close_prices, window=500, indices=None, L_param=30, use_adaptive=True, chunk_size=64,
+                         forecast_method='spectral'):
+    """
+    As-of analyze_market_snapshot() values for many bars of one history in one pass.
+
+    Bar i is analysed on close_prices[i-window+1 : i+1], exactly like a per-bar
+    call, but the windows are decomposed in batches of `chunk_size` with one
+    stacked SVD each. `indices` restricts the work to the bars that need it.
+    Returns a dict of per-bar arrays; bars that were not computed have valid=False.
+    """
+    closes = np.asarray(close_prices, dtype=float)
+    n = len(closes)
+    if indices is None:
+        indices = np.arange(window - 1, n)
+    indices = np.asarray(indices, dtype=int)
+    indices = indices[(indices >= window - 1) & (indices < n)]
+
+    result = {
+        "valid": np.zeros(n, dtype=bool),
+        "raw_trend": np.full(n, np.nan),
+        "raw_cyclic": np.full(n, np.nan),
+        "raw_noise": np.full(n, np.nan),
+        "trend_dir": np.full(n, None, dtype=object),
+        "forecast_dir": np.full(n, None, dtype=object),
+        "cycle_pct": np.zeros(n, dtype=int),
+        "fast_pct": np.zeros(n, dtype=int),
+    }
+    if len(indices) == 0:
+        return result
+
+    L = snapshot_window(window, L_param, use_adaptive)
+    windows = np.lib.stride_tricks.sliding_window_view(closes, window)
+
+    for start in range(0, len(indices), chunk_size):
+        chunk = indices[start:start + chunk_size]
+        try:
+            batch = ssa_service.ssa_decomposition_batch(windows[chunk - window + 1], L)
+        except Exception as e:
+            print(f"Snapshot Precompute Error: {e}")
+            continue
+
+        for i, components in zip(chunk, batch):
+            try:
+                trend, cyclic, noise, stats = snapshot_stats(components, forecast_method)
+            except Exception as e:
+                print(f"Snapshot Precompute Error: {e}")
+                continue
+            result["valid"][i] = True
+            result["raw_trend"][i] = trend[-1]
+            result["raw_cyclic"][i] = cyclic[-1]
+            result["raw_noise"][i] = noise[-1]
+            for key in ("trend_dir", "forecast_dir", "cycle_pct", "fast_pct"):
+                result[key][i] = stats[key]
+
+    return result
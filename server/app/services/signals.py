@@ -0,0 +1,121 @@
+import numpy as np
+
+# Per-bar signal codes returned by the evaluators
+BUY, SELL, NO_SIGNAL = 1, -1, 0
+SIGNAL_NAMES = {BUY: "BUY", SELL: "SELL"}
+
+# Bars in a row the fast noise must fall (rise) before a BUY (SELL)
+FAST_RUN = 5
+
+STRATEGIES = ('basic', 'basic_s', 'fast')
+
+def _prev(values):
+    """values shifted right by one bar (bar 0 is its own predecessor)."""
+    return np.concatenate([values[:1], values[:-1]])
+
+def basic_conditions(close, trend, cyclic, noise, start=1):
+    """
+    BASIC entry conditions for every bar as (buy, sell) boolean arrays.
+
+    Hot zone: the reconstruction (trend + cyclic) sits on the far side of
+    the trend and price is beyond the reconstruction.
+    Noise slope: noise is negative and not falling (BUY), or positive and
+    not rising (SELL). Bars before `start` (and bar 0, which has no slope) are False.
+    """
+    close = np.asarray(close, dtype=float)
+    trend = np.asarray(trend, dtype=float)
+    noise = np.asarray(noise, dtype=float)
+    recon = trend + np.asarray(cyclic, dtype=float)
+    prev_noise = _prev(noise)
+
+    buy = (recon < trend) & (close < recon) & (noise < 0) & (noise >= prev_noise)
+    sell = (recon > trend) & (close > recon) & (noise > 0) & (noise <= prev_noise)
+    buy[:max(start, 1)] = False
+    sell[:max(start, 1)] = False
+    return buy, sell
+
+def _to_codes(buy, sell):
+    return np.where(buy, BUY, np.where(sell, SELL, NO_SIGNAL)).astype(np.int8)
+
+def _first_in_run(mask, run_id):
+    """Keeps only the first True of `mask` within each run_id."""
+    first = np.zeros_like(mask)
+    hits = np.flatnonzero(mask)
+    if len(hits):
+        ids = run_id[hits]
+        first[hits[np.concatenate([[True], ids[1:] != ids[:-1]])]] = True
+    return first
+
+def basic_signals(close, trend, cyclic, noise, start=1):
+    """BASIC: every bar meeting the hot-zone + noise-slope conditions."""
+    return _to_codes(*basic_conditions(close, trend, cyclic, noise, start))
+
+def basic_single_signals(close, trend, cyclic, noise, start=1):
+    """
+    BASIC_S: only the first BASIC signal of each noise half-cycle.
+    A BUY run is a stretch of negative noise (a SELL run, positive noise);
+    it ends at the first bar where noise crosses or touches zero.
+    """
+    noise = np.asarray(noise, dtype=float)
+    buy, sell = basic_conditions(close, trend, cyclic, noise, start)
+    buy = _first_in_run(buy, np.cumsum(noise >= 0))
+    sell = _first_in_run(sell, np.cumsum(noise <= 0))
+    return _to_codes(buy, sell)
+
+def _run_counter(inc, reset):
+    """Counter value after each bar: +1 on `inc`, back to 0 on `reset`, unchanged otherwise."""
+    counts = np.cumsum(inc)
+    idx = np.arange(len(inc))
+    last_reset = np.maximum.accumulate(np.where(reset, idx, -1))
+    return counts - np.where(last_reset >= 0, counts[np.maximum(last_reset, 0)], 0)
+
+def fast_signals(noise, start=1):
+    """
+    FAST (noise momentum), with both counters starting at 0 on bar `start`:
+    - BUY when negative noise has fallen FAST_RUN bars in a row, or turns up
+      after a shorter (1..FAST_RUN-1 bar) fall;
+    - SELL mirrors it on positive noise.
+    A zero-crossing (or exactly zero noise) resets the opposite counter.
+    """
+    noise = np.asarray(noise, dtype=float)
+    codes = np.zeros(len(noise), dtype=np.int8)
+    start = max(start, 1)
+    if len(noise) <= start:
+        return codes
+
+    val = noise[start:]
+    prev = noise[start - 1:-1]
+    neg, pos = val < 0, val > 0
+    falling, rising = val < prev, val > prev
+
+    down_inc = neg & falling
+    down = _run_counter(down_inc, ~neg | (neg & rising))
+    up_inc = pos & rising
+    up = _run_counter(up_inc, ~pos | (pos & falling))
+    down_before = np.concatenate([[0], down[:-1]])
+    up_before = np.concatenate([[0], up[:-1]])
+
+    buy = (down_inc & (down == FAST_RUN)) | (neg & rising & (down_before > 0) & (down_before < FAST_RUN))
+    sell = (up_inc & (up == FAST_RUN)) | (pos & falling & (up_before > 0) & (up_before < FAST_RUN))
+    codes[start:] = _to_codes(buy, sell)
+    return codes
+
+def strategy_signals(strategy, close, trend, cyclic, noise, start=1):
+    """Per-bar signal codes (BUY / SELL / NO_SIGNAL) of `strategy` over the whole series."""
+    strategy = (strategy or 'basic').lower()
+    if strategy == 'basic':
+        return basic_signals(close, trend, cyclic, noise, start)
+    if strategy == 'basic_s':
+        return basic_single_signals(close, trend, cyclic, noise, start)
+    if strategy == 'fast':
+        return fast_signals(noise, start)
+    raise ValueError(f"Unknown strategy '{strategy}' (expected one of {STRATEGIES})")
+
+def latest_signal(codes, after=-1, value=None):
+    """
+    Index of the most recent non-zero code (or of `value`) at an index
+    greater than `after`; None if there is none.
+    """
+    hits = np.flatnonzero(codes != 0 if value is None else codes == value)
+    hits = hits[hits > after]
+    return int(hits[-1]) if len(hits) else None
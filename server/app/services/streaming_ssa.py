@@ -0,0 +1,165 @@
+import numpy as np
+from . import ssa_service
+from .signal_engine import calculate_cycle_position
+
+# Live decompositions, one per (symbol, interval)
+_streams = {}
+
+class StreamGap(Exception):
+    """The appended bar does not follow the stream's last bar (bars were missed)."""
+
+class StreamingSSA:
+    """
+    Sliding-window SSA for one (symbol, interval) that is updated bar by bar
+    instead of recomputing a full SVD.
+
+    Keeps the L x L lag-covariance S = X X^T of the current window. Appending a
+    bar (and dropping the oldest) only swaps one trajectory column, i.e. a
+    rank-one downdate + update of S. The leading eigenvectors are then refined
+    by a few warm-started subspace iterations; a full eigendecomposition is
+    redone when the residual drifts past `drift_tol` or every `refresh_every` bars.
+
+    `oversample` extra guard vectors are iterated along with the k tracked
+    ones: the noise components sit close to the rest of the spectrum, and the
+    guard vectors keep subspace iteration converging at lambda_{k+p+1}/lambda_k.
+    With the defaults (500-bar window, L=39) the emitted values stay within
+    ~1e-5 of a full recomputation, with a full rebuild every few hundred bars.
+    """
+    def __init__(self, series, L=39, window=500, groups=None,
+                 iterations=3, oversample=12, drift_tol=1e-4, refresh_every=500):
+        self.L = L
+        self.window = window
+        self.groups = groups or ssa_service.DEFAULT_GROUPS
+        self.k = max(i for idx in self.groups.values() for i in idx) + 1
+        self.tracked = min(self.k + oversample, L)
+        self.iterations = iterations
+        self.drift_tol = drift_tol
+        self.refresh_every = refresh_every
+        self.last_time = None
+
+        self.buffer = np.asarray(series, dtype=float).flatten()[-window:].copy()
+        if len(self.buffer) - L + 1 < self.k:
+            raise ValueError("Not enough history for a streaming SSA window")
+        self._rebuild()
+
+    def _rebuild(self):
+        """Exact eigendecomposition of the current window."""
+        X = ssa_service._embed(self.buffer, self.L)
+        self.S = X @ X.T
+        self.U, Sigma, _ = ssa_service.leading_eigentriples(X, self.tracked)
+        self.eigenvalues = Sigma ** 2
+        self.bars_since_rebuild = 0
+        self.rebuilds = getattr(self, 'rebuilds', 0) + 1
+
+    def _refine(self):
+        """Warm-started subspace iteration + Rayleigh-Ritz, with a drift check."""
+        self.bars_since_rebuild += 1
+        if self.bars_since_rebuild >= self.refresh_every:
+            self._rebuild()
+            return
+
+        Q = self.U
+        for _ in range(self.iterations):
+            Q, _ = np.linalg.qr(self.S @ Q)
+        eigvals, Y = np.linalg.eigh(Q.T @ self.S @ Q)
+        eigvals, Y = eigvals[::-1], Y[:, ::-1]
+        U = Q @ Y
+
+        # Residual of each tracked Ritz pair relative to its own eigenvalue, so
+        # the small noise components are held to the same standard as the trend
+        k = self.k
+        residual = np.linalg.norm(self.S @ U[:, :k] - U[:, :k] * eigvals[:k], axis=0) / np.maximum(eigvals[:k], 1e-300)
+        if residual.max() > self.drift_tol:
+            self._rebuild()
+            return
+        self.U, self.eigenvalues = U, eigvals
+
+    def append(self, value, time=None, prev_time=None):
+        """
+        A new bar closed: slide the window by one and return latest().
+        `prev_time` is the time of the stored bar right before `time`; if that
+        is not the stream's last bar, raises StreamGap instead of embedding
+        across the missing bars.
+        """
+        if prev_time is not None and self.last_time is not None and prev_time != self.last_time:
+            raise StreamGap(f"expected a bar after {self.last_time}, the previous stored bar is {prev_time}")
+        L = self.L
+        if len(self.buffer) >= self.window:
+            old_col = self.buffer[:L].copy()
+            self.buffer = np.append(self.buffer[1:], value)
+            self.S -= np.outer(old_col, old_col)
+        else:
+            self.buffer = np.append(self.buffer, value)
+        new_col = self.buffer[-L:]
+        self.S += np.outer(new_col, new_col)
+        self.last_time = time
+        self._refine()
+        return self.latest()
+
+    def update_last(self, value):
+        """The forming (newest) bar changed: replace it and return latest()."""
+        old_col = self.buffer[-self.L:].copy()
+        self.buffer[-1] = value
+        new_col = self.buffer[-self.L:]
+        self.S += np.outer(new_col, new_col) - np.outer(old_col, old_col)
+        self._refine()
+        return self.latest()
+
+    def latest(self):
+        """
+        Latest trend/cyclic/noise values plus the trend direction, in O(L*k).
+
+        The last point of a Hankelized series is the bottom-right cell of the
+        group's trajectory matrix, i.e. (U_g U_g^T x_K)[L-1] for the last
+        column x_K; the point before averages the two cells of its anti-diagonal.
+        """
+        L = self.L
+        last_col = self.buffer[-L:]
+        prev_col = self.buffer[-L - 1:-1]
+        d = self.U.shape[1]
+
+        values = {}
+        prev_values = {}
+        for name, idx in self.groups.items():
+            idx = [i for i in idx if i < d]
+            U_g = self.U[:, idx]
+            proj_last = U_g @ (U_g.T @ last_col)
+            proj_prev = U_g @ (U_g.T @ prev_col)
+            values[name] = float(proj_last[-1])
+            prev_values[name] = float((proj_last[-2] + proj_prev[-1]) / 2)
+
+        values['trend_dir'] = "UP" if values['trend'] > prev_values['trend'] else "DOWN"
+        return values
+
+    def positions(self):
+        """
+        Cycle / fast positions (as signal_engine.snapshot_stats) of the current
+        window. Unlike latest() they need the whole reconstructed cyclic and
+        noise series: U^T X over every column plus one FFT convolution per
+        group, O(N*(L*k + log N)), so only callers that store them ask.
+        """
+        d = self.U.shape[1]
+        k = min(self.k, d)
+        X = ssa_service._embed(self.buffer, self.L)
+        U = self.U[:, :k]
+        cyclic, noise = ssa_service._hankelize_groups(U, U.T @ X, [
+            [i for i in self.groups[name] if i < k] for name in ('cyclic', 'noise')
+        ])
+        return {'cycle_pos': calculate_cycle_position(cyclic), 'fast_pos': calculate_cycle_position(noise)}
+
+def get_stream(symbol, interval, load_history, L=39, window=500):
+    """
+    Returns the live StreamingSSA for (symbol, interval), creating it from
+    `load_history()` (closes, oldest -> newest, plus the last bar time) on first use.
+    """
+    key = (symbol, interval)
+    stream = _streams.get(key)
+    if stream is None:
+        closes, last_time = load_history()
+        stream = StreamingSSA(closes, L=L, window=window)
+        stream.last_time = last_time
+        _streams[key] = stream
+    return stream
+
+def drop_stream(symbol, interval):
+    _streams.pop((symbol, interval), None)
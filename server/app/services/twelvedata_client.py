@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+# Point at a local stub server in tests
+BASE_URL = os.environ.get('TWELVE_DATA_BASE_URL', 'https://api.twelvedata.com').rstrip('/')
+# API credits per minute (a batch time_series request costs one credit per symbol)
+RATE_PER_MINUTE = int(os.environ.get('TWELVE_DATA_RATE', 55))
+# Requests in flight at once
+MAX_CONCURRENCY = int(os.environ.get('TWELVE_DATA_CONCURRENCY', 8))
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 2.0
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: holds up to `capacity` credits and refills at
+    `rate` credits per second. acquire() blocks until the credits are there.
+    """
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        # A request that costs more than the bucket holds waits for a full bucket
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self):
+        """Empties the bucket (the server said the quota is used up)."""
+        with self._lock:
+            self._refill()
+            self.tokens = 0.0
+
+class TwelveDataClient:
+    """
+    Shared Twelve Data client: one pooled requests.Session, a token bucket
+    holding the per-minute credit quota for every caller in the process, and
+    retries with exponential backoff on 429s and network errors.
+    """
+    def __init__(self, base_url=BASE_URL, rate_per_minute=RATE_PER_MINUTE,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+        self.base_url = base_url.rstrip('/')
+        self.limiter = TokenBucket(rate_per_minute, rate_per_minute / 60.0)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _log_call(self, source, cost):
+        with self._calls_lock:
+            self.calls += 1
+            n = self.calls
+        print(f"💰 [API] Call #{n} ({cost} credits) | Source: {source}")
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * (2 ** attempt)
+
+    def get(self, endpoint, params, cost=1, timeout=10, source="API"):
+        """
+        GET {base_url}/{endpoint} once the limiter grants `cost` credits.
+        Returns the decoded JSON, or None after the retries are used up.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(cost)
+            self._log_call(source, cost)
+            try:
+                r = self.session.get(url, params=params, timeout=timeout)
+                data = r.json() if r.status_code != 429 else None
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if attempt == self.max_retries:
+                    print(f"❌ [API] {source} failed: {e}")
+                    return None
+                delay = self._retry_delay(attempt)
+                print(f"⚠️ [API] {source}: {e}. Retrying in {delay:.0f}s...")
+                time.sleep(delay)
+                continue
+
+            # Twelve Data reports an exhausted quota either as HTTP 429 or as a JSON error body
+            rate_limited = r.status_code == 429 or (isinstance(data, dict) and data.get('code') == 429)
+            if not rate_limited:
+                return data
+            self.limiter.drain()
+            if attempt == self.max_retries:
+                print(f"❌ [API] {source}: rate limited, giving up")
+                return data
+            delay = self._retry_delay(attempt, r)
+            print(f"⚠️ [API] {source}: rate limited. Retrying in {delay:.0f}s...")
+            time.sleep(delay)
+        return None
+
+    def time_series(self, symbols, interval, api_key, outputsize=500, source="API", timeout=10, **params):
+        """
+        /time_series for one symbol (returns its JSON) or a list of symbols
+        (one batch request costing one credit per symbol; returns {symbol: JSON}).
+        """
+        batch = not isinstance(symbols, str)
+        names = list(symbols) if batch else [symbols]
+        query = {"symbol": ",".join(names), "interval": interval, "apikey": api_key, "outputsize": outputsize}
+        query.update(params)
+        data = self.get("time_series", query, cost=len(names), timeout=timeout, source=source)
+        if not batch or data is None:
+            return data
+        # A one-symbol batch comes back in the plain (unkeyed) format; a failed
+        # batch is a single error body, which is passed through as is
+        if len(names) == 1:
+            return {names[0]: data}
+        return data
+
+    def map(self, fn, items):
+        """Runs fn(item) for every item on up to max_concurrency threads; results in input order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The process-wide client, so every fetcher shares one session and one quota."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TwelveDataClient()
+        return _client
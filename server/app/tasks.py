@@ -1,14 +1,23 @@
-import requests
-import pandas as pd
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from sqlalchemy import func
 import calendar
-from datetime import datetime, timezone
+from datetime import datetime
 from flask import current_app
 from app import db
 from app.models import MarketData
-from app.services.data_manager import save_to_db, TRACKED_ASSETS, track_api_call
+from app.services.data_manager import save_to_db, TRACKED_ASSETS
 from app.services.forward_test_service import run_forward_test 
 from app.services.signal_engine import analyze_market_snapshot 
+from app.services import streaming_ssa, rollup, twelvedata_client
+from app.services.bars import parse_values
+
+# Fetched chunks allowed to wait for the DB stage
+PIPELINE_DEPTH = 2
 
 def is_asset_trading(symbol):
     """
@@ -41,59 +50,135 @@ def is_asset_trading(symbol):
     
     return True
 
+def load_ssa_history(symbol, interval, before, limit=499):
+    """
+    Closes (oldest -> newest) strictly before `before`, plus the time of the
+    last one. Used to warm a streaming decomposition.
+    """
+    stmt = db.select(MarketData.time, MarketData.close).filter(
+        MarketData.symbol == symbol,
+        MarketData.interval == interval,
+        MarketData.time < before
+    ).order_by(MarketData.time.desc()).limit(limit)
+
+    rows = db.session.execute(stmt).all()[::-1]
+    closes = np.array([r.close for r in rows], dtype=float)
+    last_time = rows[-1].time if rows else None
+    return closes, last_time
+
+def previous_bar_time(symbol, interval, before):
+    """Time of the newest stored bar strictly before `before` (None if there is none)."""
+    return db.session.execute(
+        db.select(func.max(MarketData.time)).filter(
+            MarketData.symbol == symbol,
+            MarketData.interval == interval,
+            MarketData.time < before
+        )
+    ).scalar()
+
 def enrich_data_with_ssa(symbol, interval, new_candle_dict):
     """
-    Fetches historical context, runs SSA, and adds SSA stats to the new_candle_dict.
-    
-    [PRODUCTION NOTE]: Temporarily DISABLED to save resources. 
-    Uncomment the block below to enable SSA caching for Backtesting.
+    Adds the SSA stats (trend/cyclic/noise, trend direction, cycle / fast
+    positions) to new_candle_dict.
+
+    Uses a long-lived StreamingSSA per (symbol, interval): a new bucket appends
+    one bar, a re-aggregated forming bucket replaces the newest bar, so each
+    call costs a few small matrix products (plus one pass over the window for
+    the cycle / fast positions) instead of a full 500-bar SVD.
+    Controlled by Config.SSA_ENRICHMENT_ENABLED.
     """
-    return new_candle_dict
+    if not current_app.config.get('SSA_ENRICHMENT_ENABLED'):
+        return new_candle_dict
 
-    # --- SSA LOGIC DISABLED FOR NOW ---
-    # try:
-    #     # We need ~400-500 bars of history to run a stable SSA
-    #     required_history = 500
-        
-    #     # Fetch recent history from DB (excluding the new candle we are about to save)
-    #     stmt = db.select(MarketData.close).filter(
-    #         MarketData.symbol == symbol,
-    #         MarketData.interval == interval
-    #     ).order_by(MarketData.time.desc()).limit(required_history)
-        
-    #     history_results = db.session.execute(stmt).scalars().all()
-        
-    #     # Prepare data for SSA (Oldest -> Newest + Current New Candle)
-    #     history_closes = list(reversed(history_results))
-    #     history_closes.append(new_candle_dict['close'])
-        
-    #     # If we still don't have enough data (e.g. fresh asset), skip SSA
-    #     if len(history_closes) < 50:
-    #         return new_candle_dict
+    try:
+        candle_time = new_candle_dict['datetime_obj'].replace(tzinfo=None)
+        close = new_candle_dict['close']
 
-    #     # Run Signal Engine Analysis on this snapshot
-    #     analysis = analyze_market_snapshot(np.array(history_closes))
-        
-    #     if analysis:
-    #         new_candle_dict['ssa_trend_dir'] = analysis.get('trend_dir')
-    #         new_candle_dict['ssa_cycle_pos'] = analysis.get('cycle_pct')
-    #         new_candle_dict['ssa_fast_pos'] = analysis.get('fast_pct')
-            
-    #         if 'raw_trend' in analysis:
-    #             new_candle_dict['ssa_trend'] = analysis['raw_trend']
-    #             new_candle_dict['ssa_cyclic'] = analysis['raw_cyclic']
-    #             new_candle_dict['ssa_noise'] = analysis['raw_noise']
-                
-    # except Exception as e:
-    #     print(f"⚠️ SSA Seed Error ({symbol} {interval}): {e}")
+        stream = streaming_ssa.get_stream(
+            symbol, interval, lambda: load_ssa_history(symbol, interval, candle_time)
+        )
+
+        if stream.last_time is None or candle_time > stream.last_time:
+            prev_time = previous_bar_time(symbol, interval, candle_time)
+            try:
+                analysis = stream.append(close, candle_time, prev_time)
+            except streaming_ssa.StreamGap:
+                # Bars were missed (e.g. a skipped cycle): warm a new stream from the stored history
+                streaming_ssa.drop_stream(symbol, interval)
+                stream = streaming_ssa.get_stream(
+                    symbol, interval, lambda: load_ssa_history(symbol, interval, candle_time)
+                )
+                analysis = stream.append(close, candle_time)
+        elif candle_time == stream.last_time:
+            analysis = stream.update_last(close)
+        else:
+            # Older bucket (e.g. a repair pass): leave it uncached
+            return new_candle_dict
+
+        new_candle_dict['ssa_trend'] = analysis['trend']
+        new_candle_dict['ssa_cyclic'] = analysis['cyclic']
+        new_candle_dict['ssa_noise'] = analysis['noise']
+        new_candle_dict['ssa_trend_dir'] = analysis['trend_dir']
+        positions = stream.positions()
+        new_candle_dict['ssa_cycle_pos'] = positions['cycle_pos']
+        new_candle_dict['ssa_fast_pos'] = positions['fast_pos']
+
+    except ValueError:
+        # Fresh asset: not enough history for a stable window yet
+        pass
+    except Exception as e:
+        print(f"⚠️ SSA Stream Error ({symbol} {interval}): {e}")
+        streaming_ssa.drop_stream(symbol, interval)
     
-    # return new_candle_dict
+    return new_candle_dict
+
+class StageTimer:
+    """Thread-safe wall time per pipeline stage (summed over chunks) plus the cycle's total."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.totals[name] = self.totals.get(name, 0.0) + elapsed
+
+    def report(self):
+        stages = " | ".join(f"{name} {secs:.2f}s" for name, secs in self.totals.items())
+        return f"{stages} | wall {time.perf_counter() - self.started:.2f}s"
+
+def parse_chunk(active_chunk, resp):
+    """
+    Batch /time_series response -> {symbol: BarArrays} for the symbols
+    that returned values (errors are logged).
+    """
+    if resp is None:
+        print(f"⚠️ API request failed for {', '.join(active_chunk)}")
+        return {}
+
+    if 'code' in resp and isinstance(resp['code'], int) and resp['code'] >= 400:
+        print(f"⚠️ API Error: {resp.get('message')}")
+        return {}
+
+    parsed = {}
+    for sym, data in resp.items():
+        if isinstance(data, dict) and 'values' in data:
+            parsed[sym] = parse_values(data['values'])
+        elif isinstance(data, dict) and 'code' in data:
+            print(f"⚠️ Error for symbol {sym}: {data.get('message')}")
+    return parsed
 
 def update_market_data():
     """
     1. Check Time & Determine Forward Test Triggers (IMMEDIATELY).
-    2. Batch fetch 1min data.
-    3. Aggregate to higher timeframes (including Weekly from Daily).
+    2. Batch fetch 1min data, pipelined with
+    3. Saving and aggregating to higher timeframes (including Weekly from Daily).
     4. Execute Forward Testing if triggered.
     """
     # 1. CAPTURE TIME AT START
@@ -115,74 +200,55 @@ def update_market_data():
     api_key = current_app.config.get('TWELVE_DATA_API_KEY')
     if not api_key: return
 
-    # 2. DATA FETCHING LOOP
+    # 2. DATA PIPELINE: fetch + parse (worker threads) -> bounded queue -> persist + aggregate (this thread)
     chunk_size = 8
     asset_chunks = [TRACKED_ASSETS[i:i + chunk_size] for i in range(0, len(TRACKED_ASSETS), chunk_size)]
+    # Filter out closed assets
+    active_chunks = [active for active in ([s for s in chunk if is_asset_trading(s)] for chunk in asset_chunks) if active]
 
-    for chunk in asset_chunks:
-        # Filter out closed assets
-        active_chunk = [s for s in chunk if is_asset_trading(s)]
-        
-        if not active_chunk:
-            continue
-            
-        symbols_str = ",".join(active_chunk)
-        track_api_call(f"Daemon Batch ({len(active_chunk)} assets)")
-
-        url = "https://api.twelvedata.com/time_series"
-        params = {
-            "symbol": symbols_str,
-            "interval": "1min",
-            "apikey": api_key,
-            "outputsize": 30 
-        }
-        
+    timer = StageTimer()
+    client = twelvedata_client.get_client()
+    fetched = queue.Queue(maxsize=PIPELINE_DEPTH)
+
+    def fetch_stage(active_chunk):
+        parsed = None
         try:
-            r = requests.get(url, params=params, timeout=10)
-            resp = r.json()
-            
-            if 'code' in resp and isinstance(resp['code'], int) and resp['code'] >= 400:
-                print(f"⚠️ API Error: {resp.get('message')}")
-                continue
-
-            # Handle single result format vs dictionary
-            if len(active_chunk) == 1: 
-                if 'code' in resp and resp['code'] >= 400:
-                     print(f"⚠️ Error for symbol {active_chunk[0]}: {resp.get('message')}")
-                     continue
-                resp = {active_chunk[0]: resp}
-
-            for sym, data in resp.items():
-                if isinstance(data, dict) and 'values' in data:
-                    clean_values = []
-                    for d in data['values']:
-                            vol = d.get('volume')
-                            volume_val = float(vol) if vol else 0.0
-                            ts = datetime.strptime(d['datetime'], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
-
-                            clean_values.append({
-                            "datetime_obj": ts,
-                            "open": float(d['open']),
-                            "high": float(d['high']),
-                            "low": float(d['low']),
-                            "close": float(d['close']),
-                            "volume": volume_val
-                        })
-                    
-                    # A. Save 1min (Skip SSA for 1min to save resources/time)
-                    save_to_db(sym, '1min', clean_values)
-                    
-                    # B. Build 5m, 15m, 1h, 4h, 1D from 1min (WITH OPTIONAL SSA SEEDING)
-                    resample_and_save(sym)
-                    
-                    # C. Build 1W from 1D (NEW)
-                    resample_weekly(sym)
+            with timer.stage('fetch'):
+                resp = client.time_series(active_chunk, "1min", api_key, outputsize=30,
+                                          source=f"Daemon Batch ({len(active_chunk)} assets)")
+            with timer.stage('parse'):
+                parsed = parse_chunk(active_chunk, resp)
+        except Exception as e:
+            print(f"❌ Daemon Fetch Failed ({', '.join(active_chunk)}): {e}")
+        finally:
+            # Blocks while PIPELINE_DEPTH chunks are already waiting for the DB stage
+            fetched.put(parsed or {})
+
+    def produce():
+        with ThreadPoolExecutor(max_workers=client.max_concurrency) as pool:
+            list(pool.map(fetch_stage, active_chunks))
+
+    producer = threading.Thread(target=produce, name='daemon-fetch', daemon=True)
+    producer.start()
+
+    # Writes stay on this thread (one DB session)
+    for _ in active_chunks:
+        with timer.stage('wait'):
+            chunk_values = fetched.get()
+        for sym, bars in chunk_values.items():
+            try:
+                # A. Save 1min (Skip SSA for 1min to save resources/time)
+                with timer.stage('persist'):
+                    save_to_db(sym, '1min', bars)
                 
-                elif isinstance(data, dict) and 'code' in data:
-                        print(f"⚠️ Error for symbol {sym}: {data.get('message')}")
+                # B. Roll the new minutes into 5m, 15m, 1h, 4h, 1D and 1W from 1D (WITH OPTIONAL SSA SEEDING)
+                with timer.stage('aggregate'):
+                    rollup_and_save(sym, bars)
+            except Exception as e:
+                print(f"❌ Daemon Batch Failed ({sym}): {e}")
+    producer.join()
 
-        except Exception as e:
-            print(f"❌ Daemon Batch Failed: {e}")
+    print(f"⏱️ [Daemon] {timer.report()}")
 
     # 3. EXECUTE FORWARD TESTS
     try:
@@ -203,99 +269,25 @@ def update_market_data():
 
     print("✅ [Daemon] Cycle Complete.")
 
-def resample_and_save(symbol):
+def rollup_and_save(symbol, minute_bars):
     """
-    Aggregates 1min data into 5m, 15m, 30m, 1h, 4h AND 1DAY.
-    Optionally calculates SSA for the latest closed candle.
+    Updates the open 5m, 15m, 30m, 1h, 4h and 1DAY buckets with the new 1min
+    bars, then the open 1WEEK bucket with the new daily candle (incremental,
+    see services/rollup.py; repair_aggregates does the full rebuilds).
+    Optionally calculates SSA for the latest candles.
     """
     try:
-        # Use last 24h of 1min data
-        since = datetime.utcnow() - pd.Timedelta(hours=24)
-        stmt = db.select(MarketData).filter(
-            MarketData.symbol == symbol,
-            MarketData.interval == '1min',
-            MarketData.time >= since
-        ).order_by(MarketData.time.asc())
-
-        results = db.session.execute(stmt).scalars().all()
-        if not results: return
-
-        data_list = [{
-            'time': r.time, 'open': r.open, 'high': r.high, 'low': r.low, 'close': r.close, 'volume': r.volume
-        } for r in results]
-
-        df = pd.DataFrame(data_list)
-        df.set_index('time', inplace=True)
-
-        aggregations = {
-            '5min': '5min', 
-            '15min': '15min', 
-            '30min': '30min', 
-            '1h': '1h', 
-            '4h': '4h',
-            '1day': '1D' 
-        }
-
-        for interval_name, pandas_rule in aggregations.items():
-            ohlc_dict = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
-            resampled = df.resample(pandas_rule).agg(ohlc_dict).dropna()
+        updates = rollup.roll(symbol, '1min', minute_bars)
+        if '1day' in updates:
+            updates.update(rollup.roll(symbol, '1day', updates['1day']))
 
+        for interval_name, candles in updates.items():
             to_save = []
-            for time_idx, row in resampled.tail(1).iterrows(): 
-                candle_data = {
-                    "datetime_obj": time_idx.replace(tzinfo=timezone.utc),
-                    "open": float(row['open']), "high": float(row['high']), "low": float(row['low']),
-                    "close": float(row['close']), "volume": float(row['volume'])
-                }
-                
-                # Enrich with SSA (Currently disabled internally)
-                candle_data = enrich_data_with_ssa(symbol, interval_name, candle_data)
-                
-                to_save.append(candle_data)
-                
+            for candle_data in candles:
+                # Enrich with SSA (streaming, see Config.SSA_ENRICHMENT_ENABLED)
+                to_save.append(enrich_data_with_ssa(symbol, interval_name, candle_data))
             save_to_db(symbol, interval_name, to_save)
     except Exception as e:
-        print(f"❌ Resample Error ({symbol}): {e}")
-
-def resample_weekly(symbol):
-    """
-    Aggregates 1day data into 1week.
-    """
-    try:
-        # Fetch last 60 days of DAILY data (enough to cover > 8 weeks)
-        since = datetime.utcnow() - pd.Timedelta(days=60)
-        stmt = db.select(MarketData).filter(
-            MarketData.symbol == symbol,
-            MarketData.interval == '1day',
-            MarketData.time >= since
-        ).order_by(MarketData.time.asc())
-
-        results = db.session.execute(stmt).scalars().all()
-        if not results: return
-
-        data_list = [{
-            'time': r.time, 'open': r.open, 'high': r.high, 'low': r.low, 'close': r.close, 'volume': r.volume
-        } for r in results]
-
-        df = pd.DataFrame(data_list)
-        df.set_index('time', inplace=True)
-
-        # 'W-MON' ensures weeks start on Monday, matching most financial charts
-        ohlc_dict = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
-        resampled = df.resample('W-MON', closed='left', label='left').agg(ohlc_dict).dropna()
-
-        to_save = []
-        # Update last 2 weeks (Current live week + potentially previous closed week if we missed it)
-        for time_idx, row in resampled.tail(2).iterrows(): 
-             candle_data = {
-                "datetime_obj": time_idx.replace(tzinfo=timezone.utc),
-                "open": float(row['open']), "high": float(row['high']), "low": float(row['low']),
-                "close": float(row['close']), "volume": float(row['volume'])
-            }
-             # Enrich weekly data too (Currently disabled)
-             candle_data = enrich_data_with_ssa(symbol, '1week', candle_data)
-             to_save.append(candle_data)
-        
-        save_to_db(symbol, '1week', to_save)
-    except Exception as e:
-        print(f"❌ Weekly Resample Error ({symbol}): {e}")
\ No newline at end of file
+        print(f"❌ Rollup Error ({symbol}): {e}")
+        # Start again from the stored bars next cycle
+        rollup.reset(symbol)
@@ -0,0 +1,50 @@
+import sys
+import os
+import time
+import numpy as np
+
+# Ensure we can import from the app
+sys.path.append(os.getcwd())
+
+from app.services import ssa_pool
+from app.services.signal_engine import snapshot_many
+
+# --- CONFIG ---
+SIZES = [15, 30, 60, 120, 240]   # Series per call (TRACKED_ASSETS is 30)
+N = 500                          # Bars per series (same as the routes)
+WORKERS = [2, 4]
+REPEATS = 3
+
+def time_it(items, workers):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        results = ssa_pool.map_series(snapshot_many, items, workers=workers, min_items=0)
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+def run_benchmark():
+    """
+    Serial vs warm pool for the forward-test task. The pool pays a fixed
+    round trip plus shipping the series, and wins only with enough series per
+    call and free cores; SSA_POOL_MIN_ITEMS should sit above the break-even.
+    """
+    print(f"⏱️  SSA pool benchmark: snapshot_many on {N}-bar series, best of {REPEATS}, {os.cpu_count()} CPUs")
+    rng = np.random.default_rng(42)
+    batches = {size: [(f"S{i}", '1h', c) for i, c in enumerate(np.cumsum(rng.normal(size=(size, N)), axis=1) + 100)]
+               for size in SIZES}
+
+    serial = {}
+    for size, items in batches.items():
+        serial[size], _ = time_it(items, 1)
+
+    for workers in WORKERS:
+        ssa_pool.start(workers)
+        for size, items in batches.items():
+            t_pool, _ = time_it(items, workers)
+            print(f"   {size:4d} series | serial {serial[size] * 1000:7.1f} ms | "
+                  f"{workers} workers {t_pool * 1000:7.1f} ms ({serial[size] / t_pool:.1f}x)")
+        ssa_pool.stop()
+
+if __name__ == "__main__":
+    run_benchmark()
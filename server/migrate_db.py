@@ -1,5 +1,6 @@
 from app import create_app, db
 from sqlalchemy import text, inspect
+from app.models import SeedCheckpoint
 
 app = create_app()
 
@@ -42,6 +43,13 @@ def migrate():
                 else:
                     print(f"   ✅ 'market_data.{col_name}' already exists.")
 
+            # --- TASK 3: Checkpoint table for resumable SSA seeding ---
+            if not inspector.has_table('ssa_seed_checkpoint'):
+                print("   🛠️  Creating 'ssa_seed_checkpoint' table...")
+                SeedCheckpoint.__table__.create(conn)
+            else:
+                print("   ✅ 'ssa_seed_checkpoint' already exists.")
+
             trans.commit()
             print("\n🎉 Migration Complete! Database is ready for new code.")
 
@@ -1,9 +1,23 @@
 import os
 from app import create_app
+from app.services import bar_store, ssa_pool
+from app.services.data_manager import TRACKED_ASSETS
 # REMOVE scheduler imports from here
 
 app = create_app()
 
+# Load the latest bars of every tracked asset into this worker's bar store
+with app.app_context():
+    try:
+        bar_store.warm(TRACKED_ASSETS, ['1min', '5min', '15min', '30min', '1h', '4h', '1day', '1week'])
+    except Exception as e:
+        print(f"⚠️ [BarStore] Warm-up skipped: {e}")
+
+# Spawn the SSA workers now rather than on the first /scan (only calls of
+# MIN_ITEMS series or more use them)
+if len(TRACKED_ASSETS) >= ssa_pool.MIN_ITEMS:
+    ssa_pool.start()
+
 # Gunicorn expects 'app' to be importable here.
 # Do NOT start the scheduler here.
 
@@ -1,11 +1,15 @@
 import sys
 import logging
 import signal
+import time
+import threading
 from datetime import datetime
 from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
-from app import create_app
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MAX_INSTANCES
+from app import create_app, db
 from app.tasks import update_market_data
+from app.services import bar_store, ssa_pool
+from app.services.data_manager import TRACKED_ASSETS
 
 # 1. Setup Logging
 logging.basicConfig(
@@ -16,16 +20,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger('ssa_daemon')
 
+# A cycle is due every minute; one that runs longer overlaps the next slot
+CYCLE_BUDGET_SECONDS = 60
+
 # 2. Define the Wrapper
-# We wrap the task to inject the App Context explicitly.
-# This avoids the "Global App" issues in tasks.py.
+# The app is built once per process and its context is pushed for each run,
+# so the SQLAlchemy pool and the in-memory state of the services (rollup
+# buckets, SSA caches, streaming decompositions) stay warm between cycles.
+_app = None
+_run_lock = threading.Lock()
+stats = {'runs': 0, 'overruns': 0, 'skipped': 0, 'last_seconds': 0.0, 'max_seconds': 0.0}
+
+def get_app():
+    global _app
+    if _app is None:
+        _app = create_app()
+        # The forward tests read these from memory; the ingestion keeps them current
+        with _app.app_context():
+            try:
+                bar_store.warm(TRACKED_ASSETS, ['15min', '1h', '4h'])
+            except Exception as e:
+                logger.warning(f"⚠️ [BarStore] Warm-up skipped: {e}")
+            finally:
+                db.session.remove()
+        # The forward tests fan out over the SSA workers once there are enough assets
+        if len(TRACKED_ASSETS) >= ssa_pool.MIN_ITEMS:
+            ssa_pool.start()
+    return _app
+
 def job_wrapper():
-    app = create_app()
-    with app.app_context():
-        try:
-            update_market_data()
-        except Exception as e:
-            logger.error(f"❌ Critical Task Error: {e}")
+    # Second guard behind max_instances=1: never run two cycles at once
+    if not _run_lock.acquire(blocking=False):
+        stats['skipped'] += 1
+        logger.warning(f"⏭️ Previous cycle still running, skipping ({stats['skipped']} skipped so far)")
+        return
+
+    started = time.perf_counter()
+    try:
+        with get_app().app_context():
+            try:
+                update_market_data()
+            except Exception as e:
+                logger.error(f"❌ Critical Task Error: {e}")
+            finally:
+                # Hand the connection back to the pool and drop any failed transaction
+                db.session.remove()
+    finally:
+        _run_lock.release()
+        elapsed = time.perf_counter() - started
+        stats['runs'] += 1
+        stats['last_seconds'] = elapsed
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        if elapsed > CYCLE_BUDGET_SECONDS:
+            stats['overruns'] += 1
+            logger.warning(f"🐢 Cycle overran: {elapsed:.1f}s > {CYCLE_BUDGET_SECONDS}s "
+                           f"({stats['overruns']}/{stats['runs']} runs over budget, max {stats['max_seconds']:.1f}s)")
 
 def run_scheduler():
     # Initialize the BlockingScheduler (Runs in the foreground)
@@ -33,15 +82,23 @@ def run_scheduler():
 
     # 3. Add Event Listener
     def job_listener(event):
-        if event.exception:
+        if event.code == EVENT_JOB_MAX_INSTANCES:
+            stats['skipped'] += 1
+            logger.warning(f"⏭️ Run skipped: previous cycle still running ({stats['skipped']} skipped so far)")
+        elif event.exception:
             logger.error(f"❌ Job FAILED: {event.exception}")
         else:
-            logger.info(f"✅ Job completed successfully.")
+            logger.info(f"✅ Job completed successfully in {stats['last_seconds']:.1f}s.")
+
+    scheduler.add_listener(job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MAX_INSTANCES)
 
-    scheduler.add_listener(job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+    # Build the app (and its connection pool) before the first run
+    get_app()
 
     # 4. Schedule the Job
     # misfire_grace_time=None: "If you miss the start time, run it anyway!"
+    # max_instances=1 + coalesce: an overrunning cycle delays the next one
+    # instead of stacking runs; missed slots collapse into a single run
     scheduler.add_job(
         func=job_wrapper,
         trigger='cron',
@@ -49,6 +106,8 @@ def run_scheduler():
         id='market_update_job',
         replace_existing=True,
         misfire_grace_time=None, 
+        max_instances=1,
+        coalesce=True,
         next_run_time=datetime.now() # <--- FORCE IMMEDIATE RUN
     )
 
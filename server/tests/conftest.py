@@ -0,0 +1,24 @@
+import os
+import sys
+
+# Tests import the app package from server/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+@pytest.fixture
+def sqlite_app():
+    """The app on a fresh in-memory SQLite database, inside an app context."""
+    from app import create_app, db
+    from app.config import Config
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
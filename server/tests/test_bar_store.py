@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app import db
+from app.models import MarketData
+from app.services import bar_store, bars as bars_module, data_manager
+from app.services.bar_store import BarRing
+from app.services.bars import BarArrays
+
+def series(times, offset=0.0):
+    prices = np.asarray(times, dtype=float) + offset
+    return BarArrays(times, prices, prices + 1, prices - 1, prices, np.ones(len(times)))
+
+def assert_bars(bars, times, offset=0.0):
+    expected = series(times, offset)
+    for c in bar_store.COLUMNS:
+        np.testing.assert_array_equal(getattr(bars, c), getattr(expected, c))
+
+def test_merge_appends_past_capacity():
+    ring = BarRing(8)
+    assert ring.merge(series(range(5)))
+    assert ring.merge(series(range(5, 13)))
+    assert (len(ring), ring.newest) == (8, 12)
+    assert_bars(ring.view(8), range(5, 13))
+    assert_bars(ring.view(3), range(10, 13))
+
+def test_merge_replaces_held_bars_in_place():
+    ring = BarRing(8)
+    ring.merge(series(range(10)))
+    # Replaced 7..9, appended 10, ignored 0 (older than a full ring)
+    assert ring.merge(series([0, 7, 8, 9, 10], offset=100.0))
+    held = ring.view(7)
+    np.testing.assert_array_equal(held.time, range(4, 11))
+    np.testing.assert_array_equal(held.close, [4, 5, 6, 107, 108, 109, 110])
+
+def test_merge_reports_gaps():
+    ring = BarRing(8)
+    ring.merge(series([0, 2, 4, 6]))
+    assert not ring.merge(series([3]))
+    # A ring that isn't full can't take bars older than it holds either
+    ring = BarRing(8)
+    ring.merge(series([10, 11]))
+    assert not ring.merge(series([9]))
+
+@pytest.mark.parametrize("n", [3, 7, 8])
+def test_views_never_change(n):
+    ring = BarRing(8)
+    ring.merge(series(range(8)))
+    view = ring.view(n)
+    snapshot = {c: getattr(view, c).copy() for c in bar_store.COLUMNS}
+    ring.merge(series([6, 7, 8], offset=50.0))
+    ring.merge(series(range(9, 9 + 8 - n)))
+    for c in bar_store.COLUMNS:
+        np.testing.assert_array_equal(getattr(view, c), snapshot[c])
+        assert not getattr(view, c).flags.writeable
+
+def test_views_below_capacity_are_zero_copy():
+    ring = BarRing(8)
+    ring.merge(series(range(20)))
+    assert np.shares_memory(ring.view(7).close, ring.buffers['close'])
+    assert not np.shares_memory(ring.view(8).close, ring.buffers['close'])
+
+# --- Store backed by the DB ---
+
+NOW = datetime(2024, 3, 6, 15, 37)
+
+def store(symbol, interval, times, offset=0.0):
+    bars = series([int((t - datetime(1970, 1, 1)).total_seconds()) for t in times], offset)
+    data_manager.upsert_arrays(symbol, interval, bars)
+    db.session.commit()
+
+@pytest.fixture
+def fresh_store(sqlite_app, monkeypatch):
+    monkeypatch.setattr(bar_store, 'ENABLED', True)
+    monkeypatch.setattr(bar_store, 'CAPACITY', 64)
+    bar_store.drop()
+    yield
+    bar_store.drop()
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Counts the DB loads of whole series."""
+    calls = []
+    fetch = bars_module.fetch_bars
+    def counting(*args, **kwargs):
+        calls.append(args[:2])
+        return fetch(*args, **kwargs)
+    monkeypatch.setattr(bar_store, 'fetch_bars', counting)
+    return calls
+
+def test_short_series_served_from_store(fresh_store, loads):
+    store('AAPL', '1week', [NOW - timedelta(weeks=w) for w in range(20, 0, -1)])
+    for _ in range(3):
+        assert len(bar_store.get_bars('AAPL', '1week', 50)) == 20
+    assert loads == [('AAPL', '1week')]
+
+def test_short_series_picks_up_backfill_on_sync(fresh_store, loads):
+    weeks = [NOW - timedelta(weeks=w) for w in range(30, 0, -1)]
+    store('AAPL', '1week', weeks[10:])
+    assert len(bar_store.get_bars('AAPL', '1week', 50)) == 20
+    # Older bars written by another process (no write hook here)
+    store('AAPL', '1week', weeks[:10])
+    bar_store.sync(['AAPL'], '1week', force=True)
+    bars = bar_store.get_bars('AAPL', '1week', 50)
+    np.testing.assert_array_equal(bars.time, bars_module.fetch_bars('AAPL', '1week', 50).time)
+    assert len(bars) == 30 and len(loads) == 2
+
+def test_get_bars_matches_db(fresh_store):
+    store('BTC/USD', '1h', [NOW - timedelta(hours=h) for h in range(100, 0, -1)])
+    for limit in (1, 10, 63, 64):
+        stored = bar_store.get_bars('BTC/USD', '1h', limit)
+        expected = bars_module.fetch_bars('BTC/USD', '1h', limit)
+        for c in bar_store.COLUMNS:
+            np.testing.assert_array_equal(getattr(stored, c), getattr(expected, c))
+    assert len(bar_store.get_bars('BTC/USD', '1h', 80)) == 80
+
+def test_tip_matches_sql_tips(fresh_store, monkeypatch):
+    minutes = [NOW - timedelta(minutes=m) for m in range(60, -1, -1)]
+    store('BTC/USD', '1min', minutes)
+    bar_store.sync(['BTC/USD'], '1min')
+    intervals = ['5min', '15min', '30min', '1h']
+    from_store = data_manager.synthetic_tips(['BTC/USD'], intervals, now=NOW)
+
+    monkeypatch.setattr(bar_store, 'ENABLED', False)
+    from_sql = data_manager.synthetic_tips(['BTC/USD'], intervals, now=NOW)
+    assert sorted(from_store) == sorted(from_sql) == [('BTC/USD', iv) for iv in sorted(intervals)]
+    for key, candle in from_sql.items():
+        assert from_store[key] == pytest.approx(candle)
+
+def test_tip_needs_bars_back_to_start(fresh_store):
+    store('BTC/USD', '1min', [NOW - timedelta(minutes=m) for m in range(10, -1, -1)])
+    bar_store.sync(['BTC/USD'], '1min')
+    start = int((NOW.replace(minute=0) - datetime(1970, 1, 1)).total_seconds())
+    assert bar_store.tip('BTC/USD', start) is None
+    assert bar_store.tip('BTC/USD', start + 35 * 60)['open'] == start + 35 * 60
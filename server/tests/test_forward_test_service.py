@@ -0,0 +1,45 @@
+from datetime import datetime
+from app import db
+from app.models import PaperTrade
+from app.services.forward_test_service import TradeBook, handle_buy_signal, handle_sell_signal
+
+T0, T1, T2 = datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), datetime(2024, 1, 1, 12)
+
+def snapshot(strategy='basic'):
+    return {'trend': 'UP', 'forecast': 'UP', 'cycle': 10, 'fast': 20, 'strategy': strategy}
+
+def trades():
+    return PaperTrade.query.order_by(PaperTrade.id).all()
+
+def test_flush_inserts_opens_and_closes_stored_trades(sqlite_app):
+    book = TradeBook('1h')
+    handle_buy_signal(book, 'BTC/USD', 100.0, T0, snapshot())
+    book.flush()
+
+    book = TradeBook('1h')
+    assert book.has_open('BTC/USD', 'basic', 'LONG')
+    handle_sell_signal(book, 'BTC/USD', 110.0, T1, snapshot())
+    book.flush()
+
+    long, short = trades()
+    assert (long.direction, long.status, long.exit_price, long.exit_time) == ('LONG', 'CLOSED', 110.0, T1)
+    assert long.pnl == (110.0 - 100.0) * (1000.0 / 100.0)
+    assert long.pnl_pct == 10.0
+    assert (short.direction, short.status, short.exit_price) == ('SHORT', 'OPEN', None)
+
+def test_trade_opened_and_closed_before_flush_is_inserted_closed(sqlite_app):
+    book = TradeBook('1h')
+    handle_buy_signal(book, 'ETH/USD', 200.0, T0, snapshot())
+    handle_buy_signal(book, 'ETH/USD', 200.0, T0, snapshot('fast'))
+    handle_sell_signal(book, 'ETH/USD', 180.0, T1, snapshot())
+    handle_buy_signal(book, 'ETH/USD', 190.0, T2, snapshot())
+    book.flush()
+
+    rows = [(t.strategy, t.direction, t.status, t.entry_price, t.exit_price, t.pnl) for t in trades()]
+    assert rows == [
+        ('basic', 'LONG', 'CLOSED', 200.0, 180.0, (180.0 - 200.0) * 5.0),
+        ('fast', 'LONG', 'OPEN', 200.0, None, None),
+        ('basic', 'SHORT', 'CLOSED', 180.0, 190.0, (180.0 - 190.0) * (1000.0 / 180.0)),
+        ('basic', 'LONG', 'OPEN', 190.0, None, None),
+    ]
+    assert not book.opens and not book.closes
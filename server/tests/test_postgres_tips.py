@@ -0,0 +1,131 @@
+"""
+Synthetic tips (the forming higher-timeframe candles) against a real
+PostgreSQL: the UNION ALL / GROUP BY / join query of synthetic_tips, the
+bar store's in-memory tips and the original per-row generate_synthetic_tip.
+Runs only when DATABASE_URL points at a PostgreSQL database (see
+test_postgres_upsert.py); rows of the test symbols are deleted afterwards.
+"""
+import calendar
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+
+if not os.environ.get('DATABASE_URL', '').startswith('postgresql'):
+    pytest.skip("needs DATABASE_URL pointing at PostgreSQL", allow_module_level=True)
+
+from app import create_app, db
+from app.models import MarketData
+from app.services import bar_store, data_manager
+from app.services.bars import BarArrays
+
+SYMBOLS = ['TEST/TIPA', 'TEST/TIPB', 'TEST/TIPC']
+INTERVALS = ['5min', '15min', '30min', '1h', '4h', '1day', '1week']
+# A Wednesday afternoon: the 1day tip reaches back ~940 minutes (inside the
+# bar store's 1024), the 1week tip to Monday (only in the DB)
+NOW = datetime(2024, 3, 6, 15, 37, 20)
+
+def loop_synthetic_tip(symbol, interval, now):
+    """The original generate_synthetic_tip: start of the forming candle, then one pass over its 1min rows."""
+    if interval == '5min':
+        start_time = now.replace(minute=(now.minute // 5) * 5, second=0, microsecond=0)
+    elif interval == '15min':
+        start_time = now.replace(minute=(now.minute // 15) * 15, second=0, microsecond=0)
+    elif interval == '30min':
+        start_time = now.replace(minute=(now.minute // 30) * 30, second=0, microsecond=0)
+    elif interval == '1h':
+        start_time = now.replace(minute=0, second=0, microsecond=0)
+    elif interval == '4h':
+        start_time = now.replace(hour=(now.hour // 4) * 4, minute=0, second=0, microsecond=0)
+    elif interval == '1day':
+        start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif interval == '1week':
+        start_time = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        return None
+
+    candles = MarketData.query.filter(
+        MarketData.symbol == symbol,
+        MarketData.interval == '1min',
+        MarketData.time >= start_time
+    ).order_by(MarketData.time.asc()).all()
+    if not candles: return None
+
+    return {
+        "time": calendar.timegm(start_time.timetuple()), "open": candles[0].open,
+        "high": max(c.high for c in candles), "low": min(c.low for c in candles),
+        "close": candles[-1].close, "volume": sum((c.volume or 0) for c in candles)
+    }
+
+def store_minutes(symbol, end, minutes, seed):
+    """`minutes` 1min bars up to `end`, ~15% of them missing and some with no volume."""
+    rng = np.random.default_rng(seed)
+    offsets = np.sort(rng.choice(minutes, size=int(minutes * 0.85), replace=False))[::-1]
+    times = [int(calendar.timegm((end - timedelta(minutes=int(m))).timetuple())) for m in offsets]
+    close = np.cumsum(rng.normal(size=len(times))) + 100.0
+    open_ = close + rng.normal(scale=0.2, size=len(times))
+    bars = BarArrays(times, open_, np.maximum(open_, close) + 0.3, np.minimum(open_, close) - 0.3,
+                     close, rng.integers(1, 50, len(times)).astype(float))
+    data_manager.upsert_arrays(symbol, '1min', bars)
+    db.session.execute(db.update(MarketData).where(
+        MarketData.symbol == symbol, MarketData.interval == '1min',
+        MarketData.time.in_(bars.datetimes()[::17])
+    ).values(volume=None))
+    db.session.commit()
+
+def delete_rows():
+    db.session.execute(db.delete(MarketData).where(MarketData.symbol.in_(SYMBOLS)))
+    db.session.commit()
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(bar_store, 'ENABLED', True)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        delete_rows()
+        bar_store.drop()
+        store_minutes('TEST/TIPA', NOW.replace(second=0), 8 * 1440, seed=1)
+        store_minutes('TEST/TIPB', NOW.replace(second=0), 8 * 1440, seed=2)
+        # Nothing since this morning: no intraday tips
+        store_minutes('TEST/TIPC', NOW.replace(hour=3, minute=0, second=0), 3 * 1440, seed=3)
+        yield app
+        db.session.rollback()
+        bar_store.drop()
+        delete_rows()
+
+def assert_tips_equal(tips, expected):
+    assert sorted(tips) == sorted(expected)
+    for key, candle in expected.items():
+        assert tips[key]['time'] == candle['time'], key
+        for f in ('open', 'high', 'low', 'close', 'volume'):
+            assert tips[key][f] == pytest.approx(candle[f], rel=1e-12), (key, f)
+
+def expected_tips():
+    tips = {(s, iv): loop_synthetic_tip(s, iv, NOW) for s in SYMBOLS for iv in INTERVALS}
+    return {key: tip for key, tip in tips.items() if tip is not None}
+
+def test_sql_tips_match_loop(app, monkeypatch):
+    monkeypatch.setattr(bar_store, 'ENABLED', False)
+    expected = expected_tips()
+    # TIPC only has 1day and 1week tips
+    assert {iv for s, iv in expected if s == 'TEST/TIPC'} == {'1day', '1week'}
+    assert_tips_equal(data_manager.synthetic_tips(SYMBOLS, INTERVALS, now=NOW), expected)
+
+def test_sql_tips_single_interval(app, monkeypatch):
+    monkeypatch.setattr(bar_store, 'ENABLED', False)
+    expected = {key: tip for key, tip in expected_tips().items() if key[1] == '4h'}
+    assert_tips_equal(data_manager.synthetic_tips(SYMBOLS, ['4h'], now=NOW), expected)
+
+def test_bar_store_tips_match_sql(app):
+    expected = expected_tips()
+    bar_store.sync(SYMBOLS, '1min')
+    start = calendar.timegm(data_manager.tip_start('1day', NOW).timetuple())
+    # The 1day tips come from memory, the 1week ones from the query
+    assert bar_store.tip('TEST/TIPA', start) is not None
+    assert bar_store.tip('TEST/TIPA', start - 3 * 86400) is None
+    for key in [k for k in expected if k[0] != 'TEST/TIPC']:
+        start = calendar.timegm(data_manager.tip_start(key[1], NOW).timetuple())
+        if key[1] != '1week':
+            assert_tips_equal({key: bar_store.tip(key[0], start)}, {key: expected[key]})
+    assert_tips_equal(data_manager.synthetic_tips(SYMBOLS, INTERVALS, now=NOW), expected)
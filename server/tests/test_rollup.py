@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import pytest
+from app import db
+from app.models import MarketData
+from app.services import rollup
+
+SYMBOL = 'BTC/USD'
+# A Monday, so the first weekly bucket is complete
+START = datetime(2024, 1, 1)
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    rollup.reset()
+    yield
+    rollup.reset()
+
+def minute_bars(days, seed=0):
+    """1min candle dicts over `days` days with ~20% of the minutes missing (gaps, closed markets)."""
+    rng = np.random.default_rng(seed)
+    n = days * 1440
+    keep = np.sort(rng.choice(n, size=int(n * 0.8), replace=False))
+    close = np.cumsum(rng.normal(size=n)) + 1000.0
+    open_ = close + rng.normal(scale=0.3, size=n)
+    return [{
+        'datetime_obj': START + timedelta(minutes=int(i)),
+        'open': float(open_[i]), 'high': float(max(open_[i], close[i]) + 0.5),
+        'low': float(min(open_[i], close[i]) - 0.5), 'close': float(close[i]), 'volume': float(i % 7 + 1)
+    } for i in keep]
+
+def resampled(bars, rule):
+    df = pd.DataFrame(bars).set_index('datetime_obj')
+    agg = df.resample(rule, label='left', closed='left').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+    return {ts.to_pydatetime().replace(tzinfo=timezone.utc): row for ts, row in agg.iterrows()}
+
+RULES = {'5min': '5min', '15min': '15min', '30min': '30min', '1h': '1h', '4h': '4h', '1day': '1D', '1week': 'W-MON'}
+
+def assert_matches(candles, expected):
+    assert sorted(candles) == sorted(expected)
+    for start, candle in candles.items():
+        row = expected[start]
+        assert candle['datetime_obj'] == start
+        for f in ('open', 'high', 'low', 'close', 'volume'):
+            assert candle[f] == pytest.approx(row[f], abs=1e-9), (start, f)
+
+def test_bucket_start():
+    ts = int(datetime(2024, 1, 3, 13, 47, tzinfo=timezone.utc).timestamp())
+    start = lambda interval: datetime.fromtimestamp(rollup.bucket_start(ts, interval), tz=timezone.utc)
+    assert start('15min') == datetime(2024, 1, 3, 13, 45, tzinfo=timezone.utc)
+    assert start('4h') == datetime(2024, 1, 3, 12, tzinfo=timezone.utc)
+    assert start('1day') == datetime(2024, 1, 3, tzinfo=timezone.utc)
+    # Weeks start on Monday
+    assert start('1week') == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def test_streaming_rollup_matches_resample(sqlite_app):
+    bars = minute_bars(15)
+    latest = {interval: {} for interval in RULES}
+    rng = np.random.default_rng(1)
+    # Daemon-like cycles: the last 30 bars are sent again, the newest one still forming
+    sent = 0
+    while sent < len(bars):
+        first, sent = max(0, sent - 30), min(len(bars), sent + int(rng.integers(1, 400)))
+        batch = [dict(b) for b in bars[first:sent]]
+        if sent < len(bars):
+            batch[-1]['close'] += 5.0
+            batch[-1]['high'] += 5.0
+        updates = rollup.roll(SYMBOL, '1min', batch)
+        if '1day' in updates:
+            updates.update(rollup.roll(SYMBOL, '1day', updates['1day']))
+        for interval, candles in updates.items():
+            for candle in candles:
+                latest[interval][candle['datetime_obj']] = candle
+
+    for interval, rule in RULES.items():
+        assert_matches(latest[interval], resampled(bars, rule))
+
+def test_forming_bar_is_replaced_not_added(sqlite_app):
+    bar = {'datetime_obj': START, 'open': 10.0, 'high': 11.0, 'low': 9.0, 'close': 10.5, 'volume': 3.0}
+    rollup.roll(SYMBOL, '1min', [bar])
+    (candle,) = rollup.roll(SYMBOL, '1min', [dict(bar, high=12.0, close=11.5, volume=4.0)])['1h']
+    assert (candle['high'], candle['close'], candle['volume']) == (12.0, 11.5, 4.0)
+
+    # A later bar folds the final version in; an older one is ignored
+    later = dict(bar, datetime_obj=START + timedelta(minutes=1), high=11.0, low=8.0, volume=1.0)
+    rollup.roll(SYMBOL, '1min', [later])
+    (candle,) = rollup.roll(SYMBOL, '1min', [dict(bar, low=1.0, volume=100.0)])['1h']
+    assert (candle['open'], candle['high'], candle['low'], candle['volume']) == (10.0, 12.0, 8.0, 5.0)
+
+def test_rollover_returns_closed_bucket_first(sqlite_app):
+    bar = {'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 1.0}
+    rollup.roll(SYMBOL, '1min', [dict(bar, datetime_obj=START + timedelta(minutes=3))])
+    candles = rollup.roll(SYMBOL, '1min', [dict(bar, datetime_obj=START + timedelta(minutes=m)) for m in (4, 5, 6)])['5min']
+    assert [c['datetime_obj'] for c in candles] == [datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc),
+                                                    datetime(2024, 1, 1, 0, 5, tzinfo=timezone.utc)]
+    assert [c['volume'] for c in candles] == [2.0, 2.0]
+
+def test_reset_bootstraps_from_stored_bars(sqlite_app):
+    bars = minute_bars(1)[:300]
+    db.session.add_all(MarketData(symbol=SYMBOL, interval='1min', time=b['datetime_obj'], open=b['open'],
+                                  high=b['high'], low=b['low'], close=b['close'], volume=b['volume'])
+                       for b in bars[:200])
+    db.session.commit()
+
+    rollup.roll(SYMBOL, '1min', bars[150:160])
+    rollup.reset(SYMBOL)
+    # The open buckets are read back from the stored bars before the new ones
+    updates = rollup.roll(SYMBOL, '1min', bars[200:])
+    for interval in ('1h', '4h', '1day'):
+        candles = {c['datetime_obj']: c for c in updates[interval]}
+        expected = resampled(bars, RULES[interval])
+        assert_matches(candles, {start: expected[start] for start in candles})
+    # The 00:00 daily bucket holds every bar, the stored ones included
+    (day,) = updates['1day']
+    assert day['volume'] == sum(b['volume'] for b in bars)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app import db, seed_ssa
+from app.models import MarketData, SeedCheckpoint
+
+SYMBOL, INTERVAL = 'BTC/USD', '1h'
+START = datetime(2024, 1, 1)
+
+@pytest.fixture(autouse=True)
+def small_windows(monkeypatch):
+    monkeypatch.setattr(seed_ssa, 'MIN_HISTORY', 50)
+    monkeypatch.setattr(seed_ssa, 'MAX_HISTORY', 120)
+    monkeypatch.setattr(seed_ssa, 'BATCH_SIZE', 40)
+
+CLOSES = np.cumsum(np.random.default_rng(7).normal(size=300)) + 300.0
+
+def add_bars(lo, hi):
+    db.session.add_all(MarketData(symbol=SYMBOL, interval=INTERVAL, time=START + timedelta(hours=i),
+                                  open=c, high=c + 1, low=c - 1, close=c, volume=1.0)
+                       for i, c in enumerate(CLOSES[lo:hi], start=lo))
+    db.session.commit()
+
+def stored():
+    rows = MarketData.query.filter_by(symbol=SYMBOL, interval=INTERVAL).order_by(MarketData.time).all()
+    return [(r.ssa_trend, r.ssa_cyclic, r.ssa_noise, r.ssa_trend_dir) for r in rows]
+
+def checkpoint():
+    return db.session.get(SeedCheckpoint, (SYMBOL, INTERVAL)).last_time
+
+def seed_all():
+    add_bars(0, 300)
+    summary = seed_ssa.seed_pair(SYMBOL, INTERVAL)
+    assert (summary['updated'], summary['errors']) == (251, 0)
+    return stored()
+
+def test_resume_after_checkpoint_matches_one_pass(sqlite_app):
+    expected = seed_all()
+    db.session.execute(db.delete(MarketData))
+    db.session.execute(db.delete(SeedCheckpoint))
+    db.session.commit()
+
+    add_bars(0, 200)
+    assert seed_ssa.seed_pair(SYMBOL, INTERVAL)['updated'] == 151
+    assert checkpoint() == START + timedelta(hours=199)
+
+    add_bars(200, 300)
+    summary = seed_ssa.seed_pair(SYMBOL, INTERVAL)
+    assert (summary['updated'], summary['skipped']) == (100, 151)
+    assert checkpoint() == START + timedelta(hours=299)
+    np.testing.assert_allclose([r[:3] for r in stored()[49:]], [r[:3] for r in expected[49:]], atol=1e-9)
+    assert [r[3] for r in stored()] == [r[3] for r in expected]
+
+def test_resume_loads_only_bars_after_checkpoint(sqlite_app, monkeypatch):
+    add_bars(0, 250)
+    seed_ssa.seed_pair(SYMBOL, INTERVAL)
+    add_bars(250, 300)
+
+    seen = []
+    calculate = seed_ssa.calculate_window_values
+    def spy(closes, indices, L):
+        seen.append((len(closes), list(indices)))
+        return calculate(closes, indices, L)
+    monkeypatch.setattr(seed_ssa, 'calculate_window_values', spy)
+
+    seed_ssa.seed_pair(SYMBOL, INTERVAL)
+    # The 120 bars up to the checkpoint, then the 50 new ones (in batches of 40)
+    assert seen == [(170, list(range(120, 160))), (170, list(range(160, 170)))]
+
+def test_unseeded_bars_below_checkpoint_are_filled(sqlite_app):
+    expected = seed_all()
+    rows = MarketData.query.filter_by(symbol=SYMBOL, interval=INTERVAL).order_by(MarketData.time).all()
+    for r in rows[100:105]:
+        r.ssa_trend = r.ssa_cyclic = r.ssa_noise = r.ssa_trend_dir = None
+    db.session.commit()
+
+    summary = seed_ssa.seed_pair(SYMBOL, INTERVAL)
+    assert (summary['updated'], summary['skipped']) == (5, 246)
+    np.testing.assert_allclose([r[:3] for r in stored()[49:]], [r[:3] for r in expected[49:]], atol=1e-9)
+    assert [r[3] for r in stored()] == [r[3] for r in expected]
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from app.services import signals
+
+def loop_basic(close, trend, cyclic, noise):
+    """The original per-bar BASIC check, run on every bar."""
+    codes = np.zeros(len(close), dtype=np.int8)
+    for i in range(1, len(close)):
+        recon = trend[i] + cyclic[i]
+        is_hot_buy = (recon < trend[i]) and (close[i] < recon)
+        is_hot_sell = (recon > trend[i]) and (close[i] > recon)
+        is_noise_buy = (noise[i] < 0) and (noise[i] >= noise[i - 1])
+        is_noise_sell = (noise[i] > 0) and (noise[i] <= noise[i - 1])
+        if is_hot_buy and is_noise_buy: codes[i] = signals.BUY
+        elif is_hot_sell and is_noise_sell: codes[i] = signals.SELL
+    return codes
+
+def loop_basic_single(close, trend, cyclic, noise):
+    """The original BASIC_S check (BASIC + backward scan of the noise cycle), run on every bar."""
+    recon = trend + cyclic
+    codes = np.zeros(len(close), dtype=np.int8)
+    for i, code in enumerate(loop_basic(close, trend, cyclic, noise)):
+        if code == signals.BUY:
+            is_first = True
+            for k in range(i - 1, 0, -1):
+                if noise[k] >= 0: break
+                if (recon[k] < trend[k]) and (close[k] < recon[k]) and (noise[k] >= noise[k - 1]):
+                    is_first = False
+                    break
+            if is_first: codes[i] = signals.BUY
+        elif code == signals.SELL:
+            is_first = True
+            for k in range(i - 1, 0, -1):
+                if noise[k] <= 0: break
+                if (recon[k] > trend[k]) and (close[k] > recon[k]) and (noise[k] <= noise[k - 1]):
+                    is_first = False
+                    break
+            if is_first: codes[i] = signals.SELL
+    return codes
+
+def loop_fast(noise, start):
+    """The original FAST counter loop, with the counters starting at 0 on bar `start`."""
+    codes = np.zeros(len(noise), dtype=np.int8)
+    down_count = 0; up_count = 0
+    for k in range(max(start, 1), len(noise)):
+        val = noise[k]; prev = noise[k - 1]
+        if val < 0:
+            up_count = 0
+            if val < prev:
+                down_count += 1
+                if down_count == 5: codes[k] = signals.BUY
+            elif val > prev:
+                if 0 < down_count < 5: codes[k] = signals.BUY
+                down_count = 0
+        elif val > 0:
+            down_count = 0
+            if val > prev:
+                up_count += 1
+                if up_count == 5: codes[k] = signals.SELL
+            elif val < prev:
+                if 0 < up_count < 5: codes[k] = signals.SELL
+                up_count = 0
+        else: down_count = 0; up_count = 0
+    return codes
+
+def random_inputs(seed, N=80):
+    """Small integer values, so ties and exact zeros (the edge cases) come up often."""
+    rng = np.random.default_rng(seed)
+    close = rng.integers(-3, 4, N).astype(float)
+    trend = rng.integers(-3, 4, N).astype(float)
+    cyclic = rng.integers(-3, 4, N).astype(float)
+    # Noise as a slow wave plus jitter: long one-signed runs as well as crossings
+    noise = np.round(3 * np.sin(np.arange(N) / rng.uniform(1, 6)) + rng.integers(-1, 2, N))
+    return close, trend, cyclic, noise
+
+SEEDS = range(200)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_basic_matches_loop(seed):
+    inputs = random_inputs(seed)
+    np.testing.assert_array_equal(signals.basic_signals(*inputs), loop_basic(*inputs))
+    np.testing.assert_array_equal(signals.strategy_signals('basic', *inputs), loop_basic(*inputs))
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_basic_single_matches_loop(seed):
+    inputs = random_inputs(seed)
+    np.testing.assert_array_equal(signals.basic_single_signals(*inputs), loop_basic_single(*inputs))
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_fast_matches_loop(seed):
+    noise = random_inputs(seed)[3]
+    for start in (1, 5, len(noise) - 10, len(noise) - 1, len(noise)):
+        np.testing.assert_array_equal(signals.fast_signals(noise, start), loop_fast(noise, start))
+
+def test_start_masks_earlier_bars():
+    inputs = random_inputs(0)
+    codes = signals.basic_signals(*inputs, start=40)
+    assert not codes[:40].any()
+    np.testing.assert_array_equal(codes[40:], loop_basic(*inputs)[40:])
+
+def test_latest_signal():
+    codes = np.array([0, 1, 0, -1, 0, 1, 0], dtype=np.int8)
+    assert signals.latest_signal(codes) == 5
+    assert signals.latest_signal(codes, value=signals.SELL) == 3
+    assert signals.latest_signal(codes, after=5) is None
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        signals.strategy_signals('nope', *random_inputs(0))
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import threading
+import time
+import numpy as np
+import pytest
+from app.services import ssa_pool
+
+# Tasks run in spawned workers, so they live at module level
+
+def sums(items, scale=1):
+    return [(symbol, float(closes.sum()) * scale, os.getpid()) for symbol, _, closes in items]
+
+def slow(items, hang=30.0, delay=0.0):
+    if any(symbol == 'hang' for symbol, _, _ in items):
+        time.sleep(hang)
+    time.sleep(delay)
+    return [symbol for symbol, _, _ in items]
+
+def die(items, parent=0):
+    if any(symbol == 'die' for symbol, _, _ in items) and os.getpid() != parent:
+        os._exit(1)
+    return [symbol for symbol, _, _ in items]
+
+def make_items(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(f"S{i}", '1h', rng.normal(size=rng.integers(50, 500))) for i in range(n)]
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # Reaped or zombie
+    state = subprocess.run(['ps', '-o', 'stat=', '-p', str(pid)], capture_output=True, text=True).stdout
+    return bool(state.strip()) and not state.startswith('Z')
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    ssa_pool.stop()
+    yield
+    ssa_pool.stop()
+
+def test_results_in_input_order_across_workers():
+    items = make_items(10)
+    results = ssa_pool.map_series(sums, items, workers=3, min_items=0, scale=2)
+    assert [r[0] for r in results] == [symbol for symbol, _, _ in items]
+    assert [r[1] for r in results] == pytest.approx([2 * closes.sum() for _, _, closes in items])
+    assert len({r[2] for r in results}) > 1 and os.getpid() not in {r[2] for r in results}
+
+def test_small_calls_run_in_process():
+    results = ssa_pool.map_series(sums, make_items(5), workers=3, min_items=6)
+    assert {r[2] for r in results} == {os.getpid()}
+    assert ssa_pool._pool is None
+
+def test_worker_death_is_retried_in_process():
+    items = make_items(4) + [('die', '1h', np.ones(3))]
+    results = ssa_pool.map_series(die, items, workers=3, min_items=0, parent=os.getpid())
+    assert results == [symbol for symbol, _, _ in items]
+    # The broken pool was retired; the next call gets a working one
+    assert ssa_pool.map_series(sums, make_items(4), workers=3, min_items=0)[0][0] == 'S0'
+
+def test_timeout_stops_hung_worker_after_concurrent_calls_finish():
+    ssa_pool.start(4)
+    pool = ssa_pool._pool
+    pids = []
+    while not pool.pids.empty():
+        pids.append(pool.pids.get())
+    for pid in pids:
+        pool.pids.put(pid)
+
+    # A concurrent call on the same pool that runs past the other call's timeout
+    other = {}
+    thread = threading.Thread(target=lambda: other.setdefault('results', ssa_pool.map_series(
+        slow, make_items(2), workers=4, min_items=0, timeout=30, delay=2.0)))
+    thread.start()
+    time.sleep(0.2)
+
+    started = time.monotonic()
+    items = [('hang', '1h', np.ones(3)), ('S9', '1h', np.ones(3))]
+    results = ssa_pool.map_series(slow, items, workers=4, min_items=0, timeout=1)
+    assert results == [None, 'S9']
+    assert time.monotonic() - started < 5
+    assert ssa_pool._pool is None and pool.retired
+    # Still in use by the other call: not shut down yet
+    assert not pool.closed
+
+    thread.join()
+    assert other['results'] == ['S0', 'S1']
+    assert pool.closed
+    deadline = time.monotonic() + 5
+    while any(alive(pid) for pid in pids) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not any(alive(pid) for pid in pids)
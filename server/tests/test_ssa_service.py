@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from app.services import ssa_service
+
+# (N, L) pairs, including windows longer than half the series (K < L)
+SHAPES = [(500, 39), (100, 10), (60, 39), (77, 39), (40, 30), (20, 2)]
+
+def loop_diagonal_average(X):
+    """The original per-element anti-diagonal loop."""
+    L, K = X.shape
+    N = L + K - 1
+    out = np.zeros(N)
+    for k in range(N):
+        count = 0
+        val = 0
+        for row in range(max(0, k - K + 1), min(L, k + 1)):
+            col = k - row
+            if 0 <= col < K:
+                val += X[row, col]
+                count += 1
+        if count > 0:
+            out[k] = val / count
+    return out
+
+def loop_ssa_decomposition(series, L):
+    """The original ssa_decomposition: full SVD + loop Hankelization of every elementary matrix."""
+    series = series.flatten()
+    N = len(series)
+    X = np.lib.stride_tricks.sliding_window_view(series, window_shape=L).T
+    U, Sigma, Vt = np.linalg.svd(X, full_matrices=False)
+    components = np.zeros((L, N))
+    for i in range(Sigma.size):
+        components[i] = loop_diagonal_average(Sigma[i] * np.outer(U[:, i], Vt[i]))
+    return components
+
+def random_walk(N, seed):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(size=N)) + 300.0
+
+@pytest.mark.parametrize("N, L", SHAPES)
+def test_diagonal_average_matches_loop(N, L):
+    X = np.random.default_rng(N + L).normal(size=(L, N - L + 1))
+    np.testing.assert_allclose(ssa_service.diagonal_average(X), loop_diagonal_average(X), rtol=0, atol=1e-12)
+
+@pytest.mark.parametrize("N, L", SHAPES)
+@pytest.mark.parametrize("method", ['svd', 'eig', 'auto'])
+def test_ssa_decomposition_matches_loop(N, L, method):
+    series = random_walk(N, seed=N * L)
+    expected = loop_ssa_decomposition(series, L)
+    components = ssa_service.ssa_decomposition(series, L, method=method)
+    assert components.shape == expected.shape
+    # Relative to the price level (the eigen path squares the condition number)
+    np.testing.assert_allclose(components, expected, rtol=0, atol=1e-7 * np.abs(series).max())
+
+@pytest.mark.parametrize("N, L", SHAPES)
+def test_components_sum_to_series(N, L):
+    series = random_walk(N, seed=N + 7 * L)
+    components = ssa_service.ssa_decomposition(series, L)
+    np.testing.assert_allclose(components.sum(axis=0), series, rtol=1e-9)
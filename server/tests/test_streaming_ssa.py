@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from app.services import ssa_service, streaming_ssa
+from app.services.signal_engine import calculate_cycle_position
+
+L, WINDOW = 39, 500
+
+def random_walk(N, seed):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(size=N)) + 300.0
+
+def assert_matches_full(stream, window):
+    """latest() / positions() against a full ssa_grouped of the same window."""
+    groups = ssa_service.ssa_grouped(window, L)
+    values = stream.latest()
+    for name in ('trend', 'cyclic', 'noise'):
+        assert values[name] == pytest.approx(groups[name][-1], abs=1e-4)
+    trend = groups['trend']
+    if abs(trend[-1] - trend[-2]) > 1e-4:
+        assert values['trend_dir'] == ("UP" if trend[-1] > trend[-2] else "DOWN")
+    positions = stream.positions()
+    # Integer percentages: allow the rounding to land one step apart
+    assert abs(positions['cycle_pos'] - calculate_cycle_position(groups['cyclic'])) <= 1
+    assert abs(positions['fast_pos'] - calculate_cycle_position(groups['noise'])) <= 1
+
+@pytest.mark.parametrize("seed", range(3))
+def test_append_matches_full_decomposition(seed):
+    series = random_walk(WINDOW + 300, seed)
+    stream = streaming_ssa.StreamingSSA(series[:WINDOW], L=L, window=WINDOW)
+    for end in range(WINDOW + 1, len(series) + 1):
+        stream.append(series[end - 1])
+        assert_matches_full(stream, series[end - WINDOW:end])
+
+@pytest.mark.parametrize("seed", range(3))
+def test_update_last_matches_full_decomposition(seed):
+    series = random_walk(WINDOW + 100, seed)
+    rng = np.random.default_rng(seed + 100)
+    stream = streaming_ssa.StreamingSSA(series[:WINDOW], L=L, window=WINDOW)
+    for end in range(WINDOW + 1, len(series) + 1):
+        window = series[end - WINDOW:end].copy()
+        # The forming bar moves a few times before it closes at its final value
+        stream.append(window[-1] + rng.normal())
+        for _ in range(3):
+            forming = window[-1] + rng.normal()
+            stream.update_last(forming)
+        stream.update_last(window[-1])
+        assert_matches_full(stream, window)
+
+def test_warm_up_window_grows_to_full():
+    series = random_walk(300, 7)
+    stream = streaming_ssa.StreamingSSA(series[:200], L=L, window=WINDOW)
+    for end in range(201, 301):
+        stream.append(series[end - 1])
+        assert_matches_full(stream, series[:end])
+
+def test_gap_raises():
+    stream = streaming_ssa.StreamingSSA(random_walk(WINDOW, 0), L=L, window=WINDOW)
+    stream.append(300.0, time=2, prev_time=None)
+    stream.append(300.0, time=3, prev_time=2)
+    with pytest.raises(streaming_ssa.StreamGap):
+        stream.append(300.0, time=5, prev_time=4)
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from app.services.twelvedata_client import TokenBucket, TwelveDataClient
+
+OK = (200, {}, {"meta": {"symbol": "AAPL"}, "values": [], "status": "ok"})
+RATE_LIMITED = (429, {"Retry-After": "0"}, {"code": 429, "message": "out of credits"})
+DROP = None  # close the connection without answering
+
+class Stub:
+    """Local Twelve Data stand-in: answers with the scripted responses in order (then OK), logs requests."""
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                stub.requests.append((time.monotonic(), url.path, {k: v[0] for k, v in parse_qs(url.query).items()}))
+                reply = stub.script.pop(0) if stub.script else OK
+                if reply is DROP:
+                    self.close_connection = True
+                    return
+                status, headers, body = reply
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+@pytest.fixture
+def stub():
+    stub = Stub()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+def make_client(stub, rate_per_minute=600, **kwargs):
+    kwargs.setdefault('backoff', 0.01)
+    return TwelveDataClient(base_url=stub.url, rate_per_minute=rate_per_minute, **kwargs)
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(capacity=4, rate=20)
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.05
+    bucket.acquire(2)
+    assert time.monotonic() - started >= 0.09
+
+def test_token_bucket_caps_cost_at_capacity():
+    bucket = TokenBucket(capacity=2, rate=20)
+    started = time.monotonic()
+    bucket.acquire(10)
+    assert time.monotonic() - started < 0.05
+
+def test_requests_wait_for_credits(stub):
+    # 600 credits a minute: a bucket of 600 refilled at 10 per second
+    client = make_client(stub)
+    assert client.get("time_series", {"symbol": "AAPL"}, cost=600) == OK[2]
+    assert client.get("time_series", {"symbol": "AAPL"}, cost=3) == OK[2]
+    (t0, path, _), (t1, _, _) = stub.requests
+    assert path == "/time_series"
+    assert t1 - t0 >= 0.28
+
+def test_http_429_drains_bucket_and_retries(stub):
+    stub.script = [RATE_LIMITED]
+    client = make_client(stub)
+    assert client.get("time_series", {"symbol": "AAPL"}) == OK[2]
+    (t0, _, _), (t1, _, _) = stub.requests
+    # Retry-After 0, but the drained bucket holds the retry until a credit is back
+    assert t1 - t0 >= 0.09
+    assert client.calls == 2
+
+def test_retry_after_header_is_honoured(stub):
+    stub.script = [(429, {"Retry-After": "1"}, {})]
+    client = make_client(stub, rate_per_minute=6000)
+    assert client.get("time_series", {}) == OK[2]
+    (t0, _, _), (t1, _, _) = stub.requests
+    assert t1 - t0 >= 1.0
+
+def test_json_429_body_is_rate_limited_too(stub):
+    stub.script = [(200, {}, RATE_LIMITED[2])]
+    client = make_client(stub)
+    assert client.get("time_series", {}) == OK[2]
+    assert len(stub.requests) == 2
+
+def test_gives_up_after_max_retries(stub):
+    stub.script = [RATE_LIMITED] * 3
+    client = make_client(stub, rate_per_minute=6000, max_retries=2)
+    assert client.get("time_series", {}) is None
+    assert len(stub.requests) == 3
+
+def test_network_errors_are_retried(stub):
+    stub.script = [DROP, DROP]
+    client = make_client(stub)
+    assert client.get("time_series", {}) == OK[2]
+    assert len(stub.requests) == 3
+
+def test_network_errors_give_up(stub):
+    stub.script = [DROP] * 3
+    client = make_client(stub, max_retries=2)
+    assert client.get("time_series", {}) is None
+
+def test_time_series_single_symbol(stub):
+    client = make_client(stub)
+    assert client.time_series("AAPL", "1h", "key", outputsize=30) == OK[2]
+    _, _, query = stub.requests[0]
+    assert query == {"symbol": "AAPL", "interval": "1h", "apikey": "key", "outputsize": "30"}
+
+def test_time_series_batch_of_one_is_keyed(stub):
+    client = make_client(stub)
+    assert client.time_series(["AAPL"], "1h", "key") == {"AAPL": OK[2]}
+
+def test_time_series_batch_is_passed_through(stub):
+    batch = {"AAPL": OK[2], "MSFT": OK[2]}
+    stub.script = [(200, {}, batch)]
+    client = make_client(stub, rate_per_minute=2)
+    started = time.monotonic()
+    assert client.time_series(["AAPL", "MSFT"], "1min", "key") == batch
+    assert stub.requests[0][2]["symbol"] == "AAPL,MSFT"
+    # The batch cost both credits of a 2-per-minute quota, so the next call has to wait
+    assert client.limiter.tokens < 1
+    assert time.monotonic() - started < 1
+
+def test_failed_batch_error_body_is_passed_through(stub):
+    error = {"code": 400, "message": "bad symbol", "status": "error"}
+    stub.script = [(400, {}, error)]
+    client = make_client(stub)
+    assert client.time_series(["AAPL", "NOPE"], "1h", "key") == error